@@ -1,10 +1,21 @@
-from fastapi import APIRouter, HTTPException, Path
+import re
+from typing import AsyncIterator
 
+from fastapi import APIRouter, HTTPException, Path, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+
+from app.core import compression
+from app.core.config import settings
 from app.schemas.books import BookResponse
 from app.services import books_service
 
 router = APIRouter()
 
+TEXT_MEDIA_TYPE = "text/plain; charset=utf-8"
+# Range unit: characters of the book text (not bytes of the encoded response)
+RANGE_UNIT = "chars"
+_RANGE = re.compile(r"^\s*chars\s*=\s*(\d+)\s*-\s*(\d*)\s*$")
+
 
 @router.get("/books/{book_id}", response_model=BookResponse)
 async def get_book(
@@ -16,3 +27,89 @@ async def get_book(
         raise HTTPException(status_code=exc.status_code, detail=exc.message) from exc
 
 
+def _parse_range(header: str | None) -> tuple[int, int] | None:
+    """(offset, length) of a ``Range: chars=start-[end]`` header; other units are ignored."""
+    if not header or not header.strip().startswith(RANGE_UNIT):
+        return None
+    match = _RANGE.match(header)
+    if not match or (match.group(2) and int(match.group(2)) < int(match.group(1))):
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Invalid range",
+            headers={"Content-Range": f"{RANGE_UNIT} */*"},
+        )
+    start = int(match.group(1))
+    length = int(match.group(2)) - start + 1 if match.group(2) else settings.book_text_page_chars
+    return start, min(length, settings.book_text_max_chars)
+
+
+def _text_headers(encoding: str | None, page: books_service.BookTextSlice | None = None) -> dict[str, str]:
+    headers = {"Accept-Ranges": RANGE_UNIT, "Vary": "Accept-Encoding", "Cache-Control": "public, max-age=3600"}
+    if page is not None and page.has_more:
+        headers["X-Next-Offset"] = str(page.end)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+@router.get("/books/{book_id}/text", response_class=Response, responses={200: {"content": {"text/plain": {}}}})
+async def get_book_text(
+    request: Request,
+    book_id: str = Path(description="Book ID from database"),
+    offset: int | None = Query(default=None, ge=0, description="First character of the slice"),
+    length: int | None = Query(default=None, ge=1, le=settings.book_text_max_chars, description="Characters in the slice"),
+) -> Response:
+    """
+    Book text as ``text/plain``: a slice with ``offset``/``length`` or a ``Range: chars=start-end``
+    header (206), the whole text streamed page by page otherwise. ``X-Next-Offset`` is set
+    while the book goes on past the returned slice. Compressed with brotli or gzip when accepted.
+    """
+    requested_range = _parse_range(request.headers.get("range"))
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+
+    try:
+        if requested_range is None and offset is None and length is None:
+            first = await books_service.get_book_text(book_id, 0, settings.book_text_max_chars)
+            return StreamingResponse(
+                _encoded(books_service.iter_book_text(first, book_id, settings.book_text_max_chars), encoding),
+                media_type=TEXT_MEDIA_TYPE,
+                headers=_text_headers(encoding),
+            )
+
+        start, size = requested_range or (offset or 0, length or settings.book_text_page_chars)
+        page = await books_service.get_book_text(book_id, start, size)
+    except books_service.BookServiceError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.message) from exc
+
+    status_code = status.HTTP_200_OK
+    headers = {}
+    if requested_range is not None:
+        if not page.text and start > 0:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Range starts after the end of the book",
+                headers={"Content-Range": f"{RANGE_UNIT} */*"},
+            )
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        total = "*" if page.has_more else str(page.end)
+        headers["Content-Range"] = f"{RANGE_UNIT} {start}-{max(page.end - 1, start)}/{total}"
+
+    body = page.text.encode("utf-8")
+    if encoding and len(body) < compression.MIN_COMPRESSED_SIZE:
+        encoding = None
+    if encoding:
+        body = compression.compress(body, encoding)
+    return Response(body, status_code=status_code, media_type=TEXT_MEDIA_TYPE,
+                    headers=headers | _text_headers(encoding, page))
+
+
+async def _encoded(pages: AsyncIterator[str], encoding: str | None) -> AsyncIterator[bytes]:
+    encoder = compression.Encoder(encoding) if encoding else None
+    async for text in pages:
+        data = text.encode("utf-8")
+        if encoder is not None:
+            data = encoder.compress(data)
+        if data:
+            yield data
+    if encoder is not None:
+        yield encoder.flush()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 
-from app.schemas.search import AdvancedSearchResponse, SearchResponse
-from app.services import search_service
+from app.schemas.search import AdvancedSearchResponse, ResultCacheStats, SearchResponse
+from app.services import result_cache, search_service
 
 router = APIRouter()
 
@@ -29,3 +29,7 @@ async def regex_search_books(
         raise HTTPException(status_code=exc.status_code, detail=exc.message) from exc
 
 
+@router.get("/search/cache", response_model=ResultCacheStats)
+async def result_cache_stats() -> ResultCacheStats:
+    """Hit / miss / eviction counters of this worker's search result cache."""
+    return ResultCacheStats(**result_cache.result_cache.stats())
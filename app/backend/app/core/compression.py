@@ -0,0 +1,69 @@
+"""Content-Encoding negotiation for large text responses.
+
+Brotli is used when the ``brotli`` package is installed and the client accepts
+it, gzip otherwise. Encoders are incremental so streamed responses are
+compressed page by page without buffering the whole body.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+MIN_COMPRESSED_SIZE = 1024  # bytes; smaller bodies are sent as is
+
+
+def _accepted(accept_encoding: str) -> dict[str, float]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name.strip().lower()] = quality
+    return weights
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Best supported encoding for an ``Accept-Encoding`` header (None = identity)."""
+    if not accept_encoding:
+        return None
+    weights = _accepted(accept_encoding)
+    candidates = [BROTLI, GZIP] if brotli is not None else [GZIP]
+    best = max(candidates, key=lambda name: weights.get(name, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else None
+
+
+class Encoder:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=5)
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == BROTLI:
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == BROTLI:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    encoder = Encoder(encoding)
+    return encoder.compress(data) + encoder.flush()
@@ -17,6 +17,12 @@ class Settings(BaseSettings):
     db_user: str = "searchbook"
     db_password: str = "searchbook_password"
 
+    # Connection pool
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection
+    db_pool_health_check_interval: float = 30.0  # Idle seconds before a connection is re-validated
+
     # Application settings
     cors_allow_origins: list[str] = [
         "http://localhost:5173",
@@ -29,6 +35,22 @@ class Settings(BaseSettings):
     suggestions_limit: int = 5
     min_word_count: int = 10000  # Minimum words per book for ingestion
     bm25_results_limit: int = 50  # Max results from BM25 search
+    bm25_top_k_pruning: bool = True  # MaxScore pruning (False: score every matching book)
+    stats_refresh_interval: float = 1.0  # Seconds between reads of corpus_stats (generation check)
+    stats_cache_max_terms: int = 100_000  # Cached term_stats entries before the cache is reset
+    regex_scan_workers: int = 0  # Regex matching processes (0 = one per CPU)
+    regex_scan_time_budget: float = 5.0  # Seconds before the regex scan returns partial results
+    regex_scan_fetch_size: int = 16  # Books read per server-side cursor round trip
+    regex_scan_chunk_chars: int = 8_000_000  # Characters of content per chunk sent to a worker
+    index_segment_path: str | None = None  # Memory-mapped BM25 segment (SQL index used when unset)
+    result_cache_max_entries: int = 2048  # Cached search responses per worker (0 = no cache)
+    result_cache_ttl: float = 300.0  # Seconds a cached response may be served
+    query_language: str = "english"  # Stopwords removed from queries (same lists as ingestion)
+    kwic_snippets: bool = True  # Snippets around the query words (term_positions) instead of the first characters
+    book_text_page_chars: int = 65_536  # Default slice of /books/{id}/text
+    book_text_max_chars: int = 1_048_576  # Largest slice per request (and page size when streaming the whole text)
+    click_flush_interval: float = 5.0  # Seconds between writes of the buffered book views
+    click_flush_max_pending: int = 1000  # Distinct books buffered before an early write
 
 
 @lru_cache
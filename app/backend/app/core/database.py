@@ -1,15 +1,34 @@
-"""Database connection and utilities for PostgreSQL."""
+"""Database connection pool and query helpers for PostgreSQL.
+
+Connections come from a process-wide pool. Queries are blocking (psycopg2),
+so the async helpers run them on a dedicated thread pool sized like the
+connection pool: a slow query occupies one worker thread, never the event loop.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Generator, TypeVar
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
-from contextlib import contextmanager
-from typing import Generator, Any
 
 from app.core.config import settings
 
+T = TypeVar("T")
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within ``db_pool_timeout``."""
+
 
 def get_db_connection():
-    """Get a PostgreSQL database connection."""
+    """Open a new, unpooled PostgreSQL connection (scripts and long-running exports)."""
     return psycopg2.connect(
         host=settings.db_host,
         port=settings.db_port,
@@ -19,38 +38,204 @@ def get_db_connection():
     )
 
 
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of psycopg2 connections.
+
+    * keeps at least ``min_size`` connections open and never more than ``max_size``;
+    * blocks (up to ``timeout`` seconds) instead of failing when all connections are busy;
+    * runs ``SELECT 1`` on checkout for connections idle longer than
+      ``health_check_interval`` and transparently replaces dead ones.
+    """
+
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        timeout: float,
+        health_check_interval: float,
+        connect: Callable[[], Any] = get_db_connection,
+    ) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._connect = connect
+        self._idle: deque[tuple[Any, float]] = deque()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        for _ in range(min_size):
+            self._idle.append((connect(), time.monotonic()))
+            self._size += 1
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn) -> None:
+        try:
+            conn.close()
+        finally:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+
+        if conn is not None and self._is_healthy(conn, last_used):
+            return conn
+        if conn is not None:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+        try:
+            return self._connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn) -> None:
+        if conn.closed or self._closed:
+            self._discard(conn)
+            return
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._condition.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+_pool: ConnectionPool | None = None
+_executor: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def open_pool() -> ConnectionPool:
+    """Create the process-wide pool (idempotent). Called at startup, or lazily on first query."""
+    global _pool, _executor
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                min_size=settings.db_pool_min_size,
+                max_size=settings.db_pool_max_size,
+                timeout=settings.db_pool_timeout,
+                health_check_interval=settings.db_pool_health_check_interval,
+            )
+            _executor = ThreadPoolExecutor(max_workers=settings.db_pool_max_size, thread_name_prefix="db")
+        return _pool
+
+
+def close_pool() -> None:
+    """Close every pooled connection and stop the query threads."""
+    global _pool, _executor
+    with _pool_lock:
+        pool, executor = _pool, _executor
+        _pool, _executor = None, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    if pool is not None:
+        pool.close()
+
+
 @contextmanager
 def get_db_cursor(commit: bool = False) -> Generator:
-    """Context manager for database cursor."""
-    conn = get_db_connection()
+    """Context manager for a cursor on a pooled connection (blocking)."""
+    pool = _pool or open_pool()
+    conn = pool.acquire()
     try:
         cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        yield cursor
-        if commit:
-            conn.commit()
+        try:
+            yield cursor
+            if commit:
+                conn.commit()
+        finally:
+            cursor.close()
     finally:
-        cursor.close()
-        conn.close()
+        pool.release(conn)
+
+
+async def run_with_cursor(func: Callable[..., T], *args: Any, commit: bool = False) -> T:
+    """Run ``func(cursor, *args)`` on a pooled connection without blocking the event loop."""
+
+    def call() -> T:
+        with get_db_cursor(commit=commit) as cursor:
+            return func(cursor, *args)
+
+    if _executor is None:
+        open_pool()
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+
+def _execute(cursor, query: str, params: tuple, commit: bool) -> Any:
+    cursor.execute(query, params)
+    if commit:
+        return cursor.rowcount
+    return cursor.fetchall()
+
+
+def _fetch_one(cursor, query: str, params: tuple) -> Any:
+    cursor.execute(query, params)
+    return cursor.fetchone()
+
+
+def _fetch_all(cursor, query: str, params: tuple) -> list:
+    cursor.execute(query, params)
+    return cursor.fetchall()
 
 
-def execute_query(query: str, params: tuple = (), commit: bool = False) -> Any:
+async def execute_query(query: str, params: tuple = (), commit: bool = False) -> Any:
     """Execute a single query."""
-    with get_db_cursor(commit=commit) as cursor:
-        cursor.execute(query, params)
-        if commit:
-            return cursor.rowcount
-        return cursor.fetchall()
+    return await run_with_cursor(partial(_execute, commit=commit), query, params, commit=commit)
 
 
-def execute_query_one(query: str, params: tuple = ()) -> Any:
+async def execute_query_one(query: str, params: tuple = ()) -> Any:
     """Execute a query and return a single row."""
-    with get_db_cursor() as cursor:
-        cursor.execute(query, params)
-        return cursor.fetchone()
+    return await run_with_cursor(_fetch_one, query, params)
 
 
-def execute_query_all(query: str, params: tuple = ()) -> list:
+async def execute_query_all(query: str, params: tuple = ()) -> list:
     """Execute a query and return all rows."""
-    with get_db_cursor() as cursor:
-        cursor.execute(query, params)
-        return cursor.fetchall()
+    return await run_with_cursor(_fetch_all, query, params)
@@ -1,8 +1,25 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import api_router
+from app.core import database
 from app.core.config import settings
+from app.services import regex_scan
+from app.services.click_aggregator import click_aggregator
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.open_pool()
+    click_aggregator.start()
+    try:
+        yield
+    finally:
+        await click_aggregator.stop()
+        regex_scan.shutdown_pool()
+        database.close_pool()
 
 
 def create_application() -> FastAPI:
@@ -11,6 +28,7 @@ def create_application() -> FastAPI:
         version="0.1.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -19,6 +37,7 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Accept-Ranges", "Content-Range", "X-Next-Offset"],
     )
 
     app.include_router(api_router)
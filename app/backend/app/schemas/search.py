@@ -18,5 +18,18 @@ class SearchResponse(BaseModel):
 
 class AdvancedSearchResponse(SearchResponse):
     regex: str
+    partial: bool = False  # True when the time budget ran out before the scan completed
 
 
+
+
+class ResultCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    expirations: int
+    invalidations: int
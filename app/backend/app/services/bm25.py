@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 class BM25:
     def __init__(self, N : int, avgdl : float, k1 : float = 1.5, b : float = 0.75):
         self.N = N          # nombre total de documents
@@ -41,3 +43,29 @@ class BM25:
             total += self.score(doc["word_count"], tf, n)
         return total
 
+    def score_batch(self, doc_ids, frequencies, doc_lengths, doc_freqs) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Score vectorisé de toute une requête, une entrée par posting :
+        doc_ids     = identifiant du document
+        frequencies = fréquence du mot dans ce document
+        doc_lengths = longueur du document
+        doc_freqs   = nombre de documents contenant ce mot
+
+        Retourne (identifiants uniques triés, score BM25 sommé par document).
+        Mêmes opérations et même ordre d'accumulation que score_query :
+        les résultats sont identiques au bit près.
+        """
+        doc_ids = np.asarray(doc_ids)
+        tf = np.asarray(frequencies, dtype=np.float64)
+        dl = np.asarray(doc_lengths, dtype=np.float64)
+
+        # idf via math.log (une fois par df distinct) pour rester identique au chemin scalaire
+        unique_dfs, df_index = np.unique(np.asarray(doc_freqs), return_inverse=True)
+        idf = np.array([self.idf(int(n)) for n in unique_dfs], dtype=np.float64)[df_index]
+
+        denom = tf + self.k1 * (1 - self.b + self.b * dl / self.avgdl)
+        scores = idf * (tf * (self.k1 + 1)) / denom
+
+        unique_ids, doc_index = np.unique(doc_ids, return_inverse=True)
+        # bincount accumule dans l'ordre des postings, comme la boucle de score_query
+        return unique_ids, np.bincount(doc_index, weights=scores, minlength=len(unique_ids))
@@ -1,9 +1,13 @@
-"""Books service for fetching book details from PostgreSQL."""
+"""Books service for fetching book details and text slices from PostgreSQL."""
+
+from dataclasses import dataclass
+from typing import AsyncIterator
 
 from fastapi import status
 
-from app.core.database import execute_query, execute_query_one
+from app.core.database import execute_query_one
 from app.schemas.books import BookResponse
+from app.services.click_aggregator import click_aggregator
 
 
 class BookServiceError(Exception):
@@ -13,31 +17,34 @@ class BookServiceError(Exception):
         super().__init__(message)
 
 
-async def get_book(book_id: str) -> BookResponse:
-    """Fetch a single book by ID."""
+def _parse_book_id(book_id: str) -> int:
     try:
-        # Increment click count
-        execute_query("SELECT increment_book_click(%s)", (int(book_id),), commit=True)
-
-        book = execute_query_one(
-            "SELECT id, title, author, content, word_count, image_url FROM books WHERE id = %s",
-            (int(book_id),)
-        )
+        return int(book_id)
     except ValueError:
         raise BookServiceError("Invalid book ID", status.HTTP_400_BAD_REQUEST)
+
+
+async def get_book(book_id: str) -> BookResponse:
+    """Fetch a single book by ID and count the view (written later, see ``click_aggregator``)."""
+    book_id_int = _parse_book_id(book_id)
+    try:
+        book = await execute_query_one(
+            "SELECT id, title, author, word_count, image_url FROM books WHERE id = %s",
+            (book_id_int,)
+        )
     except Exception as exc:
         raise BookServiceError(f"Database error: {str(exc)}", status.HTTP_500_INTERNAL_SERVER_ERROR) from exc
-    
+
     if not book:
         raise BookServiceError("Book not found", status.HTTP_404_NOT_FOUND)
-    
+
+    click_aggregator.record(book_id_int)
     return BookResponse(
         id=str(book["id"]),
         gutenberg_id=None,
         title=book["title"],
         author=book["author"],
         language=None,
-        text=book["content"],
         word_count=book["word_count"],
         centrality_score=None,
         image_url=book.get("image_url"),
@@ -45,3 +52,42 @@ async def get_book(book_id: str) -> BookResponse:
     )
 
 
+@dataclass(frozen=True)
+class BookTextSlice:
+    offset: int
+    text: str
+    has_more: bool  # False when the slice reaches the end of the book
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.text)
+
+
+async def get_book_text(book_id: str, offset: int, length: int) -> BookTextSlice:
+    """
+    ``length`` characters of the book text starting at ``offset``. Only this slice
+    is read and sent by PostgreSQL (``substr``; see migration 006 for the storage).
+    """
+    book_id_int = _parse_book_id(book_id)
+    try:
+        # Un caractère de plus pour savoir si la fin du livre est atteinte sans calculer length(content)
+        row = await execute_query_one(
+            "SELECT substr(content, %s, %s) AS text FROM books WHERE id = %s",
+            (offset + 1, length + 1, book_id_int)
+        )
+    except Exception as exc:
+        raise BookServiceError(f"Database error: {str(exc)}", status.HTTP_500_INTERNAL_SERVER_ERROR) from exc
+
+    if not row:
+        raise BookServiceError("Book not found", status.HTTP_404_NOT_FOUND)
+    text = row["text"] or ""
+    return BookTextSlice(offset=offset, text=text[:length], has_more=len(text) > length)
+
+
+async def iter_book_text(first: BookTextSlice, book_id: str, page_chars: int) -> AsyncIterator[str]:
+    """The whole text from ``first`` on, one page (one ``substr`` query) at a time."""
+    page = first
+    yield page.text
+    while page.has_more:
+        page = await get_book_text(book_id, page.end, page_chars)
+        yield page.text
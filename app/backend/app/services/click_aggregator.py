@@ -0,0 +1,105 @@
+"""In-process aggregation of book views (``books.click_count``).
+
+``get_book`` only counts the view in memory. A background task started with the
+application flushes the accumulated deltas every ``click_flush_interval``
+seconds, or as soon as ``click_flush_max_pending`` distinct books are waiting,
+in one set-based ``UPDATE ... FROM unnest(...)``. The last flush runs on
+shutdown, before the connection pool is closed.
+
+Deltas are additive, so several workers flushing their own counts converge to
+the total number of views. A failed flush puts its deltas back for the next
+one. If the process dies, at most the views of the last interval (or of
+``click_flush_max_pending`` books) are lost.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+
+from app.core.config import settings
+from app.core.database import run_with_cursor
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SQL = """
+    UPDATE books b
+    SET click_count = b.click_count + d.clicks
+    FROM unnest(%s::int[], %s::bigint[]) AS d(id, clicks)
+    WHERE b.id = d.id
+"""
+
+
+def _apply(cursor, book_ids: list[int], clicks: list[int]) -> int:
+    cursor.execute(FLUSH_SQL, (book_ids, clicks))
+    return cursor.rowcount
+
+
+class ClickAggregator:
+    def __init__(self, flush_interval: float, max_pending: int) -> None:
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Counter[int] = Counter()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        """Views counted and not yet written."""
+        return sum(self._pending.values())
+
+    def record(self, book_id: int) -> None:
+        """Count one view of ``book_id`` (event loop only, never blocks)."""
+        self._pending[book_id] += 1
+        if self._wakeup is not None and len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write the pending deltas in one statement; returns the number of updated books."""
+        if not self._pending:
+            return 0
+        # Échange avant l'await : les vues comptées pendant l'écriture vont au prochain flush
+        batch, self._pending = self._pending, Counter()
+        book_ids = sorted(batch)  # ordre fixe des verrous de lignes entre workers
+        try:
+            return await run_with_cursor(_apply, book_ids, [batch[book_id] for book_id in book_ids], commit=True)
+        except Exception:
+            self._pending.update(batch)
+            raise
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Click flush failed; %d views kept for the next attempt", self.pending)
+
+    def start(self) -> None:
+        """Start the periodic flush (called from the application lifespan)."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="click-flush")
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write what is left."""
+        task, self._task, self._wakeup = self._task, None, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final click flush failed; %d views lost", self.pending)
+
+
+click_aggregator = ClickAggregator(
+    flush_interval=settings.click_flush_interval,
+    max_pending=settings.click_flush_max_pending,
+)
@@ -0,0 +1,81 @@
+"""Cached corpus and term statistics, materialized at ingestion time.
+
+``corpus_stats`` (one row: N, total words, index generation) and
+``term_stats`` (df, total tf, max tf per word) are maintained by the ingestion
+pipeline. The backend keeps them in memory and only re-reads the single
+corpus row every ``stats_refresh_interval`` seconds; when its generation
+number changes, cached term statistics are dropped.
+"""
+
+import time
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.database import execute_query_all, execute_query_one
+
+
+@dataclass(frozen=True)
+class CorpusStats:
+    generation: int
+    num_docs: int
+    avgdl: float
+
+
+@dataclass(frozen=True)
+class TermStats:
+    doc_freq: int
+    total_tf: int
+    max_tf: int
+
+
+class StatsCache:
+    def __init__(self, refresh_interval: float, max_terms: int) -> None:
+        self.refresh_interval = refresh_interval
+        self.max_terms = max_terms
+        self._corpus: CorpusStats | None = None
+        self._checked_at = float("-inf")
+        # None = mot absent de l'index (mis en cache aussi)
+        self._terms: dict[str, TermStats | None] = {}
+
+    async def corpus(self) -> CorpusStats:
+        """Corpus statistics, re-read (one primary-key lookup) at most every ``refresh_interval`` seconds."""
+        now = time.monotonic()
+        if self._corpus is None or now - self._checked_at >= self.refresh_interval:
+            row = await execute_query_one("SELECT generation, num_docs, total_words FROM corpus_stats")
+            if row is None:
+                corpus = CorpusStats(generation=0, num_docs=0, avgdl=0.0)
+            else:
+                num_docs = row["num_docs"]
+                corpus = CorpusStats(
+                    generation=row["generation"],
+                    num_docs=num_docs,
+                    avgdl=row["total_words"] / num_docs if num_docs else 0.0,
+                )
+            if self._corpus is None or corpus.generation != self._corpus.generation:
+                self._terms.clear()
+            self._corpus = corpus
+            self._checked_at = now
+        return self._corpus
+
+    async def terms(self, words: list[str]) -> dict[str, TermStats]:
+        """Statistics of the words present in the index (absent words are left out)."""
+        await self.corpus()
+        known = {word: self._terms[word] for word in dict.fromkeys(words) if word in self._terms}
+        missing = [word for word in dict.fromkeys(words) if word not in known]
+        if missing:
+            rows = await execute_query_all(
+                "SELECT word, doc_freq, total_tf, max_tf FROM term_stats WHERE word = ANY(%s)",
+                (missing,)
+            )
+            found = {row["word"]: TermStats(row["doc_freq"], row["total_tf"], row["max_tf"]) for row in rows}
+            if len(self._terms) + len(missing) > self.max_terms:
+                self._terms.clear()
+            for word in missing:
+                known[word] = self._terms[word] = found.get(word)
+        return {word: stats for word, stats in known.items() if stats is not None}
+
+
+stats_cache = StatsCache(
+    refresh_interval=settings.stats_refresh_interval,
+    max_terms=settings.stats_cache_max_terms,
+)
@@ -0,0 +1,301 @@
+"""Read-only, memory-mapped segment files for the BM25 inverted index.
+
+A segment is a frozen copy of ``inverted_index`` laid out for direct reads:
+
+    header | doc ids | doc lengths | term offsets | terms blob | term entries | postings
+
+* doc ids / doc lengths: parallel uint32 arrays sorted by book id. Postings
+  reference documents by their position (ordinal) in these arrays.
+* term offsets / terms blob: the UTF-8 terms, sorted by code point, so a term
+  is found by binary search without building a dict.
+* term entries: one fixed-size record per term (df, max tf, postings offsets
+  and integer widths).
+* postings: for each term, the delta-encoded doc ordinals followed by the
+  frequencies, each stored with the narrowest width (1, 2 or 4 bytes) that fits.
+
+The loader maps the file with ``mmap`` (read-only), so every uvicorn worker
+shares the same page cache pages and nothing is copied at load time.
+
+Export the current database index with::
+
+    python -m app.services.index_segment --output /data/searchbook.seg
+"""
+
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import BinaryIO, Iterable, Iterator
+
+MAGIC = b"SBSEG\x00\x00\x01"
+VERSION = 1
+
+# magic, version, num_docs, num_terms, total_words,
+# offsets: doc_ids, doc_lengths, term_offsets, terms_blob, term_entries, postings
+_HEADER = struct.Struct("<8sIIIQ6Q")
+# df, max_tf, docs offset, freqs offset, docs width, freqs width
+_TERM_ENTRY = struct.Struct("<IIQQBB6x")
+
+_WIDTH_TYPECODES = {1: "B", 2: "H", 4: "I"}
+
+
+class SegmentFormatError(Exception):
+    """Raised when a segment file is truncated or was written by another format version."""
+
+
+@dataclass(frozen=True)
+class TermInfo:
+    df: int
+    max_tf: int
+    docs_offset: int
+    freqs_offset: int
+    docs_width: int
+    freqs_width: int
+
+
+def _width_for(max_value: int) -> int:
+    if max_value < 1 << 8:
+        return 1
+    if max_value < 1 << 16:
+        return 2
+    return 4
+
+
+def _aligned(offset: int, width: int) -> int:
+    return (offset + width - 1) // width * width
+
+
+def _as_little_endian(values: array) -> array:
+    if sys.byteorder != "little" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _write_array(handle: BinaryIO, values: array, width: int = 8) -> int:
+    """Write ``values`` at the next ``width``-aligned position and return its offset."""
+    offset = _aligned(handle.tell(), width)
+    handle.write(b"\x00" * (offset - handle.tell()))
+    handle.write(_as_little_endian(values).tobytes())
+    return offset
+
+
+# --- ÉCRITURE ---
+
+def write_segment(
+    path: str,
+    docs: Iterable[tuple[int, int]],
+    postings: Iterable[tuple[str, Iterable[tuple[int, int]]]],
+) -> None:
+    """
+    Write a segment file atomically.
+
+    docs: (book_id, word_count) pairs, in any order.
+    postings: (word, [(book_id, frequency), ...]) groups, sorted by word
+        (code point order); postings within a group may come in any order.
+    """
+    doc_rows = sorted(docs)
+    doc_ids = array("I", (book_id for book_id, _ in doc_rows))
+    doc_lengths = array("I", (length for _, length in doc_rows))
+    ordinals = {book_id: ordinal for ordinal, book_id in enumerate(doc_ids)}
+
+    term_offsets = array("Q", [0])
+    terms_blob = bytearray()
+    entries = bytearray()
+    previous_word = None
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryFile(dir=directory) as postings_file:
+        for word, word_postings in postings:
+            if previous_word is not None and word <= previous_word:
+                raise ValueError(f"Postings must be sorted by word: {word!r} after {previous_word!r}")
+            previous_word = word
+
+            pairs = sorted((ordinals[book_id], frequency) for book_id, frequency in word_postings)
+            if not pairs:
+                continue
+            doc_ordinals = [ordinal for ordinal, _ in pairs]
+            gaps = array("I", [doc_ordinals[0]])
+            gaps.extend(current - previous for previous, current in zip(doc_ordinals, doc_ordinals[1:]))
+            frequencies = array("I", (frequency for _, frequency in pairs))
+            max_tf = max(frequencies)
+            docs_width = _width_for(max(gaps))
+            freqs_width = _width_for(max_tf)
+
+            docs_offset = _write_array(postings_file, array(_WIDTH_TYPECODES[docs_width], gaps), docs_width)
+            freqs_offset = _write_array(postings_file, array(_WIDTH_TYPECODES[freqs_width], frequencies), freqs_width)
+
+            terms_blob += word.encode("utf-8")
+            term_offsets.append(len(terms_blob))
+            entries += _TERM_ENTRY.pack(len(pairs), max_tf, docs_offset, freqs_offset, docs_width, freqs_width)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(b"\x00" * _HEADER.size)
+            doc_ids_offset = _write_array(handle, doc_ids)
+            doc_lengths_offset = _write_array(handle, doc_lengths)
+            term_offsets_offset = _write_array(handle, term_offsets)
+            terms_blob_offset = _write_array(handle, array("B", terms_blob))
+            term_entries_offset = _write_array(handle, array("B", entries))
+            postings_offset = _aligned(handle.tell(), 8)
+            handle.write(b"\x00" * (postings_offset - handle.tell()))
+            postings_file.seek(0)
+            shutil.copyfileobj(postings_file, handle)
+
+            handle.seek(0)
+            handle.write(_HEADER.pack(
+                MAGIC, VERSION, len(doc_ids), len(term_offsets) - 1, sum(doc_lengths),
+                doc_ids_offset, doc_lengths_offset, term_offsets_offset,
+                terms_blob_offset, term_entries_offset, postings_offset,
+            ))
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    # os.replace garde l'ancien inode vivant pour les workers qui l'ont encore mappé
+    os.replace(tmp_path, path)
+
+
+# --- LECTURE ---
+
+class IndexSegment:
+    """Memory-mapped, read-only view over a segment file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            self.file_key = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if sys.byteorder != "little":
+            raise SegmentFormatError("Segment files can only be mapped on little-endian hosts")
+        if len(self._mmap) < _HEADER.size:
+            raise SegmentFormatError(f"{path}: truncated header")
+
+        (magic, version, num_docs, num_terms, total_words,
+         doc_ids_offset, doc_lengths_offset, term_offsets_offset,
+         terms_blob_offset, term_entries_offset, postings_offset) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SegmentFormatError(f"{path}: unsupported segment (magic={magic!r}, version={version})")
+
+        self.num_docs = num_docs
+        self.num_terms = num_terms
+        self.avgdl = total_words / num_docs if num_docs else 0.0
+
+        self._view = memoryview(self._mmap)
+        self.doc_ids = self._view[doc_ids_offset:doc_ids_offset + 4 * num_docs].cast("I")
+        self.doc_lengths = self._view[doc_lengths_offset:doc_lengths_offset + 4 * num_docs].cast("I")
+        self.min_doc_length = min(self.doc_lengths, default=0)
+        self._term_offsets = self._view[term_offsets_offset:term_offsets_offset + 8 * (num_terms + 1)].cast("Q")
+        self._terms_blob_offset = terms_blob_offset
+        self._term_entries_offset = term_entries_offset
+        self._postings_offset = postings_offset
+
+    def _term_at(self, index: int) -> bytes:
+        start = self._terms_blob_offset + self._term_offsets[index]
+        end = self._terms_blob_offset + self._term_offsets[index + 1]
+        return self._mmap[start:end]
+
+    def lookup(self, word: str) -> TermInfo | None:
+        """Binary search for ``word`` in the term dictionary."""
+        key = word.encode("utf-8")
+        low, high = 0, self.num_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.num_terms or self._term_at(low) != key:
+            return None
+        return TermInfo(*_TERM_ENTRY.unpack_from(self._mmap, self._term_entries_offset + low * _TERM_ENTRY.size))
+
+    def postings(self, info: TermInfo) -> tuple[list[int], memoryview]:
+        """Return (doc ordinals, frequencies) for a term, ordinals ascending."""
+        docs_start = self._postings_offset + info.docs_offset
+        freqs_start = self._postings_offset + info.freqs_offset
+        gaps = self._view[docs_start:docs_start + info.df * info.docs_width].cast(_WIDTH_TYPECODES[info.docs_width])
+        frequencies = self._view[freqs_start:freqs_start + info.df * info.freqs_width].cast(_WIDTH_TYPECODES[info.freqs_width])
+        return list(accumulate(gaps)), frequencies
+
+    def close(self) -> None:
+        """Unmap the file; views returned by ``postings`` must have been released."""
+        for view in (self.doc_ids, self.doc_lengths, self._term_offsets, self._view):
+            view.release()
+        self._mmap.close()
+
+
+_segment: IndexSegment | None = None
+
+
+def get_index_segment(path: str | None) -> IndexSegment | None:
+    """
+    Return the mapped segment at ``path``, remapping it when the file was replaced.
+
+    Returns None when no segment is configured or the file does not exist,
+    in which case callers fall back to the SQL index.
+    """
+    global _segment
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if _segment is None or _segment.path != path or _segment.file_key != (stat.st_ino, stat.st_mtime_ns):
+        # L'ancien mapping n'est pas fermé : des requêtes en cours peuvent encore le lire.
+        _segment = IndexSegment(path)
+    return _segment
+
+
+# --- EXPORT DEPUIS POSTGRESQL ---
+
+def _stream_postings(conn, fetch_size: int) -> Iterator[tuple[str, list[tuple[int, int]]]]:
+    with conn.cursor(name="segment_export") as cursor:
+        cursor.itersize = fetch_size
+        # COLLATE "C" : ordre des octets UTF-8, identique à l'ordre des code points
+        cursor.execute('SELECT word, book_id, frequency FROM inverted_index ORDER BY word COLLATE "C"')
+        current_word, current = None, []
+        for word, book_id, frequency in cursor:
+            if word != current_word:
+                if current:
+                    yield current_word, current
+                current_word, current = word, []
+            current.append((book_id, frequency))
+        if current:
+            yield current_word, current
+
+
+def export_segment(output_path: str, fetch_size: int = 50000) -> None:
+    """Dump ``books`` lengths and ``inverted_index`` into a segment file."""
+    from app.core.database import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id, word_count FROM books")
+            docs = [(book_id, word_count or 0) for book_id, word_count in cursor.fetchall()]
+        write_segment(output_path, docs, _stream_postings(conn, fetch_size))
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the inverted index to a memory-mappable segment file.")
+    parser.add_argument("--output", required=True, help="Destination file (replaced atomically).")
+    parser.add_argument("--fetch-size", type=int, default=50000, help="Rows fetched per server-side cursor round trip.")
+    args = parser.parse_args()
+    export_segment(args.output, args.fetch_size)
+    segment = IndexSegment(args.output)
+    print(f"Segment written to {args.output}: {segment.num_docs} documents, {segment.num_terms} terms.")
+    segment.close()
+
+
+if __name__ == "__main__":
+    main()
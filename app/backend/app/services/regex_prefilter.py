@@ -0,0 +1,301 @@
+"""Trigram prefilter for regex search (Google Code Search style).
+
+A regex is analyzed into a boolean query over the trigrams that any match must
+contain (R. Cox, "Regular Expression Matching with a Trigram Index"). Books
+whose trigram set (``book_trigrams``, built at ingestion) does not satisfy the
+query cannot match and are never fetched. A pattern without extractable
+literals yields ``MATCH_ALL`` and falls back to a full scan.
+
+Trigrams are taken from the lowercased book content (what ``books.content``
+stores) and encoded as a single BIGINT: three code points of 21 bits each.
+The encoding is ``searchbook_text.trigram_key``, shared with ingestion.
+"""
+
+import re
+from dataclasses import dataclass
+from itertools import product
+
+from searchbook_text.encoding import trigram_key
+
+try:  # Python >= 3.11
+    import re._parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+try:
+    from re._casefix import _EXTRA_CASES
+except ImportError:  # pragma: no cover
+    _EXTRA_CASES = {}
+
+# Taille maximale des ensembles de chaînes suivis par nœud (au-delà : on résume)
+MAX_SET_SIZE = 16
+# Une classe de caractères plus grande est traitée comme "n'importe quel caractère"
+MAX_CLASS_SIZE = 8
+
+
+# --- REQUÊTE BOOLÉENNE SUR LES TRIGRAMMES ---
+
+@dataclass(frozen=True)
+class TrigramQuery:
+    op: str  # "all" (aucune contrainte), "and", "or"
+    trigrams: frozenset[str] = frozenset()
+    children: tuple["TrigramQuery", ...] = ()
+
+
+MATCH_ALL = TrigramQuery("all")
+
+
+def _and(left: TrigramQuery, right: TrigramQuery) -> TrigramQuery:
+    if left.op == "all":
+        return right
+    if right.op == "all":
+        return left
+    trigrams, children = set(), []
+    for query in (left, right):
+        if query.op == "and":
+            trigrams |= query.trigrams
+            children.extend(query.children)
+        elif not query.children and len(query.trigrams) == 1:
+            trigrams |= query.trigrams
+        else:
+            children.append(query)
+    return TrigramQuery("and", frozenset(trigrams), tuple(dict.fromkeys(children)))
+
+
+def _or(left: TrigramQuery, right: TrigramQuery) -> TrigramQuery:
+    if left.op == "all" or right.op == "all":
+        return MATCH_ALL
+    trigrams, children = set(), []
+    for query in (left, right):
+        if query.op == "or":
+            trigrams |= query.trigrams
+            children.extend(query.children)
+        elif not query.children and len(query.trigrams) == 1:
+            trigrams |= query.trigrams
+        else:
+            children.append(query)
+    return TrigramQuery("or", frozenset(trigrams), tuple(dict.fromkeys(children)))
+
+
+def _trigrams_of(strings: set[str]) -> TrigramQuery:
+    """Any match contains one of ``strings``: OR over strings of AND over their trigrams."""
+    query = None
+    for string in strings:
+        if len(string) < 3:
+            return MATCH_ALL
+        conjunction = TrigramQuery("and", frozenset(string[i:i + 3] for i in range(len(string) - 2)))
+        query = conjunction if query is None else _or(query, conjunction)
+    return query or MATCH_ALL
+
+
+# --- ANALYSE DE L'ARBRE DE LA REGEX ---
+
+@dataclass
+class _Info:
+    emptyable: bool
+    exact: set[str] | None  # ensemble exact des chaînes reconnues (None = inconnu)
+    prefix: set[str]        # toute correspondance commence par l'une de ces chaînes
+    suffix: set[str]        # toute correspondance finit par l'une de ces chaînes
+    match: TrigramQuery
+
+
+def _empty() -> _Info:
+    return _Info(True, {""}, {""}, {""}, MATCH_ALL)
+
+
+def _any_char() -> _Info:
+    return _Info(False, None, {""}, {""}, MATCH_ALL)
+
+
+def _any_string() -> _Info:
+    return _Info(True, None, {""}, {""}, MATCH_ALL)
+
+
+def _char_variants(code: int) -> set[str]:
+    """Lowercase forms a character can match under IGNORECASE (content is stored lowercased)."""
+    char = chr(code)
+    variants = {char, char.lower(), char.upper()}
+    for variant in list(variants):
+        if len(variant) == 1:
+            variants.update(chr(extra) for extra in _EXTRA_CASES.get(ord(variant), ()))
+    return {variant.lower() for variant in variants}
+
+
+def _chars(strings: set[str]) -> _Info:
+    return _Info(False, set(strings), set(strings), set(strings), MATCH_ALL)
+
+
+def _cross(left: set[str], right: set[str]) -> set[str] | None:
+    if len(left) * len(right) > MAX_SET_SIZE:
+        return None
+    return {a + b for a, b in product(left, right)}
+
+
+def _simplify(info: _Info) -> _Info:
+    """Keep the string sets small: fold what they imply into ``match`` and trim them."""
+    if info.exact is not None and (len(info.exact) > MAX_SET_SIZE or any(len(s) > 8 for s in info.exact)):
+        info.match = _and(info.match, _trigrams_of(info.exact))
+        info.prefix, info.suffix, info.exact = set(info.exact), set(info.exact), None
+    if info.exact is None:
+        if any(len(s) >= 3 for s in info.prefix):
+            info.match = _and(info.match, _trigrams_of(info.prefix))
+            info.prefix = {s[:2] for s in info.prefix}
+        if any(len(s) >= 3 for s in info.suffix):
+            info.match = _and(info.match, _trigrams_of(info.suffix))
+            info.suffix = {s[-2:] for s in info.suffix}
+        if len(info.prefix) > MAX_SET_SIZE:
+            info.prefix = {""}
+        if len(info.suffix) > MAX_SET_SIZE:
+            info.suffix = {""}
+    return info
+
+
+def _concat(left: _Info, right: _Info) -> _Info:
+    exact = None
+    if left.exact is not None and right.exact is not None:
+        exact = _cross(left.exact, right.exact)
+
+    if left.exact is not None:
+        prefix = _cross(left.exact, right.prefix) or set(left.exact)
+    elif left.emptyable:
+        prefix = left.prefix | right.prefix
+    else:
+        prefix = left.prefix
+
+    if right.exact is not None:
+        suffix = _cross(left.suffix, right.exact) or set(right.exact)
+    elif right.emptyable:
+        suffix = right.suffix | left.suffix
+    else:
+        suffix = right.suffix
+
+    match = _and(left.match, right.match)
+    if exact is None:
+        # Les chaînes qui chevauchent la jonction des deux parties
+        if left.exact is not None:
+            match = _and(match, _trigrams_of(left.exact))
+        if right.exact is not None:
+            match = _and(match, _trigrams_of(right.exact))
+        junction = _cross(left.suffix, right.prefix)
+        if junction is not None:
+            match = _and(match, _trigrams_of(junction))
+
+    return _simplify(_Info(left.emptyable and right.emptyable, exact, prefix, suffix, match))
+
+
+def _alternate(left: _Info, right: _Info) -> _Info:
+    exact = None
+    if left.exact is not None and right.exact is not None and len(left.exact | right.exact) <= MAX_SET_SIZE:
+        exact = left.exact | right.exact
+    else:
+        # Les ensembles exacts abandonnés restent des préfixes/suffixes valides
+        for side in (left, right):
+            if side.exact is not None:
+                side.match = _and(side.match, _trigrams_of(side.exact))
+                side.prefix, side.suffix = set(side.exact), set(side.exact)
+    return _simplify(_Info(
+        left.emptyable or right.emptyable,
+        exact,
+        left.prefix | right.prefix,
+        left.suffix | right.suffix,
+        _or(left.match, right.match),
+    ))
+
+
+def _analyze_class(items) -> _Info:
+    chars: set[str] = set()
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            chars |= _char_variants(av)
+        elif op is sre_parse.RANGE and av[1] - av[0] < MAX_CLASS_SIZE:
+            for code in range(av[0], av[1] + 1):
+                chars |= _char_variants(code)
+        else:  # NEGATE, CATEGORY, grandes plages
+            return _any_char()
+        if len(chars) > MAX_CLASS_SIZE:
+            return _any_char()
+    return _chars(chars) if chars else _any_char()
+
+
+def _analyze_sequence(subpattern) -> _Info:
+    info = _empty()
+    for op, av in subpattern:
+        info = _concat(info, _analyze_node(op, av))
+    return info
+
+
+def _analyze_node(op, av) -> _Info:
+    if op is sre_parse.LITERAL:
+        return _chars(_char_variants(av))
+    if op is sre_parse.IN:
+        return _analyze_class(av)
+    if op in (sre_parse.NOT_LITERAL, sre_parse.ANY):
+        return _any_char()
+    if op is sre_parse.SUBPATTERN:
+        return _analyze_sequence(av[-1])
+    if op is getattr(sre_parse, "ATOMIC_GROUP", None):
+        return _analyze_sequence(av)
+    if op is sre_parse.BRANCH:
+        branches = [_analyze_sequence(branch) for branch in av[1]]
+        info = branches[0]
+        for branch in branches[1:]:
+            info = _alternate(info, branch)
+        return info
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)):
+        minimum, maximum, subpattern = av
+        inner = _analyze_sequence(subpattern)
+        if minimum == 0:
+            if maximum == 1:  # e?
+                return _alternate(inner, _empty())
+            return _any_string()
+        # e{m,n} = e^m suivi d'autre chose : toute correspondance commence par e^min(m, 3)
+        info = inner
+        for _ in range(min(minimum, 3) - 1):
+            info = _concat(info, inner)
+        if maximum == minimum and minimum <= 3:
+            return info
+        # ... et finit par une correspondance de e
+        return _simplify(_Info(
+            inner.emptyable,
+            None,
+            set(info.prefix if info.exact is None else info.exact),
+            set(inner.suffix if inner.exact is None else inner.exact),
+            _and(info.match, _trigrams_of(info.exact)) if info.exact is not None else info.match,
+        ))
+    if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return _empty()
+    # GROUPREF, GROUPREF_EXISTS, ... : aucune information exploitable
+    return _any_string()
+
+
+def analyze(regex: str) -> TrigramQuery:
+    """Trigram query that every book matching ``regex`` (case-insensitive) satisfies."""
+    info = _analyze_sequence(sre_parse.parse(regex, re.IGNORECASE))
+    if info.exact is not None:
+        return _and(info.match, _trigrams_of(info.exact))
+    match = _and(info.match, _trigrams_of(info.prefix))
+    return _and(match, _trigrams_of(info.suffix))
+
+
+# --- TRADUCTION SQL ---
+
+def to_sql(query: TrigramQuery, column: str = "trigrams") -> tuple[str | None, list]:
+    """
+    WHERE clause over the ``book_trigrams.trigrams`` BIGINT[] column (GIN-indexed):
+    AND of trigrams -> ``@>`` (contains all), OR of trigrams -> ``&&`` (overlaps).
+    Returns (None, []) for MATCH_ALL.
+    """
+    if query.op == "all":
+        return None, []
+    params: list = []
+    clauses = []
+    if query.trigrams:
+        operator = "@>" if query.op == "and" else "&&"
+        clauses.append(f"{column} {operator} %s::bigint[]")
+        params.append(sorted(trigram_key(trigram) for trigram in query.trigrams))
+    for child in query.children:
+        clause, child_params = to_sql(child, column)
+        clauses.append(f"({clause})")
+        params.extend(child_params)
+    joiner = " AND " if query.op == "and" else " OR "
+    return joiner.join(clauses), params
@@ -0,0 +1,220 @@
+"""Streaming, parallel regex verification with time and memory budgets.
+
+Books are read through a server-side cursor and grouped into chunks of at
+most ``regex_scan_chunk_chars`` characters. Each chunk is matched in a process
+pool; at most two chunks per worker are in flight, which bounds memory to a
+few chunks whatever the corpus size. Chunk results are consumed in book-id
+order, so the scan returns the same first ``size`` hits as a sequential scan
+and stops reading as soon as they are found.
+
+The whole scan shares one deadline. When it expires the hits found so far are
+returned with ``partial=True``. If chunks of this scan are still running (e.g. a
+catastrophically backtracking pattern), the shared pool is replaced so no
+worker stays pinned: the old pool is terminated and the next submission starts
+a new one. Concurrent scans poll the pool they submitted to while waiting;
+when it has been replaced, they resubmit their unfinished chunks to the new
+pool and carry on within their own deadline. A scan that finds its ``size``
+hits early stops reading and returns at once; its chunks still in flight are
+handed to a watchdog thread, which replaces the pool if they are still running
+when the scan's deadline expires.
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import psycopg2.extras
+
+SNIPPET_LENGTH = 280
+RETIRED_POLL_INTERVAL = 0.05  # secondes entre deux vérifications que le pool n'a pas été remplacé
+
+
+@dataclass
+class ScanResult:
+    matches: list[dict] = field(default_factory=list)  # id, title, author, image_url, snippet (par id croissant)
+    partial: bool = False  # budget de temps épuisé avant la fin du parcours
+    scanned: int = 0       # livres vérifiés
+
+
+@lru_cache(maxsize=32)
+def _compiled(regex: str) -> re.Pattern:
+    return re.compile(regex, re.IGNORECASE)
+
+
+def _match_chunk(regex: str, texts: list[str]) -> list[int]:
+    """(Process worker) Positions in ``texts`` of the books matched by ``regex``."""
+    pattern = _compiled(regex)
+    return [position for position, text in enumerate(texts) if text and pattern.search(text)]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn : pas de fork d'un processus multi-thread (serveur + pool de connexions)
+            _pool = multiprocessing.get_context("spawn").Pool(processes=workers)
+        return _pool
+
+
+def _retire_pool(pool) -> None:
+    """Kill the workers of ``pool``; the next submission starts a new pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.terminate()
+
+
+def _is_retired(pool) -> bool:
+    """True once ``pool`` has been replaced: its unfinished work will never complete."""
+    return _pool is not pool
+
+
+# Chunks abandonnés par un scan terminé tôt : (échéance, n°, pool, AsyncResults), tas par échéance
+_abandoned: list = []
+_abandoned_sequence = itertools.count()
+_watchdog_condition = threading.Condition()
+_watchdog = None
+
+
+def _watch_abandoned() -> None:
+    """(Watchdog thread) Retire a pool whose abandoned chunks outlive their scan's deadline."""
+    while True:
+        with _watchdog_condition:
+            while not _abandoned or _abandoned[0][0] > time.monotonic():
+                _watchdog_condition.wait(_abandoned[0][0] - time.monotonic() if _abandoned else None)
+            _, _, pool, pendings = heapq.heappop(_abandoned)
+        if any(not pending.ready() for pending in pendings) and not _is_retired(pool):
+            _retire_pool(pool)
+
+
+def _abandon(deadline: float, pool, pendings: list) -> None:
+    """Let ``pendings`` run until ``deadline``; past it, the watchdog retires ``pool``."""
+    global _watchdog
+    with _watchdog_condition:
+        heapq.heappush(_abandoned, (deadline, next(_abandoned_sequence), pool, pendings))
+        if _watchdog is None:
+            _watchdog = threading.Thread(target=_watch_abandoned, name="regex-scan-watchdog", daemon=True)
+            _watchdog.start()
+        _watchdog_condition.notify()
+
+
+def shutdown_pool() -> None:
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        _retire_pool(pool)
+
+
+def _read_chunks(cursor, candidate_ids: list[int] | None, fetch_size: int, chunk_chars: int):
+    """Yield (rows, texts) chunks read through a server-side cursor, ordered by book id."""
+    with cursor.connection.cursor(name="regex_scan", cursor_factory=psycopg2.extras.RealDictCursor) as books:
+        books.itersize = fetch_size
+        if candidate_ids is None:
+            books.execute("SELECT id, title, author, image_url, content FROM books ORDER BY id")
+        else:
+            books.execute(
+                "SELECT id, title, author, image_url, content FROM books WHERE id = ANY(%s) ORDER BY id",
+                (candidate_ids,)
+            )
+        rows, texts, chars = [], [], 0
+        for row in books:
+            text = row.pop("content") or ""
+            row["snippet"] = text[:SNIPPET_LENGTH]
+            rows.append(row)
+            texts.append(text)
+            chars += len(text)
+            if chars >= chunk_chars:
+                yield rows, texts
+                rows, texts, chars = [], [], 0
+        if rows:
+            yield rows, texts
+
+
+def scan(
+    cursor,
+    regex: str,
+    candidate_ids: list[int] | None,
+    size: int,
+    *,
+    workers: int,
+    time_budget: float,
+    fetch_size: int,
+    chunk_chars: int,
+) -> ScanResult:
+    """
+    First ``size`` books (by id) whose content matches ``regex``, among
+    ``candidate_ids`` (None = every book). Blocking: run it off the event loop.
+    """
+    deadline = time.monotonic() + time_budget
+    pool = _get_pool(workers)
+    result = ScanResult()
+    in_flight: deque = deque()  # (rows, texts, AsyncResult), par id croissant
+    chunks = _read_chunks(cursor, candidate_ids, fetch_size, chunk_chars)
+
+    def submit(texts: list[str]):
+        nonlocal pool
+        while True:
+            try:
+                return pool.apply_async(_match_chunk, (regex, texts))
+            except ValueError:  # "Pool not running" : remplacé par un autre scan depuis _get_pool
+                pool = _get_pool(workers)
+
+    def resubmit_unfinished() -> None:
+        nonlocal pool
+        pool = _get_pool(workers)
+        for index, (rows, texts, pending) in enumerate(in_flight):
+            if not pending.ready():
+                in_flight[index] = (rows, texts, submit(texts))
+
+    def collect_oldest() -> None:
+        while not in_flight[0][2].ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise multiprocessing.TimeoutError
+            in_flight[0][2].wait(min(remaining, RETIRED_POLL_INTERVAL))
+            if not in_flight[0][2].ready() and _is_retired(pool):
+                resubmit_unfinished()
+        rows, _, pending = in_flight.popleft()
+        positions = pending.get()
+        result.scanned += len(rows)
+        result.matches.extend(rows[position] for position in positions)
+
+    try:
+        for rows, texts in chunks:
+            in_flight.append((rows, texts, submit(texts)))
+            while in_flight and (len(in_flight) >= 2 * workers or in_flight[0][2].ready()):
+                collect_oldest()
+                if len(result.matches) >= size:
+                    break
+            if len(result.matches) >= size:
+                break
+            if time.monotonic() >= deadline:
+                raise multiprocessing.TimeoutError
+        while in_flight and len(result.matches) < size:
+            collect_oldest()
+        # Assez de résultats : les chunks encore en cours gardent le budget de ce scan, pas plus
+        unfinished = [pending for _, _, pending in in_flight if not pending.ready()]
+        if unfinished:
+            _abandon(deadline, pool, unfinished)
+    except multiprocessing.TimeoutError:
+        result.partial = True
+        # Seuls les chunks de ce scan bloquent encore : remplacer le pool libère les workers,
+        # les autres scans resoumettent leurs chunks au nouveau pool
+        if any(not pending.ready() for _, _, pending in in_flight) and not _is_retired(pool):
+            _retire_pool(pool)
+    finally:
+        chunks.close()
+
+    result.matches = result.matches[:size]
+    return result
@@ -0,0 +1,97 @@
+"""Bounded LRU/TTL cache of search responses, invalidated by the index generation.
+
+Entries are keyed by the normalized query (see ``search_service``) and tagged
+with the generation they were computed for: the ``corpus_stats`` generation,
+bumped by every ingestion batch and every graph write (``write_graph``), plus
+the identity of the mapped index segment.
+When the current generation differs from the cached one, the whole cache is
+dropped, so no response computed on an older index is ever served.
+
+The cache lives in each worker process; its counters are exposed by
+``GET /api/search/cache``.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from app.core.config import settings
+
+
+@dataclass
+class CacheCounters:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # LRU entries dropped to stay under max_entries
+    expirations: int = 0  # entries older than ttl found on lookup
+    invalidations: int = 0  # full clears after a generation change
+
+
+class ResultCache:
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.counters = CacheCounters()
+        self._generation: Hashable = None
+        # key -> (stored at, value), least recently used first
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _check_generation(self, generation: Hashable) -> None:
+        if generation != self._generation:
+            if self._entries:
+                self._entries.clear()
+                self.counters.invalidations += 1
+            self._generation = generation
+
+    def get(self, key: Hashable, generation: Hashable) -> Any | None:
+        """Cached value for ``key`` at ``generation``, or None (counted as a miss)."""
+        self._check_generation(generation)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.counters.expirations += 1
+            entry = None
+        if entry is None:
+            self.counters.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.counters.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, generation: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._check_generation(generation)
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.counters.hits + self.counters.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.counters.hits,
+            "misses": self.counters.misses,
+            "hit_rate": self.counters.hits / lookups if lookups else 0.0,
+            "evictions": self.counters.evictions,
+            "expirations": self.counters.expirations,
+            "invalidations": self.counters.invalidations,
+        }
+
+
+result_cache = ResultCache(
+    max_entries=settings.result_cache_max_entries,
+    ttl=settings.result_cache_ttl,
+)
@@ -1,19 +1,29 @@
 """Search service using BM25 ranking with PostgreSQL."""
 
-from typing import Any
+from typing import Any, Callable
 from fastapi import status
 from math import log
 from collections import defaultdict
+from functools import partial
+import os
 import re
 
 from app.core.config import settings
-from app.core.database import execute_query_all, execute_query_one
+from app.core.database import execute_query_all, run_with_cursor
 from app.schemas.search import SearchResponse, SearchResult, AdvancedSearchResponse
+from searchbook_text import tokenizer
 
 
 # debug
 import datetime
-from app.services import bm25
+from app.services import bm25, corpus_stats, index_segment, regex_prefilter, regex_scan, result_cache, snippets, topk
+
+
+# BM25 Constants
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
 class SearchServiceError(Exception):
     def __init__(self, message: str, status_code: int = status.HTTP_400_BAD_REQUEST) -> None:
         self.message = message
@@ -22,10 +32,8 @@ class SearchServiceError(Exception):
 
 
 def _tokenize(text: str) -> list[str]:
-    """Simple tokenization for BM25."""
-    text = text.lower()
-    tokens = re.findall(r'\b\w+\b', text)
-    return tokens
+    """Query words, normalized like the indexed words (shared tokenizer, LRU-cached)."""
+    return list(tokenizer.normalize_query(text, settings.query_language))
 
 
 async def search_books(query: str, size: int, sort_by: str = 'relevance') -> SearchResponse:
@@ -33,210 +41,310 @@ async def search_books(query: str, size: int, sort_by: str = 'relevance') -> Sea
         query_tokens = _tokenize(query)
         if not query_tokens:
             return SearchResponse(total=0, results=[])
-        
-        # --- OPTIMISATION 1 : Gestion du Tri Statique (Centralité) ---
+
+        # Les scores ne dépendent ni de l'ordre ni des répétitions des mots de la requête
+        cache_key = ('search', tuple(sorted(set(query_tokens))), sort_by, size)
+        generation = await _index_generation() if result_cache.result_cache.enabled else None
+        cached = result_cache.result_cache.get(cache_key, generation) if generation is not None else None
+        if cached is not None:
+            return cached
+
         if sort_by == 'centrality':
-            
-            order_col = 'closeness_score'
-            placeholders = ','.join(['%s'] * len(query_tokens))
-            
-            # 1. Requête SQL unique optimisée : Filtre, Jointure, Tri, Limite
-            # - Jointure interne sur inverted_index pour filtrer les livres qui contiennent les mots-clés.
-            # - GROUP BY pour s'assurer que chaque livre n'est retourné qu'une seule fois.
-            # - ORDER BY la métrique statique (closeness_score) pour le classement.
-            books_details = execute_query_all(
-                f"""
-                SELECT 
-                    b.id, 
-                    b.title, 
-                    b.author, 
-                    b.content AS text, 
-                    b.closeness_score,
-                    b.image_url,
-                    b.publication_year,
-                    COUNT(ii.book_id) AS matching_term_count  -- Compter combien de mots de la requête sont présents
-                FROM 
-                    books b
-                INNER JOIN 
-                    inverted_index ii ON b.id = ii.book_id
-                WHERE 
-                    ii.word IN ({placeholders})
-                GROUP BY 
-                    b.id, b.title, b.author, b.content, b.closeness_score, b.image_url, b.publication_year
-                ORDER BY 
-                    {order_col} DESC, 
-                    matching_term_count DESC -- Ajout d'un critère secondaire de départage
-                LIMIT %s
-                """,
-                tuple(query_tokens) + (size,)
-            )
+            response = await _search_by_centrality(query_tokens, size)
+        else:
+            response = await _search_by_relevance(query_tokens, size)
+
+        if generation is not None:
+            result_cache.result_cache.put(cache_key, generation, response)
+        return response
+
+    except Exception as exc:
+        raise SearchServiceError(f"Search failed: {str(exc)}", status.HTTP_500_INTERNAL_SERVER_ERROR) from exc
+
+
+async def _index_generation() -> tuple[int, tuple[int, int] | None]:
+    """Generation of the data a search reads: corpus_stats generation and mapped segment file."""
+    corpus = await corpus_stats.stats_cache.corpus()
+    segment = index_segment.get_index_segment(settings.index_segment_path)
+    return corpus.generation, segment.file_key if segment is not None else None
+
 
-            if not books_details:
-                return SearchResponse(total=0, results=[])
-
-            # 2. Formatter et Retourner les résultats
-            results: list[SearchResult] = []
-            for book in books_details:
-                 snippet = book['text'][:280] if book['text'] else ""
-                 
-                 results.append(SearchResult(
-                     id=str(book['id']),
-                     title=book['title'],
-                     author=book['author'],
-                     score=0.0, # BM25 non calculé (la pertinence est implicite par la présence du mot-clé)
-                     centrality_score=book.get('closeness_score'),
-                     image_url=book.get('image_url'),
-                     snippet=snippet,
-                 ))
-            
-            return SearchResponse(total=len(results), results=results)
-
-        # 2. On récupère toutes les occurrences des tokens de la requête dans l'index inversé
-        occurences_books = execute_query_all(
-            f"""
-            SELECT
-                ii.word, 
-                ii.frequency, 
-                b.id,
-                b.word_count
-            FROM inverted_index ii 
-            JOIN books b ON ii.book_id = b.id 
-            WHERE ii.word = ANY(%s)
-            """,
-            (query_tokens,)
+# Top-k par centralité : semi-jointure (EXISTS) des livres contenant au moins un mot,
+# parcourus dans l'ordre de idx_books_closeness. Pour un mot fréquent, le parcours
+# s'arrête après quelques livres (tri incrémental sur le second critère) ; pour un mot
+# rare, le planificateur part plutôt des postings (idx_inv_word_book). Seuls les
+# `size` gagnants sont ensuite relus pour l'affichage : le contenu des autres livres
+# (TOAST) n'est jamais lu.
+CENTRALITY_TOP_K_SQL = """
+    WITH top AS (
+        SELECT
+            b.id,
+            b.closeness_score,
+            (SELECT COUNT(*) FROM inverted_index ii
+             WHERE ii.book_id = b.id AND ii.word = ANY(%(words)s)) AS matching_term_count
+        FROM books b
+        WHERE EXISTS (
+            SELECT 1 FROM inverted_index ii
+            WHERE ii.book_id = b.id AND ii.word = ANY(%(words)s)
         )
+        ORDER BY b.closeness_score DESC, matching_term_count DESC
+        LIMIT %(size)s
+    )
+    SELECT
+        b.id,
+        b.title,
+        b.author,
+        LEFT(b.content, %(snippet_chars)s) AS text,
+        top.closeness_score,
+        b.image_url
+    FROM top
+    JOIN books b ON b.id = top.id
+    ORDER BY top.closeness_score DESC, top.matching_term_count DESC
+"""
 
-        rows = execute_query_all(
-            f"""
-            SELECT word, COUNT(*) AS doc_freq
-            FROM inverted_index
-            WHERE word = ANY(%s)
-            GROUP BY word
-            """,
-            (query_tokens,)
+
+async def _search_by_centrality(query_tokens: list[str], size: int) -> SearchResponse:
+    # --- OPTIMISATION 1 : Gestion du Tri Statique (Centralité) ---
+    books_details = await execute_query_all(
+        CENTRALITY_TOP_K_SQL,
+        {"words": list(dict.fromkeys(query_tokens)), "size": size, "snippet_chars": snippets.SNIPPET_CHARS},
+    )
+
+    results = [
+        SearchResult(
+            id=str(book['id']),
+            title=book['title'],
+            author=book['author'],
+            score=0.0,  # BM25 non calculé (la pertinence est implicite par la présence du mot-clé)
+            centrality_score=book.get('closeness_score'),
+            image_url=book.get('image_url'),
+            snippet=book['text'] or "",
         )
+        for book in books_details
+    ]
+    await _add_kwic_snippets(results, query_tokens)
+    return SearchResponse(total=len(results), results=results)
 
 
-        if not occurences_books or not rows:
-            return SearchResponse(total=0, results=[])
-        # --- STRATÉGIE PAR DÉFAUT : Tri par Pertinence (BM25) ---
-        stats = execute_query_one("SELECT COUNT(*) as N, AVG(word_count) as avgdl FROM books")
-        # rajouter l'heure
-        if not stats or stats['n'] == 0:
-             return SearchResponse(total=0, results=[])
-        
-        N = stats['n']
-        avgdl = float(stats['avgdl'] or 1) 
+async def _search_by_relevance(query_tokens: list[str], size: int) -> SearchResponse:
+    # --- STRATÉGIE PAR DÉFAUT : Tri par Pertinence (BM25) ---
+    segment = index_segment.get_index_segment(settings.index_segment_path)
+    if segment is not None:
+        postings, bm25_model, doc_length, book_id_of = _postings_from_segment(segment, query_tokens)
+    else:
+        postings, bm25_model, doc_length, book_id_of = await _postings_from_database(query_tokens)
 
-        # BM25 Constants
-        k1 = 1.5
-        b = 0.75
-        bm25_model = bm25.BM25(N, avgdl, k1, b)
-        
-        docs = defaultdict(lambda: {
-            "word_count": 0,
-            "words": {},
-        })
-
-        doc_freqs = {row["word"]: row["doc_freq"] for row in rows}
-
-        # 3. Calcul des Scores BM25
-        for book in occurences_books:  # chaque row = RealDictRow(...)
-            book_id = book["id"]
-            word = book["word"]
-            freq = book["frequency"]
-            word_count = book["word_count"]
-            docs[book_id]["word_count"] = word_count
-            docs[book_id]["words"][word] = {
-                "frequency": freq,
-                "number_documents": doc_freqs.get(word, 0)
-            }
+    if not postings:
+        return SearchResponse(total=0, results=[])
+
+    # 3. Top-k BM25 : seuls les `size` meilleurs livres sont retenus
+    k = min(size, settings.bm25_results_limit)
+    if settings.bm25_top_k_pruning:
+        def score(doc: int, tf: int, df: int) -> float:
+            return bm25_model.score(doc_length(doc), tf, df)
+
+        top_docs = topk.max_score_top_k(postings, k, score)
+    else:
+        top_docs = topk.batch_top_k(postings, k, bm25_model, doc_length)
+    scores = {book_id_of(doc): doc_score for doc, doc_score in top_docs}
+
+    # 4. Détails d'affichage pour les gagnants uniquement
+    taille_text = snippets.SNIPPET_CHARS
+    books_details = await execute_query_all(
+        f"""
+        SELECT 
+            id, 
+            title, 
+            author, 
+            LEFT(content, {taille_text}) AS text, -- OPTIMISATION : PostgreSQL coupe ici
+            image_url
+        FROM books 
+        WHERE id = ANY(%s)
+        """,
+        (list(scores),)
+    )
+
+    results: list[SearchResult] = []
+    for book in books_details:
         
+        results.append(SearchResult(
+            id=str(book['id']),
+            title=book['title'],
+            author=book['author'],
+            score=scores.get(book['id'], 0.0),
+            centrality_score=0.0,
+            image_url=book.get('image_url', ''),
+            snippet=book.get('text', '')
+        ))
+    # Tri décroissant par score BM25
+    results.sort(key=lambda r: r.score, reverse=True)
+    await _add_kwic_snippets(results, query_tokens)
 
-        scores = {}
-        for book_id, doc in docs.items():
-            scores[book_id] = bm25_model.score_query(doc)
-
-
-        # 4. Formatter et Retourner les résultats
-        results: list[SearchResult] = []
-
-        # 1. On prend les IDs des X meilleurs livres (triés par pertinence)
-        # top_ids = [doc_id for doc_id, score in ranked_docs[:size]]
-        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        # size = min(50, len(ranked))
-        # top_ids = [book_id for book_id, _ in ranked[:size]]
-        top_ids = [book_id for book_id, _ in ranked]
-        placeholders = ", ".join(["%s"] * len(top_ids))
-
-        taille_text = 280
-        books_details = execute_query_all(
-            f"""
-            SELECT 
-                id, 
-                title, 
-                author, 
-                LEFT(content, {taille_text}) AS text, -- OPTIMISATION : PostgreSQL coupe ici
-                image_url
-            FROM books 
-            WHERE id IN ({placeholders})
-            """,
-            tuple(top_ids)
-        )
+    return SearchResponse(total=len(results), results=results)
 
 
-        for book in books_details:
-            
-            results.append(SearchResult(
-                id=str(book['id']),
-                title=book['title'],
-                author=book['author'],
-                score=scores.get(book['id'], 0.0), # BM25 non calculé (la pertinence est implicite par la présence du mot-clé)
-                centrality_score=0.0,
-                image_url=book.get('image_url', ''),
-                snippet=book.get('text', '')
-            ))
-        # Tri décroissant par score BM25
-        results.sort(key=lambda r: r.score, reverse=True)
+async def _add_kwic_snippets(results: list[SearchResult], query_tokens: list[str]) -> None:
+    """Replace the first-characters snippet by the query-aware one when the book has positions."""
+    if not settings.kwic_snippets or not results:
+        return
+    by_id = await snippets.kwic_snippets([int(result.id) for result in results], query_tokens)
+    for result in results:
+        snippet = by_id.get(int(result.id))
+        if snippet:
+            result.snippet = snippet
 
 
-        return SearchResponse(total=len(results), results=results)
+def _upper_bound(bm25_model: bm25.BM25, min_doc_length: int, max_tf: int, df: int) -> float:
+    # Le score BM25 croît avec tf et décroît avec la longueur du document
+    return bm25_model.score(min_doc_length, max_tf, df)
+
+
+# (posting lists, modèle BM25, longueur d'un doc, doc -> id du livre)
+_RelevanceInputs = tuple[list[topk.PostingList], bm25.BM25 | None, Callable[[int], int] | None, Callable[[int], int] | None]
+
+
+def _postings_from_segment(segment: index_segment.IndexSegment, query_tokens: list[str]) -> _RelevanceInputs:
+    """Posting lists read from the memory-mapped segment, without any SQL round trip (docs = ordinals)."""
+    if segment.num_docs == 0:
+        return [], None, None, None
+    bm25_model = bm25.BM25(segment.num_docs, segment.avgdl, BM25_K1, BM25_B)
+
+    postings = []
+    for word in dict.fromkeys(query_tokens):
+        info = segment.lookup(word)
+        if info is None:
+            continue
+        ordinals, frequencies = segment.postings(info)
+        postings.append(topk.PostingList(
+            docs=ordinals,
+            frequencies=frequencies,
+            df=info.df,
+            upper_bound=_upper_bound(bm25_model, segment.min_doc_length, info.max_tf, info.df),
+        ))
+
+    return postings, bm25_model, segment.doc_lengths.__getitem__, segment.doc_ids.__getitem__
+
+
+async def _postings_from_database(query_tokens: list[str]) -> _RelevanceInputs:
+    """Posting lists read from the ``inverted_index`` table (docs = book ids)."""
+    # N, avgdl, df et tf max viennent des statistiques matérialisées (aucune agrégation)
+    corpus = await corpus_stats.stats_cache.corpus()
+    if corpus.num_docs == 0:
+        return [], None, None, None
+    term_stats = await corpus_stats.stats_cache.terms(query_tokens)
+    if not term_stats:
+        return [], None, None, None
+
+    # 2. On récupère toutes les occurrences des tokens de la requête dans l'index inversé,
+    # triées par livre pour le parcours top-k
+    occurences_books = await execute_query_all(
+        f"""
+        SELECT
+            ii.word, 
+            ii.frequency, 
+            b.id,
+            b.word_count
+        FROM inverted_index ii 
+        JOIN books b ON ii.book_id = b.id 
+        WHERE ii.word = ANY(%s)
+        ORDER BY ii.word, b.id
+        """,
+        (list(term_stats),)
+    )
+
+    if not occurences_books:
+        return [], None, None, None
+
+    bm25_model = bm25.BM25(corpus.num_docs, corpus.avgdl or 1, BM25_K1, BM25_B)
+
+    doc_lengths: dict[int, int] = {}
+    lists: dict[str, tuple[list[int], list[int]]] = defaultdict(lambda: ([], []))
+    for book in occurences_books:  # chaque row = RealDictRow(...)
+        docs, frequencies = lists[book["word"]]
+        docs.append(book["id"])
+        frequencies.append(book["frequency"])
+        doc_lengths[book["id"]] = book["word_count"]
+
+    min_doc_length = min(doc_lengths.values())
+    postings = []
+    for word, (docs, frequencies) in lists.items():
+        stats = term_stats[word]
+        # max() : un livre indexé depuis le dernier rafraîchissement ne doit pas dépasser la borne
+        max_tf = max(stats.max_tf, max(frequencies))
+        postings.append(topk.PostingList(
+            docs=docs,
+            frequencies=frequencies,
+            df=stats.doc_freq,
+            upper_bound=_upper_bound(bm25_model, min_doc_length, max_tf, stats.doc_freq),
+        ))
+
+    return postings, bm25_model, doc_lengths.__getitem__, int
 
-    except Exception as exc:
-        # ... (Gestion des erreurs) ...
-        pass
 
 async def regex_search(regex: str, size: int) -> AdvancedSearchResponse:
-    """Advanced search using regex."""
+    """Advanced search using regex, prefiltered by the trigram index."""
     try:
-        # Compile regex
-        pattern = re.compile(regex, re.IGNORECASE)
-        
-        # Fetch all books
-        all_books = execute_query_all("SELECT id, title, author, content AS text, word_count, image_url FROM books ORDER BY id")
-        
-        results: list[SearchResult] = []
-        for book in all_books:
-            text = book['text']
-            if pattern.search(text):
-                snippet = text[:280] if text else ""
-                results.append(SearchResult(
-                    id=str(book['id']),
-                    title=book['title'],
-                    author=book['author'],
-                    score=None,
-                    centrality_score=None,
-                    image_url=book.get('image_url'),
-                    snippet=snippet,
-                ))
-                if len(results) >= size:
-                    break
-        
-        return AdvancedSearchResponse(total=len(results), results=results, regex=regex)
+        # Compile regex (validation : l'erreur est remontée avant tout accès à la base)
+        re.compile(regex, re.IGNORECASE)
+
+        cache_key = ('regex', regex, size)
+        generation = await _index_generation() if result_cache.result_cache.enabled else None
+        cached = result_cache.result_cache.get(cache_key, generation) if generation is not None else None
+        if cached is not None:
+            return cached
+
+        # Candidats : livres dont les trigrammes satisfont la requête déduite de la regex,
+        # plus ceux qui n'ont pas encore de trigrammes. Sans littéral exploitable : tous les livres.
+        where, params = regex_prefilter.to_sql(regex_prefilter.analyze(regex))
+        if where is None:
+            candidate_ids = None
+        else:
+            candidates = await execute_query_all(
+                f"""
+                SELECT b.id
+                FROM books b
+                WHERE b.id IN (SELECT book_id FROM book_trigrams WHERE {where})
+                   OR NOT EXISTS (SELECT 1 FROM book_trigrams t WHERE t.book_id = b.id)
+                ORDER BY b.id
+                """,
+                tuple(params)
+            )
+            candidate_ids = [row['id'] for row in candidates]
+
+        # Vérification en flux (curseur serveur) et en parallèle, sous budget de temps
+        scan = await run_with_cursor(
+            partial(
+                regex_scan.scan,
+                workers=settings.regex_scan_workers or os.cpu_count() or 1,
+                time_budget=settings.regex_scan_time_budget,
+                fetch_size=settings.regex_scan_fetch_size,
+                chunk_chars=settings.regex_scan_chunk_chars,
+            ),
+            regex,
+            candidate_ids,
+            size,
+        )
+
+        results = [
+            SearchResult(
+                id=str(book['id']),
+                title=book['title'],
+                author=book['author'],
+                score=None,
+                centrality_score=None,
+                image_url=book.get('image_url'),
+                snippet=book['snippet'],
+            )
+            for book in scan.matches
+        ]
+
+        response = AdvancedSearchResponse(total=len(results), results=results, regex=regex, partial=scan.partial)
+        # Un résultat partiel (budget de temps épuisé) n'est pas mis en cache
+        if generation is not None and not scan.partial:
+            result_cache.result_cache.put(cache_key, generation, response)
+        return response
     
     except re.error as exc:
         raise SearchServiceError(f"Invalid regex: {str(exc)}", status.HTTP_400_BAD_REQUEST) from exc
     except Exception as exc:
         raise SearchServiceError(f"Regex search failed: {str(exc)}", status.HTTP_500_INTERNAL_SERVER_ERROR) from exc
-
-
@@ -0,0 +1,95 @@
+"""Keyword-in-context snippets built from the positional index (``term_positions``).
+
+Ingestion stores, for each (book, word), the character offsets of the first
+occurrences of the word in ``books.content``, delta-encoded as LEB128 varints
+(``searchbook_text.encoding``, shared with ``ingestion/positional_index.py``). For each result book, the window of
+``SNIPPET_CHARS`` characters that holds the most distinct query words (then the
+most occurrences) is found from those offsets alone, and only that range of the
+content is read with ``substr``. Books without positions keep their
+``LEFT(content, SNIPPET_CHARS)`` snippet.
+"""
+
+from collections import defaultdict
+
+from searchbook_text.encoding import decode_deltas
+
+from app.core.database import execute_query_all
+
+SNIPPET_CHARS = 280
+ELLIPSIS = "…"
+# Characters searched for a word boundary at each end of the window
+_BOUNDARY_SLACK = 24
+
+
+def best_window(occurrences: list[tuple[int, str]], width: int) -> tuple[int, int]:
+    """
+    (start, end) of the span of occurrences, sorted by offset, that fits in ``width``
+    characters and covers the most distinct words, then the most occurrences.
+    """
+    counts: dict[str, int] = defaultdict(int)
+    best, best_key = (occurrences[0][0], occurrences[0][0] + len(occurrences[0][1])), (0, 0)
+    first = 0
+    for last, (offset, word) in enumerate(occurrences):
+        counts[word] += 1
+        end = offset + len(word)
+        while end - occurrences[first][0] > width:
+            dropped = occurrences[first][1]
+            counts[dropped] -= 1
+            if not counts[dropped]:
+                del counts[dropped]
+            first += 1
+        key = (len(counts), last - first + 1)
+        if key > best_key:
+            best, best_key = (occurrences[first][0], end), key
+    return best
+
+
+def _centered(span: tuple[int, int], width: int) -> int:
+    start, end = span
+    return max(0, start - (width - (end - start)) // 2)
+
+
+def _trim(text: str, at_start: bool, at_end: bool) -> str:
+    """Cut partial words at both ends of the window and mark the cuts."""
+    if not at_start:
+        space = text.find(" ", 0, _BOUNDARY_SLACK)
+        text = ELLIPSIS + (text[space + 1:] if space >= 0 else text)
+    if not at_end:
+        space = text.rfind(" ", len(text) - _BOUNDARY_SLACK)
+        text = (text[:space] if space > 0 else text) + ELLIPSIS
+    return " ".join(text.split())
+
+
+async def kwic_snippets(book_ids: list[int], words: list[str], width: int = SNIPPET_CHARS) -> dict[int, str]:
+    """Snippets centered on the best window of query words, for the books that have positions."""
+    if not book_ids or not words:
+        return {}
+    rows = await execute_query_all(
+        "SELECT book_id, word, positions FROM term_positions WHERE book_id = ANY(%s) AND word = ANY(%s)",
+        (list(book_ids), list(dict.fromkeys(words))),
+    )
+    occurrences: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    for row in rows:
+        occurrences[row["book_id"]].extend((offset, row["word"]) for offset in decode_deltas(bytes(row["positions"])))
+    if not occurrences:
+        return {}
+
+    starts = {}
+    for book_id, book_occurrences in occurrences.items():
+        book_occurrences.sort()
+        starts[book_id] = _centered(best_window(book_occurrences, width), width)
+
+    ids = list(starts)
+    windows = await execute_query_all(
+        """
+        SELECT w.id, substr(b.content, w.start + 1, w.length) AS text
+        FROM unnest(%s::int[], %s::int[], %s::int[]) AS w(id, start, length)
+        JOIN books b ON b.id = w.id
+        """,
+        # Un caractère de plus pour savoir si la fenêtre atteint la fin du livre (length() lirait tout le contenu)
+        (ids, [starts[book_id] for book_id in ids], [width + 1] * len(ids)),
+    )
+    return {
+        row["id"]: _trim(row["text"][:width], starts[row["id"]] == 0, len(row["text"]) <= width)
+        for row in windows
+    }
@@ -16,20 +16,24 @@ class SuggestionsServiceError(Exception):
 
 
 async def get_suggestions(book_id: str, limit: int) -> SuggestionsResponse:
-    """Get similar books based on Jaccard similarity."""
+    """
+    Neighbors of the book in the Jaccard graph, most popular first. The top
+    neighbors are precomputed per book (``book_neighbors``, maintained by ingestion),
+    so this is one primary-key lookup; only the popularity ranking of that short
+    list happens per request.
+    """
     try:
-        # Verify book exists (unless requesting general suggestions with id=0)
-        if int(book_id) != 0:
-            book = execute_query_one("SELECT id FROM books WHERE id = %s", (int(book_id),))
-            if not book:
-                raise SuggestionsServiceError("Book not found", status.HTTP_404_NOT_FOUND)
-        
-        # Fetch similar books using stored procedure (returns popular books)
-        similar = execute_query_all(
+        similar = await execute_query_all(
             "SELECT * FROM get_suggestions(%s, %s)",
             (int(book_id), limit)
         )
-        
+
+        # No neighbors: unknown book, or a book with no edge (id 0 = general suggestions)
+        if not similar and int(book_id) != 0:
+            book = await execute_query_one("SELECT id FROM books WHERE id = %s", (int(book_id),))
+            if not book:
+                raise SuggestionsServiceError("Book not found", status.HTTP_404_NOT_FOUND)
+
         suggestions = [
             Suggestion(
                 id=str(row['similar_book_id']),
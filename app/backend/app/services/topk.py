@@ -0,0 +1,116 @@
+"""Top-k retrieval over posting lists (exhaustive, vectorized and MaxScore-pruned)."""
+
+import heapq
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Callable, Sequence
+
+import numpy as np
+
+from app.services.bm25 import BM25
+
+# score(doc, tf, df) -> float
+ScoreFunction = Callable[[int, int, int], float]
+
+# Marge relative sur les bornes : une borne calculée avec la même formule que le
+# score pourrait lui être inférieure d'un ulp et écarter un document à tort.
+_UPPER_BOUND_SLACK = 1 + 1e-9
+
+
+@dataclass
+class PostingList:
+    docs: Sequence[int]         # clés des documents, triées par ordre croissant
+    frequencies: Sequence[int]  # tf, parallèle à docs
+    df: int
+    upper_bound: float = float("inf")  # score maximal qu'un document peut tirer de ce terme
+
+
+def exhaustive_top_k(postings: list[PostingList], k: int, score: ScoreFunction) -> list[tuple[int, float]]:
+    """Score every matching document and keep the k best, best first."""
+    scores: dict[int, float] = {}
+    for posting in postings:
+        for doc, tf in zip(posting.docs, posting.frequencies):
+            scores[doc] = scores.get(doc, 0.0) + score(doc, tf, posting.df)
+    return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def batch_top_k(
+    postings: list[PostingList], k: int, bm25_model: BM25, doc_length: Callable[[int], int]
+) -> list[tuple[int, float]]:
+    """Score every matching document in one vectorized pass (``BM25.score_batch``) and keep the k best."""
+    postings = [p for p in postings if p.docs]
+    if k <= 0 or not postings:
+        return []
+    doc_ids = np.concatenate([np.asarray(p.docs, dtype=np.int64) for p in postings])
+    frequencies = np.concatenate([np.asarray(p.frequencies, dtype=np.int64) for p in postings])
+    doc_freqs = np.concatenate([np.full(len(p.docs), p.df, dtype=np.int64) for p in postings])
+    doc_lengths = np.fromiter((doc_length(doc) for doc in doc_ids.tolist()), dtype=np.int64, count=len(doc_ids))
+
+    unique_docs, scores = bm25_model.score_batch(doc_ids, frequencies, doc_lengths, doc_freqs)
+    best = np.argsort(-scores, kind="stable")[:k]
+    return [(int(unique_docs[i]), float(scores[i])) for i in best]
+
+
+def max_score_top_k(postings: list[PostingList], k: int, score: ScoreFunction) -> list[tuple[int, float]]:
+    """
+    MaxScore top-k (Turtle & Flood): same result as ``exhaustive_top_k``, fewer documents scored.
+
+    Terms are ordered by upper bound. Once the heap holds k documents, the
+    longest prefix of terms whose bounds sum to at most the current threshold is
+    "non-essential": a document that only contains those terms cannot enter the
+    top k, so candidates are drawn from the essential lists only, and
+    non-essential lists are probed (binary search) only while the candidate can
+    still beat the threshold.
+    """
+    postings = sorted((p for p in postings if p.docs), key=lambda p: p.upper_bound)
+    if k <= 0 or not postings:
+        return []
+
+    bounds = [p.upper_bound * _UPPER_BOUND_SLACK for p in postings]
+    cumulative_bounds = list(accumulate(bounds))
+    positions = [0] * len(postings)
+    heap: list[tuple[float, int]] = []  # (score, -doc) : le plus faible score est en tête
+    threshold = float("-inf")
+    first_essential = 0
+
+    while True:
+        candidate = None
+        for i in range(first_essential, len(postings)):
+            if positions[i] < len(postings[i].docs):
+                doc = postings[i].docs[positions[i]]
+                if candidate is None or doc < candidate:
+                    candidate = doc
+        if candidate is None:
+            break
+
+        total = 0.0
+        for i in range(first_essential, len(postings)):
+            posting = postings[i]
+            position = positions[i]
+            if position < len(posting.docs) and posting.docs[position] == candidate:
+                total += score(candidate, posting.frequencies[position], posting.df)
+                positions[i] = position + 1
+
+        for i in range(first_essential - 1, -1, -1):
+            if total + cumulative_bounds[i] <= threshold:
+                break
+            posting = postings[i]
+            position = bisect_left(posting.docs, candidate, positions[i])
+            positions[i] = position
+            if position < len(posting.docs) and posting.docs[position] == candidate:
+                total += score(candidate, posting.frequencies[position], posting.df)
+
+        if len(heap) < k:
+            heapq.heappush(heap, (total, -candidate))
+        elif total > threshold:
+            heapq.heapreplace(heap, (total, -candidate))
+        else:
+            continue
+
+        if len(heap) == k:
+            threshold = heap[0][0]
+            while first_essential < len(postings) and cumulative_bounds[first_essential] <= threshold:
+                first_essential += 1
+
+    return [(-negated_doc, total) for total, negated_doc in sorted(heap, reverse=True)]
@@ -0,0 +1 @@
+"""Performance benchmarks for the SearchBook backend (run from app/backend with ``python -m``)."""
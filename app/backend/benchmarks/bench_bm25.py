@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: scalar ``BM25.score_query`` vs vectorized ``BM25.score_batch``.
+
+    python -m benchmarks.bench_bm25 [--postings 10000 100000] [--repeat 5]
+
+Each run builds a synthetic query (3 terms, Zipf-like frequencies) with the
+requested number of matching postings, checks that both paths return exactly
+the same scores, then reports the best wall-clock time of each.
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.services.bm25 import BM25
+
+NUM_TERMS = 3
+
+
+def make_postings(num_postings: int, num_docs: int, seed: int = 42):
+    """Parallel arrays (term, doc id, tf, dl, df) sorted by term, then doc id."""
+    rng = random.Random(seed)
+    doc_lengths = [rng.randint(10_000, 200_000) for _ in range(num_docs)]
+    per_term = num_postings // NUM_TERMS
+
+    terms, doc_ids, frequencies, lengths, doc_freqs = [], [], [], [], []
+    for term in range(NUM_TERMS):
+        docs = sorted(rng.sample(range(num_docs), per_term))
+        for doc in docs:
+            terms.append(term)
+            doc_ids.append(doc)
+            frequencies.append(max(1, int(rng.paretovariate(1.2))))
+            lengths.append(doc_lengths[doc])
+            doc_freqs.append(per_term)
+    return terms, doc_ids, frequencies, lengths, doc_freqs, sum(doc_lengths) / num_docs
+
+
+def scalar_scores(model: BM25, terms, doc_ids, frequencies, lengths, doc_freqs) -> dict[int, float]:
+    """Same dict-per-document construction as the original SQL relevance path."""
+    docs = defaultdict(lambda: {"word_count": 0, "words": {}})
+    for term, doc, tf, dl, df in zip(terms, doc_ids, frequencies, lengths, doc_freqs):
+        docs[doc]["word_count"] = dl
+        docs[doc]["words"][term] = {"frequency": tf, "number_documents": df}
+    return {doc: model.score_query(info) for doc, info in docs.items()}
+
+
+def best_of(repeat: int, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--postings", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'postings':>10} {'scalar (ms)':>12} {'batch (ms)':>12} {'speed-up':>9}")
+    for num_postings in args.postings:
+        terms, doc_ids, frequencies, lengths, doc_freqs, avgdl = make_postings(num_postings, num_docs=num_postings)
+        model = BM25(N=num_postings, avgdl=avgdl)
+        arrays = (np.array(doc_ids), np.array(frequencies), np.array(lengths), np.array(doc_freqs))
+
+        scalar_time, expected = best_of(args.repeat, scalar_scores, model, terms, doc_ids, frequencies, lengths, doc_freqs)
+        batch_time, (unique_ids, scores) = best_of(args.repeat, model.score_batch, *arrays)
+
+        assert unique_ids.tolist() == sorted(expected)
+        assert scores.tolist() == [expected[doc] for doc in unique_ids.tolist()], "score_batch diverges from score_query"
+        print(f"{num_postings:>10} {scalar_time * 1000:>12.2f} {batch_time * 1000:>12.2f} {scalar_time / batch_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: centrality-sorted search, original GROUP BY query vs top-k semi-join.
+
+    python -m benchmarks.bench_centrality [--terms 5] [--words love war] [--size 10] [--repeat 5]
+
+Runs against the configured database (SEARCHBOOK_DB_* settings). By default the
+queried words are the most frequent ones of ``term_stats``, the case where the
+original query reads (and de-TOASTs) the content of almost every book. Both
+queries must return the same closeness ranking (books tied on closeness and on
+the number of matching words may come in any order); the best and median
+wall-clock times of each are reported, along with the speed-up.
+"""
+
+import argparse
+import statistics
+import time
+
+import psycopg2.extras
+
+from app.core.database import get_db_connection
+from app.services.search_service import CENTRALITY_TOP_K_SQL
+from app.services.snippets import SNIPPET_CHARS
+
+# Original query: b.content is read and grouped for every matching book
+ORIGINAL_SQL = """
+    SELECT
+        b.id,
+        b.title,
+        b.author,
+        b.content AS text,
+        b.closeness_score,
+        b.image_url,
+        b.publication_year,
+        COUNT(ii.book_id) AS matching_term_count
+    FROM books b
+    INNER JOIN inverted_index ii ON b.id = ii.book_id
+    WHERE ii.word IN %(words_tuple)s
+    GROUP BY b.id, b.title, b.author, b.content, b.closeness_score, b.image_url, b.publication_year
+    ORDER BY closeness_score DESC, matching_term_count DESC
+    LIMIT %(size)s
+"""
+
+
+def common_words(cursor, count: int) -> list[str]:
+    cursor.execute("SELECT word, doc_freq FROM term_stats ORDER BY doc_freq DESC LIMIT %s", (count,))
+    return [row["word"] for row in cursor.fetchall()]
+
+
+def run(cursor, query: str, params: dict, repeat: int) -> tuple[list[float], list[float]]:
+    timings, scores = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+        scores = [row["closeness_score"] for row in rows]
+    return timings, scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=5, help="Number of most frequent words to query, one at a time")
+    parser.add_argument("--words", nargs="+", default=None, help="Query these words instead")
+    parser.add_argument("--size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute("SELECT COUNT(*) AS n FROM books")
+            num_books = cursor.fetchone()["n"]
+            queries = [[word] for word in args.words] if args.words else [[w] for w in common_words(cursor, args.terms)]
+            print(f"{num_books} books, size={args.size}, best / median of {args.repeat} runs")
+            print(f"{'query':<20} {'df':>7} {'original (ms)':>16} {'top-k (ms)':>16} {'speed-up':>9}")
+
+            for words in queries:
+                params = {"words": words, "words_tuple": tuple(words), "size": args.size, "snippet_chars": SNIPPET_CHARS}
+                cursor.execute("SELECT COALESCE(SUM(doc_freq), 0) AS df FROM term_stats WHERE word = ANY(%s)", (words,))
+                df = cursor.fetchone()["df"]
+
+                original_times, original_scores = run(cursor, ORIGINAL_SQL, params, args.repeat)
+                top_k_times, top_k_scores = run(cursor, CENTRALITY_TOP_K_SQL, params, args.repeat)
+                assert original_scores == top_k_scores, f"rankings differ for {words}"
+
+                original, top_k = min(original_times), min(top_k_times)
+                print(
+                    f"{' '.join(words):<20} {df:>7} "
+                    f"{original * 1000:>7.1f} / {statistics.median(original_times) * 1000:>6.1f} "
+                    f"{top_k * 1000:>7.1f} / {statistics.median(top_k_times) * 1000:>6.1f} "
+                    f"{original / top_k:>8.1f}x"
+                )
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: throughput of the shared tokenizer (``searchbook_text``).
+
+    python -m benchmarks.bench_tokenizer [--path /app/datasets/sample_books] [--size-mb 8] [--repeat 3]
+
+(outside the backend image, run it from app/backend with ``PYTHONPATH=..``)
+
+Tokenizes the ``.txt`` files of ``--path``, or a synthetic English/French text
+of ``--size-mb`` megabytes, with:
+
+* ``reference``: whole-text NFD, regex punctuation removal, split, stopwords;
+* ``shared``: ``tokenizer.tokenize`` (one ``str.translate`` pass);
+* ``old-query``: the former backend query tokenizer (``\\b\\w+\\b``, no accent
+  stripping, no stopwords), for scale only: it does not produce indexed terms.
+
+``reference`` and ``shared`` must return the same tokens. Throughput is reported
+in MB/s of UTF-8 input (best of ``--repeat`` runs). Query normalization is then
+timed on ``--queries`` distinct queries, cold and through the LRU cache.
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+import unicodedata
+
+from searchbook_text import tokenizer
+
+_REMOVED = re.compile(r"[^\w\s'-]", re.UNICODE)
+_WORDS = (
+    "the whale sea captain ship love war peace man woman house night day heart "
+    "était été élève château forêt cœur mère père enfant français où déjà après "
+    "naïve façade Ærø straße l'amour aujourd'hui well-known don't"
+).split()
+
+
+def reference_tokenize(content: str, language: str = tokenizer.DEFAULT_LANGUAGE) -> list[str]:
+    text = unicodedata.normalize("NFD", content.lower())
+    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+    return tokenizer.filter_stop_words(_REMOVED.sub(" ", text).split(), language)
+
+
+def old_query_tokenize(content: str) -> list[str]:
+    return re.findall(r"\b\w+\b", content.lower())
+
+
+def synthetic_text(size_mb: float, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    # Fréquences de type Zipf, ponctuation et retours à la ligne comme dans un livre
+    weights = [1 / (rank + 1) for rank in range(len(_WORDS))]
+    parts, size = [], 0
+    while size < size_mb * 1_000_000:
+        sentence = " ".join(rng.choices(_WORDS, weights, k=rng.randint(5, 20)))
+        sentence = sentence.capitalize() + rng.choice([". ", ", ", "! ", "? ", ";\n", ".\n\n"])
+        parts.append(sentence)
+        size += len(sentence.encode("utf-8"))
+    return "".join(parts)
+
+
+def load_texts(path: str) -> str:
+    texts = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".txt"):
+            with open(os.path.join(path, name), encoding="utf-8", errors="ignore") as handle:
+                texts.append(handle.read())
+    return "\n".join(texts)
+
+
+def best_time(func, text: str, repeat: int) -> tuple[float, list[str]]:
+    best, tokens = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=None, help="Directory of Gutenberg .txt files (default: synthetic text)")
+    parser.add_argument("--size-mb", type=float, default=8.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=tokenizer.QUERY_CACHE_SIZE, help="Distinct queries (at most the cache size)")
+    args = parser.parse_args()
+
+    text = load_texts(args.path) if args.path else synthetic_text(args.size_mb)
+    megabytes = len(text.encode("utf-8")) / 1_000_000
+    print(f"{megabytes:.1f} MB of text, best of {args.repeat} runs")
+    print(f"{'tokenizer':<12} {'time (s)':>9} {'MB/s':>8} {'tokens':>11}")
+
+    results = {}
+    for name, func in (("reference", reference_tokenize), ("shared", tokenizer.tokenize), ("old-query", old_query_tokenize)):
+        elapsed, tokens = best_time(func, text, args.repeat)
+        results[name] = tokens
+        print(f"{name:<12} {elapsed:>9.3f} {megabytes / elapsed:>8.1f} {len(tokens):>11}")
+    assert results["reference"] == results["shared"], "shared tokenizer differs from the reference"
+
+    rng = random.Random(7)
+    queries = [" ".join(rng.choices(_WORDS, k=rng.randint(1, 4))) + f" {i}" for i in range(args.queries)]
+    tokenizer.normalize_query.cache_clear()
+    for label in ("cold", "cached"):
+        start = time.perf_counter()
+        for query in queries:
+            tokenizer.normalize_query(query)
+        elapsed = time.perf_counter() - start
+        print(f"normalize_query ({label}): {len(queries) / elapsed:,.0f} queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Load test: concurrent request mixes against the API, with latency percentiles
+per endpoint and a regression check against a stored baseline.
+
+    # From app/backend (PYTHONPATH=.. makes the shared searchbook_text package importable)
+    # 1. Seed the configured database (SEARCHBOOK_DB_*) with a reproducible corpus
+    PYTHONPATH=.. python -m benchmarks.load_test seed --books 200 --seed 42 [--reset]
+
+    # 2. Drive the API and compare with the baseline
+    PYTHONPATH=.. python -m benchmarks.load_test run --url http://localhost:8000 --concurrency 16 --duration 30 \\
+        --mix search=40,centrality=10,advanced=10,suggestions=20,book=20 \\
+        --output results.json --baseline benchmarks/baselines/local.json
+
+``seed`` writes deterministic Gutenberg-format books with
+``ingestion/generate_corpus.py`` (same ``--seed`` = same corpus) and runs
+``ingestion/load_books.py`` on them; ``--reset`` empties the
+tables first. ``run`` samples query words from ``term_stats`` and book ids from
+``books`` (seeded too), then ``--concurrency`` clients send requests for
+``--duration`` seconds, after ``--warmup`` seconds that are not measured. The
+endpoint of each request is drawn from ``--mix`` (relative weights).
+
+Without ``--url`` the application is driven in-process (ASGI transport): no
+server is needed, but the clients share the event loop of the app, so numbers
+are only comparable with baselines taken the same way. ``ASGITransport`` does
+not run the app lifespan, so the load test enters it itself: the connection
+pool, the regex scan pool and the click aggregator run as in a server.
+
+Reported per endpoint: requests, errors (status >= 400 or transport error),
+throughput and p50/p95/p99 latency. ``--save-baseline`` stores the results;
+``--baseline`` fails the run (exit status 1) when an endpoint's p50 or p95
+latency grows, or its throughput drops, by more than ``--tolerance`` (default
+25%), or when its error rate grows by more than one point.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlencode
+
+import httpx
+import psycopg2.extras
+
+from app.core.config import settings
+from app.core.database import get_db_connection
+
+INGESTION_DIR = Path(__file__).resolve().parents[2] / "ingestion"
+DEFAULT_MIX = "search=40,centrality=10,advanced=10,suggestions=20,book=20"
+
+
+# --- Seeding ---
+
+def reset_database() -> None:
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("TRUNCATE books, term_stats, terms RESTART IDENTITY CASCADE")
+            cursor.execute("SELECT rebuild_corpus_stats()")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def seed(args: argparse.Namespace) -> None:
+    if args.reset:
+        reset_database()
+    env = os.environ | {
+        "POSTGRES_HOST": settings.db_host,
+        "POSTGRES_DB": settings.db_name,
+        "POSTGRES_USER": settings.db_user,
+        "POSTGRES_PASSWORD": settings.db_password,
+    }
+    with tempfile.TemporaryDirectory(prefix="searchbook-load-") as directory:
+        subprocess.run(
+            [sys.executable, "generate_corpus.py", "--output", directory, "--books", str(args.books),
+             "--words", str(args.words), "--seed", str(args.seed)],
+            cwd=args.ingestion_dir, check=True,
+        )
+        subprocess.run(
+            [sys.executable, "load_books.py", "--path", directory, "--min-words", str(args.words // 4)],
+            cwd=args.ingestion_dir, env=env, check=True,
+        )
+
+
+# --- Load ---
+
+@dataclass
+class Workload:
+    words: list[str]
+    book_ids: list[int]
+
+    @classmethod
+    def load(cls, sample: int, rng: random.Random) -> "Workload":
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                # Mots tirés parmi les plus fréquents : longues listes de postings, le cas coûteux
+                cursor.execute("SELECT word FROM term_stats ORDER BY doc_freq DESC, word LIMIT %s", (sample * 10,))
+                words = [row["word"] for row in cursor.fetchall()]
+                cursor.execute("SELECT id FROM books ORDER BY id")
+                book_ids = [row["id"] for row in cursor.fetchall()]
+            conn.rollback()
+        finally:
+            conn.close()
+        if not words or not book_ids:
+            raise SystemExit("Empty database: run the 'seed' command first")
+        return cls(words=rng.sample(words, min(sample, len(words))), book_ids=book_ids)
+
+    def request(self, endpoint: str, rng: random.Random) -> str:
+        if endpoint in ("search", "centrality"):
+            query = " ".join(rng.sample(self.words, rng.randint(1, min(3, len(self.words)))))
+            sort_by = "centrality" if endpoint == "centrality" else "relevance"
+            return f"{settings.api_prefix}/search?" + urlencode({"query": query, "size": 10, "sort_by": sort_by})
+        if endpoint == "advanced":
+            word = rng.choice(self.words)
+            return f"{settings.api_prefix}/search/advanced?" + urlencode({"regex": f"{word[:3]}[a-z]*", "size": 10})
+        if endpoint == "suggestions":
+            return f"{settings.api_prefix}/suggestions?" + urlencode({"book_id": rng.choice(self.book_ids)})
+        if endpoint == "book":
+            return f"{settings.api_prefix}/books/{rng.choice(self.book_ids)}"
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+@dataclass
+class Samples:
+    latencies: list[float] = field(default_factory=list)  # secondes, requêtes réussies et en erreur
+    errors: int = 0
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+async def client(http: httpx.AsyncClient, workload: Workload, mix: dict[str, float], rng: random.Random,
+                 samples: dict[str, Samples], measure_from: float, stop_at: float) -> None:
+    endpoints, weights = list(mix), list(mix.values())
+    while (now := time.perf_counter()) < stop_at:
+        endpoint = rng.choices(endpoints, weights)[0]
+        url = workload.request(endpoint, rng)
+        try:
+            response = await http.get(url)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if now >= measure_from:
+            sample = samples[endpoint]
+            sample.latencies.append(time.perf_counter() - now)
+            sample.errors += failed
+
+
+def summarize(samples: Samples, duration: float) -> dict:
+    latencies = sorted(samples.latencies)
+    return {
+        "requests": len(latencies),
+        "errors": samples.errors,
+        "error_rate": samples.errors / len(latencies) if latencies else 0.0,
+        "throughput": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def drive(args: argparse.Namespace) -> dict:
+    mix = parse_mix(args.mix)
+    workload = Workload.load(args.sample_words, random.Random(args.seed))
+    samples = {endpoint: Samples() for endpoint in mix}
+
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            http = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency))
+        else:
+            from app.main import app
+            # ASGITransport n'exécute pas le lifespan : pools et agrégateur de vues démarrés ici
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=args.timeout)
+        await stack.enter_async_context(http)
+
+        start = time.perf_counter()
+        measure_from, stop_at = start + args.warmup, start + args.warmup + args.duration
+        await asyncio.gather(*(
+            client(http, workload, mix, random.Random(args.seed + number), samples, measure_from, stop_at)
+            for number in range(args.concurrency)
+        ))
+
+    total = Samples()
+    for sample in samples.values():
+        total.latencies.extend(sample.latencies)
+        total.errors += sample.errors
+    return {
+        "config": {key: getattr(args, key) for key in ("url", "concurrency", "duration", "mix", "seed")},
+        "endpoints": {endpoint: summarize(sample, args.duration) for endpoint, sample in samples.items()},
+        "total": summarize(total, args.duration),
+    }
+
+
+def print_report(results: dict) -> None:
+    print(f"{'endpoint':<12} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in list(results["endpoints"].items()) + [("total", results["total"])]:
+        print(f"{name:<12} {row['requests']:>9} {row['errors']:>7} {row['throughput']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for name, base in baseline["endpoints"].items():
+        row = results["endpoints"].get(name)
+        if row is None or not base["requests"]:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if row[metric] > base[metric] * (1 + tolerance):
+                found.append(f"{name}: {metric} {row[metric]:.1f} > {base[metric]:.1f} (+{tolerance:.0%})")
+        if row["throughput"] < base["throughput"] * (1 - tolerance):
+            found.append(f"{name}: throughput {row['throughput']:.1f} < {base['throughput']:.1f} (-{tolerance:.0%})")
+        if row["error_rate"] > base["error_rate"] + 0.01:
+            found.append(f"{name}: error rate {row['error_rate']:.1%} > {base['error_rate']:.1%}")
+    return found
+
+
+def run(args: argparse.Namespace) -> int:
+    results = asyncio.run(drive(args))
+    print_report(results)
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print(f"No regression against {args.baseline}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seeding = commands.add_parser("seed", help="Ingest a reproducible synthetic corpus")
+    seeding.add_argument("--books", type=int, default=200)
+    seeding.add_argument("--words", type=int, default=20_000, help="Median words per book")
+    seeding.add_argument("--seed", type=int, default=42)
+    seeding.add_argument("--reset", action="store_true", help="Empty the books and index tables first")
+    seeding.add_argument("--ingestion-dir", type=Path, default=INGESTION_DIR)
+
+    load = commands.add_parser("run", help="Drive a request mix and report latencies")
+    load.add_argument("--url", default=None, help="Base URL of a running server (default: in-process)")
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    load.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the measure")
+    load.add_argument("--timeout", type=float, default=30.0)
+    load.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight list (search, centrality, advanced, suggestions, book)")
+    load.add_argument("--sample-words", type=int, default=200, help="Query words sampled from term_stats")
+    load.add_argument("--seed", type=int, default=42)
+    load.add_argument("--output", default=None, help="Write the results as JSON")
+    load.add_argument("--baseline", default=None, help="Fail on regression against this results file")
+    load.add_argument("--save-baseline", default=None, help="Store the results as a new baseline")
+    load.add_argument("--tolerance", type=float, default=0.25)
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        seed(args)
+    else:
+        sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
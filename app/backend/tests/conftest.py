@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# Comme dans les conteneurs : le paquet partagé searchbook_text (app/) et les scripts
+# d'ingestion (app/ingestion, importés par leur nom de module) sont sur le chemin
+APP_DIR = Path(__file__).resolve().parents[2]
+for path in (APP_DIR, APP_DIR / "ingestion"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
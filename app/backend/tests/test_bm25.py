@@ -0,0 +1,37 @@
+import random
+
+import numpy as np
+
+from app.services.bm25 import BM25
+
+
+def test_score_batch_matches_score_query_bit_for_bit():
+    rng = random.Random(3)
+    bm25 = BM25(N=1000, avgdl=12_345.6)
+    docs = {}
+    for doc_id in rng.sample(range(10_000), 200):
+        words = {
+            f"w{term}": {"frequency": rng.randint(1, 200), "number_documents": rng.randint(1, 1000)}
+            for term in rng.sample(range(20), rng.randint(1, 5))
+        }
+        docs[doc_id] = {"word_count": rng.randint(50, 200_000), "words": words}
+
+    # Une entrée par posting, dans l'ordre des mots de chaque document (ordre d'accumulation de score_query)
+    doc_ids, frequencies, doc_lengths, doc_freqs = [], [], [], []
+    for doc_id, doc in docs.items():
+        for info in doc["words"].values():
+            doc_ids.append(doc_id)
+            frequencies.append(info["frequency"])
+            doc_lengths.append(doc["word_count"])
+            doc_freqs.append(info["number_documents"])
+
+    unique_ids, scores = bm25.score_batch(doc_ids, frequencies, doc_lengths, doc_freqs)
+
+    assert unique_ids.tolist() == sorted(docs)
+    expected = np.array([bm25.score_query(docs[doc_id]) for doc_id in unique_ids.tolist()])
+    assert np.array_equal(scores, expected)
+
+
+def test_idf_decreases_with_document_frequency():
+    bm25 = BM25(N=100, avgdl=10.0)
+    assert bm25.idf(1) > bm25.idf(50) > bm25.idf(100) > 0
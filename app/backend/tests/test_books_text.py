@@ -0,0 +1,80 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.routes import books
+from app.core.config import settings
+from app.main import app
+from app.services import books_service
+
+TEXT = "Call me Ishmael. " * 1000
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def get_book_text(book_id, offset, length):
+        if book_id != "1":
+            raise books_service.BookServiceError("Book not found", 404)
+        text = TEXT[offset:offset + length]
+        return books_service.BookTextSlice(offset=offset, text=text, has_more=offset + length < len(TEXT))
+
+    monkeypatch.setattr(books_service, "get_book_text", get_book_text)
+    # Sans context manager : le lifespan (pool de connexions) n'est pas lancé
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-10", None),
+    ("chars=0-9", (0, 10)),
+    ("chars=5-5", (5, 1)),
+    (" chars = 100 - 199 ", (100, 100)),
+    ("chars=42-", (42, settings.book_text_page_chars)),
+    ("chars=0-999999999", (0, settings.book_text_max_chars)),
+])
+def test_parse_range(header, expected):
+    assert books._parse_range(header) == expected
+
+
+@pytest.mark.parametrize("header", ["chars=10-5", "chars=-5", "chars=a-b", "chars=1-2,4-5"])
+def test_parse_range_rejects_invalid_ranges(header):
+    with pytest.raises(HTTPException) as error:
+        books._parse_range(header)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == "chars */*"
+
+
+def test_range_returns_partial_content(client):
+    response = client.get("/api/books/1/text", headers={"Range": "chars=17-32", "Accept-Encoding": "identity"})
+    assert response.status_code == 206
+    assert response.text == TEXT[17:33]
+    assert response.headers["Content-Range"] == "chars 17-32/*"
+    assert response.headers["X-Next-Offset"] == "33"
+
+
+def test_range_at_the_end_gives_the_total_length(client):
+    start = len(TEXT) - 10
+    response = client.get("/api/books/1/text", headers={"Range": f"chars={start}-", "Accept-Encoding": "identity"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"chars {start}-{len(TEXT) - 1}/{len(TEXT)}"
+    assert "X-Next-Offset" not in response.headers
+
+
+def test_range_past_the_end_is_not_satisfiable(client):
+    response = client.get("/api/books/1/text", headers={"Range": f"chars={len(TEXT) + 5}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "chars */*"
+
+
+def test_invalid_range_is_not_satisfiable(client):
+    assert client.get("/api/books/1/text", headers={"Range": "chars=9-3"}).status_code == 416
+
+
+def test_offset_and_length_return_200(client):
+    response = client.get("/api/books/1/text?offset=0&length=7", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.text == "Call me"
+
+
+def test_unknown_book(client):
+    assert client.get("/api/books/2/text", headers={"Range": "chars=0-9"}).status_code == 404
@@ -0,0 +1,56 @@
+import bulk_writer
+
+
+class RecordingCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.log.append(" ".join(query.split()))
+
+    def copy_expert(self, query, stream, size=None):
+        self.log.append(query)
+        stream.read()
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return RecordingCursor(self.log)
+
+    def commit(self):
+        self.log.append("COMMIT")
+
+
+def bumps(log):
+    return [statement for statement in log if statement.startswith("UPDATE corpus_stats SET generation = generation + 1")]
+
+
+def test_write_graph_bumps_the_generation_before_committing():
+    conn = RecordingConnection()
+    bulk_writer.write_graph(conn, [(1, 2, 0.5), (2, 3, 0.25)], {1: 0.4, 2: 0.6, 3: 0.4})
+
+    assert len(bumps(conn.log)) == 1
+    # Même transaction que le graphe : les caches ne voient jamais le nouveau tri sous l'ancienne génération
+    assert conn.log.index(bumps(conn.log)[0]) < conn.log.index("COMMIT")
+    assert conn.log[-1] == "COMMIT"
+
+
+def test_write_graph_with_only_closeness_scores_bumps_the_generation():
+    conn = RecordingConnection()
+    bulk_writer.write_graph(conn, [], {1: 1.0})
+    assert len(bumps(conn.log)) == 1
+
+
+def test_empty_graph_write_keeps_the_generation():
+    conn = RecordingConnection()
+    bulk_writer.write_graph(conn, [], {})
+    assert bumps(conn.log) == []
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services import click_aggregator as module
+from app.services.click_aggregator import ClickAggregator
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.clicks: dict[int, int] = {}
+        self.failures = 0
+        self.calls = []
+
+    async def run_with_cursor(self, func, book_ids, clicks, commit=False):
+        self.calls.append((list(book_ids), list(clicks)))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("connection lost")
+        for book_id, count in zip(book_ids, clicks):
+            self.clicks[book_id] = self.clicks.get(book_id, 0) + count
+        return len(book_ids)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(module, "run_with_cursor", database.run_with_cursor)
+    return database
+
+
+def test_flush_writes_one_batch_sorted_by_id(database):
+    aggregator = ClickAggregator(flush_interval=60.0, max_pending=100)
+    for book_id in (7, 3, 7, 1, 7):
+        aggregator.record(book_id)
+    assert aggregator.pending == 5
+
+    assert asyncio.run(aggregator.flush()) == 3
+    assert database.calls == [([1, 3, 7], [1, 1, 3])]
+    assert aggregator.pending == 0
+    assert asyncio.run(aggregator.flush()) == 0
+    assert len(database.calls) == 1
+
+
+def test_failed_flush_requeues_its_deltas(database):
+    aggregator = ClickAggregator(flush_interval=60.0, max_pending=100)
+    aggregator.record(1)
+    aggregator.record(2)
+    database.failures = 1
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(aggregator.flush())
+    assert aggregator.pending == 2
+    assert database.clicks == {}
+
+    aggregator.record(1)
+    asyncio.run(aggregator.flush())
+    assert database.clicks == {1: 2, 2: 1}
+    assert aggregator.pending == 0
+
+
+async def wait_for(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_background_flush_retries_and_flushes_on_stop(database):
+    async def scenario():
+        aggregator = ClickAggregator(flush_interval=0.05, max_pending=1000)
+        database.failures = 1
+        aggregator.start()
+        aggregator.record(1)
+        aggregator.record(2)
+        # Premier flush périodique en échec, le suivant écrit les mêmes vues
+        await wait_for(lambda: database.clicks == {1: 1, 2: 1})
+        assert len(database.calls) >= 2
+
+        aggregator.flush_interval = 60.0
+        await asyncio.sleep(0.1)
+        aggregator.record(3)
+        await aggregator.stop()
+        return aggregator
+
+    aggregator = asyncio.run(scenario())
+    assert database.clicks == {1: 1, 2: 1, 3: 1}
+    assert aggregator.pending == 0
+
+
+def test_max_pending_wakes_the_flush_early(database):
+    async def scenario():
+        aggregator = ClickAggregator(flush_interval=60.0, max_pending=3)
+        aggregator.start()
+        for book_id in (1, 2, 3):
+            aggregator.record(book_id)
+        await wait_for(lambda: database.clicks == {1: 1, 2: 1, 3: 1})
+        await aggregator.stop()
+
+    asyncio.run(scenario())
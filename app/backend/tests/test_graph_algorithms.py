@@ -0,0 +1,57 @@
+import networkx as nx
+import pytest
+
+import graph_algorithms
+
+
+def networkx_closeness(adjacency_list):
+    graph = nx.Graph()
+    for node, neighbors in adjacency_list.items():
+        for neighbor, distance in neighbors.items():
+            graph.add_edge(node, neighbor, weight=distance)
+    return nx.closeness_centrality(graph, distance="weight")
+
+
+def largest_component(adjacency_list):
+    start = max(adjacency_list, key=lambda node: len(adjacency_list[node]))
+    nodes = graph_algorithms.reachable_from(adjacency_list, {start})
+    return {node: adjacency_list[node] for node in nodes}
+
+
+@pytest.mark.parametrize("num_nodes, density, seed", [(2, 1.0, 0), (40, 0.2, 1), (150, 0.05, 2)])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_csr_closeness_matches_networkx(num_nodes, density, seed, workers):
+    # Graphe connexe : la formule (noeuds atteints / somme des distances) est celle de networkx
+    adjacency_list = largest_component(graph_algorithms.random_similarity_graph(num_nodes, density, seed))
+    expected = networkx_closeness(adjacency_list)
+
+    actual = graph_algorithms.calculate_closeness_scores(adjacency_list, workers=workers, chunk_size=7)
+
+    assert actual.keys() == expected.keys()
+    for node, score in expected.items():
+        assert actual[node] == pytest.approx(score, rel=1e-9)
+
+
+def test_csr_dijkstra_matches_dict_dijkstra():
+    adjacency_list = graph_algorithms.random_similarity_graph(80, 0.05, seed=3)
+    graph = graph_algorithms.CSRGraph.from_adjacency(adjacency_list)
+    position = {node: i for i, node in enumerate(graph.node_ids)}
+    for source in list(adjacency_list)[:10]:
+        expected = graph_algorithms.dijkstra_shortest_path(adjacency_list, source)
+        distances = graph_algorithms.csr_dijkstra(graph, position[source])
+        for node, distance in expected.items():
+            assert distances[position[node]] == pytest.approx(distance)
+
+
+def test_approximate_closeness_is_exact_when_pivots_cover_the_component():
+    adjacency_list = largest_component(graph_algorithms.random_similarity_graph(30, 0.3, seed=4))
+    exact = graph_algorithms.calculate_closeness_scores(adjacency_list, workers=1)
+    approximate = graph_algorithms.approximate_closeness_scores(adjacency_list, pivots=len(adjacency_list), workers=1)
+    assert approximate == pytest.approx(exact)
+
+
+def test_approximate_closeness_keeps_the_ranking():
+    adjacency_list = largest_component(graph_algorithms.random_similarity_graph(200, 0.05, seed=5))
+    exact = graph_algorithms.calculate_closeness_scores(adjacency_list, workers=1)
+    approximate = graph_algorithms.approximate_closeness_scores(adjacency_list, pivots=64, workers=1)
+    assert graph_algorithms.spearman_rank_correlation(exact, approximate) > 0.9
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from app.services import index_segment
+from app.services.index_segment import IndexSegment, SegmentFormatError
+
+
+def read_postings(segment: IndexSegment, word: str) -> list[tuple[int, int]] | None:
+    info = segment.lookup(word)
+    if info is None:
+        return None
+    ordinals, frequencies = segment.postings(info)
+    try:
+        return [(segment.doc_ids[ordinal], frequency) for ordinal, frequency in zip(ordinals, frequencies)]
+    finally:
+        frequencies.release()
+
+
+def test_round_trip(tmp_path):
+    rng = random.Random(1)
+    docs = {book_id: rng.randint(1, 100_000) for book_id in rng.sample(range(1, 100_000), 500)}
+    words = sorted({f"w{rng.randint(0, 10_000)}" for _ in range(300)} | {"été", "œuvre", "z"})
+    postings = {
+        # Fréquences et écarts de toutes les largeurs (1, 2 et 4 octets)
+        word: {book_id: rng.choice([1, 7, 300, 70_000]) for book_id in rng.sample(sorted(docs), rng.randint(1, 200))}
+        for word in words
+    }
+    path = str(tmp_path / "index.seg")
+    index_segment.write_segment(
+        path,
+        docs.items(),
+        ((word, rng.sample(list(postings[word].items()), len(postings[word]))) for word in words),
+    )
+
+    segment = IndexSegment(path)
+    try:
+        assert segment.num_docs == len(docs)
+        assert segment.num_terms == len(words)
+        assert segment.avgdl == pytest.approx(sum(docs.values()) / len(docs))
+        assert list(segment.doc_ids) == sorted(docs)
+        assert list(segment.doc_lengths) == [docs[book_id] for book_id in sorted(docs)]
+        for word in words:
+            info = segment.lookup(word)
+            assert info.df == len(postings[word])
+            assert info.max_tf == max(postings[word].values())
+            assert read_postings(segment, word) == sorted(postings[word].items())
+        for missing in ("", "a", "w", "zz", "été2"):
+            assert segment.lookup(missing) is None
+    finally:
+        segment.close()
+
+
+def test_postings_must_be_sorted_by_word(tmp_path):
+    with pytest.raises(ValueError):
+        index_segment.write_segment(str(tmp_path / "index.seg"), [(1, 10)], [("b", [(1, 1)]), ("a", [(1, 1)])])
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "other.seg"
+    path.write_bytes(b"not a segment" * 10)
+    with pytest.raises(SegmentFormatError):
+        IndexSegment(str(path))
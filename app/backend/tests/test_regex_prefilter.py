@@ -0,0 +1,88 @@
+import random
+import re
+
+import pytest
+
+from app.services import regex_prefilter
+from app.services.regex_prefilter import MATCH_ALL, TrigramQuery
+
+REGEXES = [
+    "abc",
+    "abc|bca",
+    "a(bc)+a",
+    "[ab]cab",
+    "(?:ab|ba)c{2,3}",
+    "x?abcd",
+    "ab.c",
+    "a[^b]ca",
+    "(ab|cd)(ef|gh)",
+    "été",
+    "ÉTÉ",
+    "^abca",
+    "cab$",
+    "a*bcb*",
+    "[a-c]{3}",
+    "ab\\wca",
+]
+# Textes aléatoires assemblés de caractères et de morceaux des motifs, pour que chaque regex ait des correspondances
+FRAGMENTS = list("abcdefghx éÉ") + ["abc", "bca", "cab", "cc", "ab", "cd", "ef", "gh", "été", "ÉTÉ"]
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def satisfies(query: TrigramQuery, present: set[str]) -> bool:
+    if query.op == "all":
+        return True
+    if query.op == "and":
+        return query.trigrams <= present and all(satisfies(child, present) for child in query.children)
+    return bool(query.trigrams & present) or any(satisfies(child, present) for child in query.children)
+
+
+@pytest.mark.parametrize("regex", REGEXES)
+def test_every_match_passes_the_trigram_filter(regex):
+    # Le contenu indexé est en minuscules : trigrammes et regex (insensible à la casse) portent sur le même texte
+    query = regex_prefilter.analyze(regex)
+    pattern = re.compile(regex, re.IGNORECASE)
+    rng = random.Random(regex)
+    matched = 0
+    for _ in range(5000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 8))).lower()
+        if pattern.search(text):
+            matched += 1
+            assert satisfies(query, trigrams(text)), f"{regex!r} matches {text!r} but the prefilter rejects it"
+    assert matched, f"no random text matched {regex!r}"
+
+
+@pytest.mark.parametrize("regex, text", [
+    ("whale", "call me ishmael. the whale"),
+    ("wh(a|i)le", "a while later"),
+    ("moby.dick", "moby-dick"),
+    ("Misérables", "les misérables"),
+    ("colou?r", "the color red"),
+])
+def test_matching_text_passes(regex, text):
+    assert re.search(regex, text, re.IGNORECASE)
+    assert satisfies(regex_prefilter.analyze(regex), trigrams(text))
+
+
+def test_literal_regex_requires_its_trigrams():
+    query = regex_prefilter.analyze("whale")
+    assert query.op == "and"
+    assert query.trigrams == {"wha", "hal", "ale"}
+    assert not satisfies(query, trigrams("the white sea"))
+
+
+@pytest.mark.parametrize("regex", [".*", "a.b", "[a-z]+", "(a|b)c"])
+def test_regex_without_trigram_literal_matches_all(regex):
+    assert regex_prefilter.analyze(regex) == MATCH_ALL
+    assert regex_prefilter.to_sql(MATCH_ALL) == (None, [])
+
+
+def test_to_sql_uses_shared_trigram_keys():
+    from searchbook_text import trigram_key
+
+    where, params = regex_prefilter.to_sql(regex_prefilter.analyze("abc|bcd"))
+    assert where == "trigrams && %s::bigint[]"
+    assert params == [sorted([trigram_key("abc"), trigram_key("bcd")])]
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from app.services import regex_scan
+
+
+class FakeServerCursor:
+    def __init__(self, books):
+        self.books = books
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if params is not None:
+            wanted = set(params[0])
+            self.books = [book for book in self.books if book["id"] in wanted]
+
+    def __iter__(self):
+        return iter([dict(book) for book in self.books])
+
+
+class FakeConnection:
+    def __init__(self, books):
+        self.books = books
+
+    def cursor(self, name=None, cursor_factory=None):
+        return FakeServerCursor(self.books)
+
+
+class FakeCursor:
+    def __init__(self, books):
+        self.connection = FakeConnection(books)
+
+
+def make_books(texts):
+    return [
+        {"id": book_id, "title": f"Book {book_id}", "author": "A", "image_url": None, "content": text}
+        for book_id, text in enumerate(texts, start=1)
+    ]
+
+
+def run_scan(books, regex, size, time_budget, chunk_chars=1_000):
+    return regex_scan.scan(
+        FakeCursor(books), regex, None, size,
+        workers=2, time_budget=time_budget, fetch_size=16, chunk_chars=chunk_chars,
+    )
+
+
+def teardown_module():
+    regex_scan.shutdown_pool()
+
+
+def test_scan_returns_first_hits_in_id_order():
+    books = make_books(["whale" if book_id % 3 == 0 else "ship" for book_id in range(60)])
+    result = run_scan(books, "wha+le", size=5, time_budget=30.0, chunk_chars=20)
+
+    assert not result.partial
+    assert [book["id"] for book in result.matches] == [1, 4, 7, 10, 13]
+    assert all(book["snippet"] == "whale" for book in result.matches)
+
+
+def wait_for(condition, timeout):
+    give_up = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < give_up
+        time.sleep(0.02)
+
+
+def test_early_exit_returns_at_once_and_leaves_fast_chunks_alone():
+    books = make_books(["whale"] + ["ship"] * 8)
+    pool = regex_scan._get_pool(2)
+    result = run_scan(books, "whale", size=1, time_budget=0.5, chunk_chars=1)
+
+    assert [book["id"] for book in result.matches] == [1]
+    time.sleep(1.0)
+    assert regex_scan._pool is pool
+
+
+def test_early_exit_does_not_leave_catastrophic_chunks_running():
+    # Le premier livre suffit ; les suivants bloquent les workers bien au-delà du budget
+    books = make_books(["whale"] + ["a" * 40 + "!"] * 8)
+    pool = regex_scan._get_pool(2)
+    start = time.monotonic()
+    result = run_scan(books, "whale|(a+)+$", size=1, time_budget=1.0, chunk_chars=1)
+
+    assert [book["id"] for book in result.matches] == [1]
+    assert not result.partial
+    assert time.monotonic() - start < 1.0
+    # Passé l'échéance du scan, le pool est remplacé : la requête suivante n'hérite pas des workers bloqués
+    wait_for(lambda: regex_scan._pool is not pool, timeout=10.0)
+    later = run_scan(make_books(["whale"] * 4), "whale", size=4, time_budget=10.0)
+    assert not later.partial
+    assert len(later.matches) == 4
+
+
+def test_catastrophic_scan_does_not_cancel_a_concurrent_scan():
+    harmless_books = make_books(["nothing to see here " * 50] * 300)
+    catastrophic_books = make_books(["a" * 40 + "!"] * 8)
+    results = {}
+
+    def harmless():
+        results["harmless"] = run_scan(harmless_books, "nomatch", size=10, time_budget=60.0)
+
+    def catastrophic():
+        results["catastrophic"] = run_scan(catastrophic_books, "(a+)+$", size=10, time_budget=1.0, chunk_chars=1)
+
+    regex_scan._get_pool(2)
+    threads = [threading.Thread(target=catastrophic), threading.Thread(target=harmless)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results["catastrophic"].partial
+    assert not results["harmless"].partial
+    assert results["harmless"].scanned == len(harmless_books)
+    assert results["harmless"].matches == []
+    assert time.monotonic() - start < 30.0
+    # Le pool bloqué par le scan catastrophique a été remplacé, pas laissé aux autres requêtes
+    assert run_scan(harmless_books[:10], "nothing", size=1, time_budget=10.0).matches
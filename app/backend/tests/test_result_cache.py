@@ -0,0 +1,45 @@
+from app.services.result_cache import ResultCache
+
+
+def test_generation_change_drops_every_entry():
+    cache = ResultCache(max_entries=10, ttl=60.0)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.get("a", 1) == "A"
+
+    assert cache.get("b", 2) is None
+    assert cache.get("a", 2) is None
+    assert cache.counters.invalidations == 1
+    # Une réponse calculée sur l'ancien index n'est plus jamais servie
+    assert cache.get("a", 1) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_segment_identity_is_part_of_the_generation():
+    cache = ResultCache(max_entries=10, ttl=60.0)
+    cache.put("q", (5, (11, 100)), "old")
+    assert cache.get("q", (5, (11, 100))) == "old"
+    assert cache.get("q", (5, (12, 200))) is None
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.result_cache.time.monotonic", lambda: now[0])
+    cache = ResultCache(max_entries=2, ttl=10.0)
+    cache.put("a", 0, "A")
+    cache.put("b", 0, "B")
+    cache.get("a", 0)
+    cache.put("c", 0, "C")
+    assert cache.get("b", 0) is None
+    assert cache.counters.evictions == 1
+
+    now[0] += 11
+    assert cache.get("a", 0) is None
+    assert cache.counters.expirations == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=0, ttl=60.0)
+    assert not cache.enabled
+    cache.put("a", 0, "A")
+    assert cache.get("a", 0) is None
@@ -0,0 +1,75 @@
+import random
+from array import array
+
+import pytest
+
+import similarity
+import vocabulary
+
+THRESHOLD = 0.1
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(2000)]
+    word_sets = {
+        book_id: set(rng.sample(words[:rng.randint(300, 2000)], rng.randint(30, 300)))
+        for book_id in range(1, 81)
+    }
+    term_vocabulary = vocabulary.Vocabulary()
+    id_sets = {book_id: term_vocabulary.encode(tokens) for book_id, tokens in word_sets.items()}
+    return word_sets, id_sets
+
+
+def as_dict(edges):
+    return {(id_a, id_b): score for id_a, id_b, score in edges}
+
+
+def assert_same_edges(actual, expected):
+    actual, expected = as_dict(actual), as_dict(expected)
+    assert actual.keys() == expected.keys()
+    for pair, score in expected.items():
+        assert actual[pair] == pytest.approx(score, abs=1e-12)
+
+
+def test_legacy_accepts_sets_and_id_arrays(corpus):
+    word_sets, id_sets = corpus
+    reference = similarity.LegacyJaccard().pairs(word_sets, THRESHOLD)
+    assert reference
+    assert_same_edges(similarity.LegacyJaccard().pairs(id_sets, THRESHOLD), reference)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_exact_engine_matches_legacy(corpus, workers):
+    word_sets, id_sets = corpus
+    reference = similarity.LegacyJaccard().pairs(word_sets, THRESHOLD)
+    engine = similarity.SparseExactJaccard(workers=workers, block_size=16)
+    assert_same_edges(engine.pairs(id_sets, THRESHOLD), reference)
+
+
+@pytest.mark.parametrize("engine", [similarity.LegacyJaccard(), similarity.SparseExactJaccard(workers=1, block_size=16)],
+                         ids=["legacy", "exact"])
+def test_incremental_pairs_match_a_full_run(corpus, engine):
+    word_sets, id_sets = corpus
+    reference = similarity.LegacyJaccard().pairs(word_sets, THRESHOLD)
+    new = {book_id: tokens for book_id, tokens in id_sets.items() if book_id > 60}
+    existing = {book_id: tokens for book_id, tokens in id_sets.items() if book_id <= 60}
+    expected = [edge for edge in reference if edge[1] > 60]
+
+    assert_same_edges(engine.pairs_incremental(new, existing, THRESHOLD), expected)
+
+    # Livres existants restreints aux mots des nouveaux livres (load_existing_token_sets), tailles à part
+    shared = set().union(*new.values())
+    partial = {book_id: array(vocabulary.TERM_TYPECODE, sorted(set(tokens) & shared)) for book_id, tokens in existing.items()}
+    sizes = {book_id: len(tokens) for book_id, tokens in existing.items()}
+    assert_same_edges(engine.pairs_incremental(new, partial, THRESHOLD, sizes), expected)
+
+
+def test_minhash_finds_clear_edges(corpus):
+    # Estimation : les arêtes proches du seuil peuvent manquer, pas celles nettement au-dessus
+    word_sets, id_sets = corpus
+    clear = {pair for pair, score in as_dict(similarity.LegacyJaccard().pairs(word_sets, THRESHOLD)).items() if score >= 2 * THRESHOLD}
+    found = as_dict(similarity.MinHashLSHJaccard(workers=1).pairs(id_sets, THRESHOLD))
+    assert clear
+    assert len(found.keys() & clear) >= 0.95 * len(clear)
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+from searchbook_text import tokenizer
+from searchbook_text.encoding import decode_deltas, encode_deltas
+
+import positional_index
+from app.services import snippets
+
+
+@pytest.mark.parametrize("offsets", [
+    [],
+    [0],
+    [0, 1, 2],
+    [127, 128, 16_383, 16_384, 2_097_152, 2 ** 31],
+    sorted(random.Random(0).sample(range(10_000_000), 1000)),
+])
+def test_delta_round_trip(offsets):
+    assert decode_deltas(encode_deltas(offsets)) == offsets
+
+
+def test_small_gaps_take_one_byte():
+    assert encode_deltas([5, 10, 137]) == bytes([5, 5, 127])
+
+
+def brute_force_window(occurrences, width):
+    best_key, best = (0, 0), None
+    for first in range(len(occurrences)):
+        for last in range(first, len(occurrences)):
+            end = occurrences[last][0] + len(occurrences[last][1])
+            if end - occurrences[first][0] > width:
+                break
+            span = occurrences[first:last + 1]
+            key = (len({word for _, word in span}), len(span))
+            if key > best_key:
+                best_key, best = key, (occurrences[first][0], end)
+    return best_key, best
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_best_window_covers_the_most_distinct_words(seed):
+    rng = random.Random(seed)
+    words = ["whale", "sea", "ishmael", "ahab"][:rng.randint(1, 4)]
+    offsets = sorted(rng.sample(range(5_000), rng.randint(1, 40)))
+    occurrences = [(offset, rng.choice(words)) for offset in offsets]
+    width = rng.choice([20, 80, 280])
+
+    start, end = snippets.best_window(occurrences, width)
+    inside = [(offset, word) for offset, word in occurrences if start <= offset and offset + len(word) <= end]
+    expected_key, _ = brute_force_window(occurrences, width)
+
+    assert end - start <= width or len(inside) == 1
+    assert (len({word for _, word in inside}), len(inside)) == expected_key
+
+
+def test_positions_skip_the_gutenberg_header():
+    content = (
+        "The Project Gutenberg eBook of Moby Dick; this ebook is for the use of anyone, whale\n"
+        "*** START OF THE PROJECT GUTENBERG EBOOK MOBY DICK ***\n"
+        "Call me Ishmael. The whale, the whale!\n"
+        "*** END OF THE PROJECT GUTENBERG EBOOK MOBY DICK ***\n"
+        "license whale"
+    )
+    content_lower = content.lower()
+    content_clean = tokenizer.clean_text(content_lower)
+    positions = positional_index.term_positions(
+        content_lower, content_clean, {"whale", "ishmael", "gutenberg"}, 32, tokenizer.clean_table())
+
+    body = content_lower.index("call me")
+    whale = decode_deltas(positions["whale"])
+    assert len(whale) == 2 and all(body < offset < content_lower.index("*** end") for offset in whale)
+    assert all(content_lower[offset:offset + 5] == "whale" for offset in whale)
+    # Mot absent du corps : ses positions hors du corps sont gardées
+    assert decode_deltas(positions["gutenberg"])[0] == content_lower.index("gutenberg")
+
+
+def test_positions_map_back_to_the_original_content():
+    # Marques combinantes isolées : supprimées au nettoyage, le texte nettoyé est plus court
+    content_lower = "the cafe\u0301 and the cafe\u0301, first"
+    content_clean = tokenizer.clean_text(content_lower)
+    assert len(content_clean) < len(content_lower)
+    positions = positional_index.term_positions(
+        content_lower, content_clean, {"cafe", "first"}, None, tokenizer.clean_table())
+
+    assert [content_lower[offset:offset + 4] for offset in decode_deltas(positions["cafe"])] == ["cafe", "cafe"]
+    assert decode_deltas(positions["first"]) == [content_lower.index("first")]
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from app.services import topk
+from app.services.bm25 import BM25
+from app.services.topk import PostingList
+
+
+def make_postings(rng: random.Random, num_docs: int, num_terms: int, bm25: BM25, doc_lengths: dict[int, int]):
+    postings = []
+    for _ in range(num_terms):
+        docs = sorted(rng.sample(range(num_docs), rng.randint(1, num_docs // 2)))
+        frequencies = [rng.randint(1, 30) for _ in docs]
+        df = len(docs)
+        upper_bound = max(bm25.score(doc_lengths[doc], tf, df) for doc, tf in zip(docs, frequencies))
+        postings.append(PostingList(docs, frequencies, df, upper_bound))
+    return postings
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_max_score_matches_exhaustive(seed):
+    rng = random.Random(seed)
+    num_docs = rng.randint(20, 400)
+    doc_lengths = {doc: rng.randint(100, 50_000) for doc in range(num_docs)}
+    bm25 = BM25(N=num_docs, avgdl=sum(doc_lengths.values()) / num_docs)
+    postings = make_postings(rng, num_docs, rng.randint(1, 6), bm25, doc_lengths)
+
+    def score(doc, tf, df):
+        return bm25.score(doc_lengths[doc], tf, df)
+
+    k = rng.choice([1, 5, 10, 50, num_docs])
+    expected = topk.exhaustive_top_k(postings, k, score)
+    actual = topk.max_score_top_k(postings, k, score)
+
+    assert [s for _, s in actual] == pytest.approx([s for _, s in expected], rel=1e-12)
+    # Égalités de score : même ensemble de documents au-dessus du dernier score retenu
+    if expected:
+        cutoff = expected[-1][1]
+        assert {d for d, s in actual if s > cutoff * (1 + 1e-12)} == {d for d, s in expected if s > cutoff * (1 + 1e-12)}
+
+
+def test_batch_top_k_matches_exhaustive():
+    rng = random.Random(7)
+    num_docs = 300
+    doc_lengths = {doc: rng.randint(100, 50_000) for doc in range(num_docs)}
+    bm25 = BM25(N=num_docs, avgdl=sum(doc_lengths.values()) / num_docs)
+    postings = make_postings(rng, num_docs, 4, bm25, doc_lengths)
+
+    expected = topk.exhaustive_top_k(postings, 10, lambda doc, tf, df: bm25.score(doc_lengths[doc], tf, df))
+    actual = topk.batch_top_k(postings, 10, bm25, doc_lengths.__getitem__)
+
+    assert [d for d, _ in actual] == [d for d, _ in expected]
+    assert [s for _, s in actual] == pytest.approx([s for _, s in expected], rel=1e-12)
+
+
+def test_empty_inputs():
+    assert topk.max_score_top_k([], 10, lambda *_: 1.0) == []
+    assert topk.max_score_top_k([PostingList([], [], 0)], 10, lambda *_: 1.0) == []
+    assert topk.max_score_top_k([PostingList([1], [1], 1, 1.0)], 0, lambda *_: 1.0) == []
@@ -0,0 +1,52 @@
+-- ==========================================
+-- STATISTIQUES MATÉRIALISÉES POUR BM25
+-- ==========================================
+-- Maintenues par le pipeline d'ingestion (load_books.py) dans la même
+-- transaction que l'insertion de chaque livre : le backend ne fait plus
+-- aucune agrégation (COUNT/AVG sur books, GROUP BY sur inverted_index).
+
+DROP TABLE IF EXISTS term_stats CASCADE;
+DROP TABLE IF EXISTS corpus_stats CASCADE;
+
+-- Une ligne par mot de l'index inversé
+CREATE TABLE term_stats (
+    word        TEXT PRIMARY KEY,
+    doc_freq    INTEGER NOT NULL DEFAULT 0,  -- Nombre de livres contenant le mot (df)
+    total_tf    BIGINT  NOT NULL DEFAULT 0,  -- Somme des fréquences sur le corpus
+    max_tf      INTEGER NOT NULL DEFAULT 0   -- Fréquence maximale dans un livre (borne BM25)
+);
+
+-- Une seule ligne : taille du corpus et numéro de génération de l'index.
+-- La génération est incrémentée à chaque modification de l'index ; le backend
+-- s'en sert pour invalider ses caches.
+CREATE TABLE corpus_stats (
+    id          BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    num_docs    INTEGER NOT NULL DEFAULT 0,  -- N
+    total_words BIGINT  NOT NULL DEFAULT 0,  -- avgdl = total_words / num_docs
+    generation  BIGINT  NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- FONCTION: rebuild_corpus_stats
+-- Utilité: Recalculer entièrement les statistiques depuis books et inverted_index
+-- Cas d'usage: Initialisation, ou après une suppression de livres (ON DELETE CASCADE)
+CREATE OR REPLACE FUNCTION rebuild_corpus_stats()
+RETURNS VOID AS $$
+BEGIN
+    TRUNCATE term_stats;
+    INSERT INTO term_stats (word, doc_freq, total_tf, max_tf)
+    SELECT word, COUNT(*), SUM(frequency), MAX(frequency)
+    FROM inverted_index
+    GROUP BY word;
+
+    INSERT INTO corpus_stats (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+    UPDATE corpus_stats
+    SET num_docs = (SELECT COUNT(*) FROM books),
+        total_words = (SELECT COALESCE(SUM(word_count), 0) FROM books),
+        generation = generation + 1,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_corpus_stats();
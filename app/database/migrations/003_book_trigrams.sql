@@ -0,0 +1,18 @@
+-- ==========================================
+-- INDEX DE TRIGRAMMES (PRÉFILTRE DE LA RECHERCHE REGEX)
+-- ==========================================
+-- Pour chaque livre, l'ensemble des trigrammes (3 caractères consécutifs) de
+-- son contenu en minuscules, encodés en BIGINT (3 code points de 21 bits).
+-- Construit par load_books.py. La recherche avancée traduit la regex en
+-- requête booléenne sur ces trigrammes (@> = tous, && = au moins un) et ne
+-- vérifie que les livres candidats.
+
+DROP TABLE IF EXISTS book_trigrams CASCADE;
+
+CREATE TABLE book_trigrams (
+    book_id     INTEGER PRIMARY KEY REFERENCES books(id) ON DELETE CASCADE,
+    trigrams    BIGINT[] NOT NULL
+);
+
+-- Index GIN : résout @> et && sans parcourir les tableaux
+CREATE INDEX idx_book_trigrams_gin ON book_trigrams USING GIN (trigrams);
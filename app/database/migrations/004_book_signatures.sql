@@ -0,0 +1,16 @@
+-- ==========================================
+-- SIGNATURES MINHASH DES LIVRES (GRAPHE À MÉMOIRE BORNÉE)
+-- ==========================================
+-- Signature MinHash compacte de l'ensemble des mots de chaque livre
+-- (num_perm entiers 32 bits non signés, petit-boutistes, soit 512 octets
+-- pour 128 permutations). Écrite par load_books.py (--graph-input signatures) :
+-- le calcul du graphe, y compris incrémental, n'a alors besoin que de ces
+-- signatures, et non des ensembles de mots complets.
+
+DROP TABLE IF EXISTS book_signatures CASCADE;
+
+CREATE TABLE book_signatures (
+    book_id     INTEGER PRIMARY KEY REFERENCES books(id) ON DELETE CASCADE,
+    num_perm    INTEGER NOT NULL,   -- Nombre de permutations (longueur de la signature)
+    signature   BYTEA NOT NULL
+);
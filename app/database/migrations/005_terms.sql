@@ -0,0 +1,52 @@
+-- ==========================================
+-- VOCABULAIRE : IDENTIFIANTS ENTIERS DES MOTS
+-- ==========================================
+-- Chaque mot de l'index reçoit un identifiant entier dense (0, 1, 2, ...),
+-- attribué par load_books.py à la première apparition du mot et jamais
+-- réattribué. L'ingestion représente l'ensemble des mots d'un livre par le
+-- tableau trié de ces identifiants. term_stats.term_id recopie la même
+-- correspondance pour les requêtes SQL ; le backend ne la lit pas : ses
+-- postings (inverted_index, segment mmap) restent indexés par mot.
+
+DROP TABLE IF EXISTS terms CASCADE;
+
+CREATE TABLE terms (
+    id      INTEGER PRIMARY KEY,
+    word    TEXT NOT NULL UNIQUE
+);
+
+ALTER TABLE term_stats ADD COLUMN IF NOT EXISTS term_id INTEGER;
+
+-- Mots déjà indexés (base existante) : identifiants dans l'ordre alphabétique
+INSERT INTO terms (id, word)
+SELECT ROW_NUMBER() OVER (ORDER BY word) - 1, word
+FROM (SELECT DISTINCT word FROM inverted_index) w;
+
+UPDATE term_stats ts SET term_id = t.id FROM terms t WHERE t.word = ts.word;
+
+
+-- FONCTION: rebuild_corpus_stats (remplace la version de 002_term_stats.sql)
+-- Utilité: Recalculer entièrement les statistiques depuis books et inverted_index, avec les identifiants des mots
+CREATE OR REPLACE FUNCTION rebuild_corpus_stats()
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO terms (id, word)
+    SELECT (SELECT COALESCE(MAX(id), -1) FROM terms) + ROW_NUMBER() OVER (ORDER BY word), word
+    FROM (SELECT DISTINCT word FROM inverted_index) w
+    WHERE NOT EXISTS (SELECT 1 FROM terms t WHERE t.word = w.word);
+
+    TRUNCATE term_stats;
+    INSERT INTO term_stats (word, doc_freq, total_tf, max_tf, term_id)
+    SELECT ii.word, COUNT(*), SUM(ii.frequency), MAX(ii.frequency), t.id
+    FROM inverted_index ii
+    JOIN terms t ON t.word = ii.word
+    GROUP BY ii.word, t.id;
+
+    INSERT INTO corpus_stats (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+    UPDATE corpus_stats
+    SET num_docs = (SELECT COUNT(*) FROM books),
+        total_words = (SELECT COALESCE(SUM(word_count), 0) FROM books),
+        generation = generation + 1,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
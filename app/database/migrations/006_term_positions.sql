@@ -0,0 +1,26 @@
+-- ==========================================
+-- INDEX POSITIONNEL (EXTRAITS « MOT-CLÉ EN CONTEXTE »)
+-- ==========================================
+-- Pour chaque (livre, mot indexé) : positions, en caractères dans books.content,
+-- des premières occurrences du mot dans le corps du livre, après l'en-tête Gutenberg
+-- (au plus --max-positions, 32 par défaut),
+-- encodées en écarts successifs varint (voir ingestion/positional_index.py).
+-- Le backend en déduit la fenêtre la plus riche en mots de la requête et ne lit
+-- que cette plage du contenu (substr) au lieu de LEFT(content, 280).
+
+DROP TABLE IF EXISTS term_positions CASCADE;
+
+CREATE TABLE term_positions (
+    book_id     INTEGER REFERENCES books(id) ON DELETE CASCADE,
+    word        TEXT NOT NULL,
+    positions   BYTEA NOT NULL,
+
+    PRIMARY KEY (book_id, word)
+);
+
+-- Contenu stocké sans compression (toujours hors ligne, en TOAST) : substr ne lit
+-- alors que les blocs TOAST nécessaires, sans décompresser le livre depuis le début.
+-- En UTF-8, PostgreSQL lit tout de même le début du texte jusqu'à la fin de l'extrait
+-- (les positions sont en caractères, pas en octets). Ne s'applique qu'aux lignes écrites
+-- après ce changement ; plus de place disque pour le contenu (pas de compression pglz).
+ALTER TABLE books ALTER COLUMN content SET STORAGE EXTERNAL;
@@ -0,0 +1,87 @@
+-- ==========================================
+-- LISTES DE VOISINS PRÉCALCULÉES (SUGGESTIONS)
+-- ==========================================
+-- Pour chaque livre : ses N plus proches voisins du graphe Jaccard (N = 20,
+-- la limite maximale de /api/suggestions), par similarité décroissante, en
+-- deux tableaux parallèles. Une suggestion devient une lecture par clé primaire ;
+-- seul le classement par popularité (click_count) de ces N voisins reste fait
+-- à la requête. Maintenu par l'ingestion (refresh_book_neighbors sur les livres
+-- touchés par les nouvelles arêtes, voir ingestion/bulk_writer.py).
+
+DROP TABLE IF EXISTS book_neighbors CASCADE;
+
+CREATE TABLE book_neighbors (
+    book_id         INTEGER PRIMARY KEY REFERENCES books(id) ON DELETE CASCADE,
+    neighbor_ids    INTEGER[] NOT NULL,
+    scores          FLOAT[] NOT NULL        -- similarité Jaccard de chaque voisin
+);
+
+
+-- FONCTION: refresh_book_neighbors
+-- Utilité: Recalculer les listes de voisins des livres donnés (NULL : tous les livres)
+-- Les deux index idx_jaccard_lookup_a/b servent chacun une moitié des arêtes (graphe non orienté)
+CREATE OR REPLACE FUNCTION refresh_book_neighbors(p_book_ids INTEGER[] DEFAULT NULL, p_top_n INTEGER DEFAULT 20)
+RETURNS VOID AS $$
+BEGIN
+    IF p_book_ids IS NULL THEN
+        TRUNCATE book_neighbors;
+        p_book_ids := ARRAY(SELECT id FROM books);
+    ELSE
+        DELETE FROM book_neighbors WHERE book_id = ANY(p_book_ids);
+    END IF;
+
+    INSERT INTO book_neighbors (book_id, neighbor_ids, scores)
+    SELECT e.book_id,
+        array_agg(e.neighbor_id ORDER BY e.similarity_score DESC, e.neighbor_id),
+        array_agg(e.similarity_score ORDER BY e.similarity_score DESC, e.neighbor_id)
+    FROM (
+        SELECT t.id AS book_id, n.neighbor_id, n.similarity_score
+        FROM (SELECT DISTINCT unnest(p_book_ids) AS id) t
+        CROSS JOIN LATERAL (
+            SELECT k.neighbor_id, k.similarity_score
+            FROM (
+                (SELECT j.book_b_id AS neighbor_id, j.similarity_score
+                 FROM jaccard_graph j WHERE j.book_a_id = t.id
+                 ORDER BY j.similarity_score DESC LIMIT p_top_n)
+                UNION ALL
+                (SELECT j.book_a_id, j.similarity_score
+                 FROM jaccard_graph j WHERE j.book_b_id = t.id
+                 ORDER BY j.similarity_score DESC LIMIT p_top_n)
+            ) k
+            ORDER BY k.similarity_score DESC, k.neighbor_id
+            LIMIT p_top_n
+        ) n
+    ) e
+    GROUP BY e.book_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- FONCTION: get_suggestions (remplace la version de 001_init_schema.sql)
+-- Utilité: Voisins précalculés du livre, triés par popularité (click_count) puis similarité
+-- Même signature : similarity_score reste le click_count du voisin
+CREATE OR REPLACE FUNCTION get_suggestions(p_book_id INTEGER, p_limit INTEGER DEFAULT 5) RETURNS TABLE(
+        similar_book_id INTEGER,
+        title TEXT,
+        author TEXT,
+        similarity_score BIGINT,
+        image_url TEXT
+    ) AS $$ BEGIN RETURN QUERY
+SELECT b.id as similar_book_id,
+    b.title,
+    b.author,
+    b.click_count as similarity_score,
+    b.image_url
+FROM book_neighbors n
+    CROSS JOIN LATERAL unnest(n.neighbor_ids, n.scores) AS u(neighbor_id, jaccard)
+    JOIN books b ON b.id = u.neighbor_id
+WHERE n.book_id = p_book_id
+ORDER BY b.click_count DESC,
+    u.jaccard DESC
+LIMIT p_limit;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+
+-- Base existante : listes construites depuis le graphe déjà calculé
+SELECT refresh_book_neighbors();
@@ -36,6 +36,19 @@ export const api = {
   book(id: string) {
     return http<BookResponse>(`/books/${id}`);
   },
+  async bookText(id: string, offset = 0, length = 65536) {
+    const params = new URLSearchParams({ offset: String(offset), length: String(length) });
+    const response = await fetch(`${API_BASE_URL}/books/${id}/text?${params.toString()}`);
+    if (!response.ok) {
+      const errorBody = await response.json().catch(() => ({}));
+      throw new Error(errorBody?.detail ?? 'Unexpected API error');
+    }
+    const nextOffset = response.headers.get('X-Next-Offset');
+    return { text: await response.text(), nextOffset: nextOffset === null ? null : Number(nextOffset) };
+  },
+  bookTextUrl(id: string) {
+    return `${API_BASE_URL}/books/${id}/text`;
+  },
   suggestions(bookId: string, limit = 5) {
     const params = new URLSearchParams({ book_id: bookId, limit: String(limit) });
     return http<SuggestionsResponse>(`/suggestions?${params.toString()}`);
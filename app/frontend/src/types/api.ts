@@ -15,13 +15,13 @@ export type SearchResponse = {
 
 export type AdvancedSearchResponse = SearchResponse & {
   regex: string;
+  partial?: boolean;
 };
 
 export type BookResponse = {
   id: string | null;
   title: string | null;
   author: string | null;
-  text: string | null;
   word_count: number | null;
   centrality_score: number | null;
   image_url: string | null;
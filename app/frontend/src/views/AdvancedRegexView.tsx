@@ -11,6 +11,7 @@ export function AdvancedRegexView() {
   const [results, setResults] = useState<SearchResult[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [isSearching, setIsSearching] = useState(false);
+  const [isPartial, setIsPartial] = useState(false);
   const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
   const [suggestionsError, setSuggestionsError] = useState<string | null>(null);
   const [isLoadingSuggestions, setIsLoadingSuggestions] = useState(false);
@@ -40,8 +41,10 @@ export function AdvancedRegexView() {
     try {
       const response = await api.regex(value);
       setResults(response.results);
+      setIsPartial(response.partial ?? false);
     } catch (err) {
       setResults([]);
+      setIsPartial(false);
       setError(err instanceof Error ? err.message : 'Regex search failed');
     } finally {
       setIsSearching(false);
@@ -78,6 +81,11 @@ export function AdvancedRegexView() {
               Showing matches for <strong>/{regex}/</strong>
             </p>
           )}
+          {isPartial && !isSearching && (
+            <p className="muted">
+              The search ran out of time: these are the matches found so far.
+            </p>
+          )}
           <div className="results-grid">
             {results.map((result) => (
               <SearchResultCard key={result.id ?? crypto.randomUUID()} result={result} />
@@ -12,6 +12,10 @@ export function BookDetailsView() {
   const [error, setError] = useState<string | null>(null);
   const [suggestionsError, setSuggestionsError] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [text, setText] = useState('');
+  const [nextOffset, setNextOffset] = useState<number | null>(null);
+  const [textError, setTextError] = useState<string | null>(null);
+  const [isLoadingText, setIsLoadingText] = useState(false);
 
   useEffect(() => {
     if (!bookId) return;
@@ -26,8 +30,32 @@ export function BookDetailsView() {
         setBook(null);
       })
       .finally(() => setIsLoading(false));
+
+    setText('');
+    setNextOffset(null);
+    setTextError(null);
+    api.bookText(bookId)
+      .then((page) => {
+        setText(page.text);
+        setNextOffset(page.nextOffset);
+      })
+      .catch((err) => setTextError(err instanceof Error ? err.message : 'Unable to fetch text'));
   }, [bookId]);
 
+  const loadMoreText = async () => {
+    if (!bookId || nextOffset === null) return;
+    setIsLoadingText(true);
+    try {
+      const page = await api.bookText(bookId, nextOffset);
+      setText((previous) => previous + page.text);
+      setNextOffset(page.nextOffset);
+    } catch (err) {
+      setTextError(err instanceof Error ? err.message : 'Unable to fetch text');
+    } finally {
+      setIsLoadingText(false);
+    }
+  };
+
   const refreshSuggestions = async () => {
     if (!bookId) return;
     setSuggestionsError(null);
@@ -99,22 +127,19 @@ export function BookDetailsView() {
 
         <section className="book-text" style={{ background: 'transparent', padding: 0, marginTop: '2rem' }}>
           <div className="panel">
-            <h3>Raw Text</h3>
-            <p className="muted" style={{ marginBottom: '1rem' }}>
-              The full text content of this book is available.
-            </p>
-            <button
-              className="text-button"
-              onClick={() => {
-                if (book?.text) {
-                  const blob = new Blob([book.text], { type: 'text/plain' });
-                  const url = URL.createObjectURL(blob);
-                  window.open(url, '_blank');
-                }
-              }}
-            >
-              Open Raw Text in New Tab ↗
-            </button>
+            <div className="panel-header">
+              <h3>Text</h3>
+              <a className="text-button" href={api.bookTextUrl(bookId)} target="_blank" rel="noreferrer">
+                Open Raw Text in New Tab ↗
+              </a>
+            </div>
+            {textError && <p className="error">{textError}</p>}
+            <pre style={{ whiteSpace: 'pre-wrap', maxHeight: '60vh', overflowY: 'auto' }}>{text}</pre>
+            {nextOffset !== null && (
+              <button className="text-button" onClick={loadMoreText} disabled={isLoadingText}>
+                {isLoadingText ? 'Loading…' : 'Load more'}
+              </button>
+            )}
           </div>
         </section>
       </article>
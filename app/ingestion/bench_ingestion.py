@@ -0,0 +1,184 @@
+"""
+Passage à l'échelle de l'ingestion : temps de chaque étape de load_books.py sur des corpus
+synthétiques de tailles croissantes (voir generate_corpus.py).
+
+Étapes mesurées, pour chaque taille :
+  - tokenize : préparation des livres (métadonnées, tokens, TF, positions, trigrammes), pool de processus ;
+  - index    : écriture de l'index (COPY par lots, bulk_writer.BulkWriter) ;
+  - jaccard  : arêtes du graphe (moteur de similarité choisi) ;
+  - closeness: centralité de proximité (exacte, ou approchée avec --closeness-pivots) ;
+  - persist  : écriture du graphe (jaccard_graph, book_neighbors, closeness_score).
+
+index et persist ne sont mesurées qu'avec --database : cette base (schéma des migrations déjà
+créé) est VIDÉE avant chaque taille. Sans --database, les identifiants des mots sont attribués
+hors base, hors mesure.
+
+Les corpus sont emboîtés (les N premiers livres du plus grand corpus, même graine) ; l'exposant
+de passage à l'échelle de chaque étape est la pente de log(temps) en fonction de log(livres) :
+~1 pour une étape linéaire, ~2 pour une étape quadratique. --plot trace les courbes (matplotlib).
+
+    python bench_ingestion.py --sizes 100 200 400 800 --similarity exact --plot scaling.png [--database searchbook_bench]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+import psycopg2
+
+import bulk_writer
+import generate_corpus
+import load_books
+import similarity
+import vocabulary
+
+STAGES = ['tokenize', 'index', 'jaccard', 'closeness', 'persist']
+
+
+def reset_database(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE books, term_stats, terms RESTART IDENTITY CASCADE;")
+        cursor.execute("SELECT rebuild_corpus_stats();")
+    conn.commit()
+
+
+def run_size(paths : list[str], args, conn=None) -> dict:
+    """Temps (secondes) de chaque étape sur les livres paths ; None pour une étape non mesurée."""
+    timings = dict.fromkeys(STAGES)
+
+    start = time.perf_counter()
+    jobs = ((path, load_books.prepare_book_file, (path, gutenberg_id, args.min_words))
+            for gutenberg_id, path in enumerate(paths, start=1))
+    books = [book for _, book in load_books.prepare_in_pool(jobs, args.workers)
+             if not isinstance(book, Exception) and book.content_lower is not None]
+    timings['tokenize'] = time.perf_counter() - start
+
+    token_sets = {}
+    if conn is not None:
+        reset_database(conn)
+        start = time.perf_counter()
+        term_vocabulary = vocabulary.Vocabulary.load(conn)
+        with bulk_writer.BulkWriter(conn, lambda book_id, book: token_sets.__setitem__(book_id, book.term_ids),
+                                    args.commit_every, vocabulary=term_vocabulary) as writer:
+            for book in books:
+                writer.add(book)
+        timings['index'] = time.perf_counter() - start
+    else:
+        term_vocabulary = vocabulary.Vocabulary()
+        token_sets = {book_id: term_vocabulary.encode(book.term_frequencies) for book_id, book in enumerate(books, start=1)}
+    del books
+
+    options = {} if args.similarity == 'legacy' else {'workers': args.workers}
+    engine = similarity.get_engine(args.similarity, **options)
+    start = time.perf_counter()
+    edges = engine.pairs(token_sets, load_books.JACCARD_THRESHOLD)
+    timings['jaccard'] = time.perf_counter() - start
+
+    adjacency_list = defaultdict(dict)
+    for id_a, id_b, score in edges:
+        adjacency_list[id_a][id_b] = adjacency_list[id_b][id_a] = 1.0 - score
+    start = time.perf_counter()
+    closeness_scores = load_books._closeness_scores(adjacency_list, args.workers, args.closeness_pivots, None) if edges else {}
+    timings['closeness'] = time.perf_counter() - start
+
+    if conn is not None:
+        start = time.perf_counter()
+        bulk_writer.write_graph(conn, edges, closeness_scores)
+        timings['persist'] = time.perf_counter() - start
+
+    return {'books': len(token_sets), 'edges': len(edges), 'seconds': timings}
+
+
+def scaling_exponents(results : list[dict]) -> dict[str, float | None]:
+    """Pente de log(temps) / log(livres) de chaque étape (moindres carrés)."""
+    exponents = {}
+    for stage in STAGES:
+        points = [(r['books'], r['seconds'][stage]) for r in results if r['seconds'][stage] and r['books']]
+        if len(points) < 2:
+            exponents[stage] = None
+            continue
+        x, y = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+        exponents[stage] = float(np.polyfit(x, y, 1)[0])
+    return exponents
+
+
+def plot(results : list[dict], exponents : dict, path : str):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib n'est pas installé : pas de graphique.")
+        return
+    fig, ax = plt.subplots(figsize=(7, 5))
+    for stage in STAGES:
+        points = [(r['books'], r['seconds'][stage]) for r in results if r['seconds'][stage] is not None]
+        if points:
+            label = stage if exponents[stage] is None else f"{stage} (n^{exponents[stage]:.2f})"
+            ax.plot(*zip(*points), marker='o', label=label)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('livres')
+    ax.set_ylabel('secondes')
+    ax.set_title("Ingestion : temps par étape")
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend()
+    fig.savefig(path, dpi=120, bbox_inches='tight')
+    print(f"Graphique écrit dans {path}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le temps de chaque étape de l'ingestion sur des corpus synthétiques de tailles croissantes.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 200, 400], help="Nombres de livres.")
+    parser.add_argument('--path', type=str, default=None,
+                        help="Répertoire du corpus (pg<ID>.txt) ; généré dans un répertoire temporaire s'il est vide ou absent.")
+    parser.add_argument('--similarity', choices=sorted(similarity.ENGINES), default='exact')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--closeness-pivots', type=int, default=None, help="Closeness approchée (défaut : exacte).")
+    parser.add_argument('--min-words', type=int, default=1000)
+    parser.add_argument('--commit-every', type=int, default=50)
+    parser.add_argument('--database', type=str, default=None,
+                        help="Base (VIDÉE à chaque taille) pour mesurer index et persist ; hôte et identifiants de load_books.DB_CONFIG.")
+    parser.add_argument('--output', type=str, default=None, help="Résultats au format JSON.")
+    parser.add_argument('--plot', type=str, default=None, help="Image des courbes de passage à l'échelle (matplotlib).")
+    generate_corpus.add_arguments(parser)
+    args = parser.parse_args()
+    sizes = sorted(set(args.sizes))
+
+    conn = psycopg2.connect(**(load_books.DB_CONFIG | {'database': args.database})) if args.database else None
+    with tempfile.TemporaryDirectory(prefix='searchbook-corpus-') as temporary:
+        directory = args.path or temporary
+        paths = [os.path.join(directory, f"pg{number}.txt") for number in range(1, sizes[-1] + 1)]
+        missing = [number for number, path in enumerate(paths, start=1) if not os.path.exists(path)]
+        if missing:
+            print(f"Génération de {len(missing)} livres dans {directory}...")
+            generator = generate_corpus.from_arguments(args)
+            for number in missing:
+                generator.write(directory, 1, start_id=number)
+
+        results = []
+        header = f"{'livres':>7} {'arêtes':>9} " + ' '.join(f"{stage:>10}" for stage in STAGES)
+        print(header)
+        for size in sizes:
+            result = run_size(paths[:size], args, conn)
+            results.append(result)
+            print(f"{result['books']:>7} {result['edges']:>9} "
+                  + ' '.join(f"{t:>10.3f}" if t is not None else f"{'-':>10}" for t in result['seconds'].values()))
+    if conn is not None:
+        conn.close()
+
+    exponents = scaling_exponents(results)
+    print("exposant " + ' '.join(f"{stage}={value:.2f}" for stage, value in exponents.items() if value is not None))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': results, 'exponents': exponents}, f, indent=2)
+    if args.plot:
+        plot(results, exponents, args.plot)
+
+
+if __name__ == "__main__":
+    main()
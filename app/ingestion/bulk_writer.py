@@ -0,0 +1,262 @@
+"""
+Écriture en masse de l'index (books, inverted_index, term_positions, book_trigrams, book_signatures, terms, jaccard_graph) par COPY FROM STDIN.
+
+Les livres préparés sont accumulés et écrits par lots : un lot = un COPY par table
++ la mise à jour des statistiques (term_stats, corpus_stats) + un seul COMMIT.
+Les ids des livres sont préalloués via la séquence de books, ce qui permet
+d'écrire les postings sans attendre un RETURNING.
+
+Avec un vocabulaire (voir vocabulary), les mots de chaque livre sont internés en
+identifiants (book.term_ids) et les nouveaux mots sont ajoutés à terms dans la
+même transaction.
+
+Si un lot échoue (ex. gutenberg_id déjà présent), il est rejoué livre par livre
+pour ne perdre que les livres fautifs.
+
+Optionnellement (defer_indexes), les index secondaires sont supprimés pendant le
+chargement puis reconstruits en une fois à la fin, ce qui est bien plus rapide
+que de les maintenir ligne à ligne.
+"""
+
+import psycopg2
+
+# Tables concernées par la suppression temporaire des index secondaires
+BULK_TABLES = ['books', 'inverted_index', 'term_positions', 'book_trigrams', 'book_signatures']
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_field(value) -> str:
+    """Valeur au format texte de COPY (NULL = \\N, tableaux = {a,b,c}, bytea en hexadécimal)."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(map(str, value)) + '}'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _RowStream:
+    """
+    Objet fichier (read) qui produit les lignes COPY à la demande, sans tout matérialiser.
+    read(size) renvoie des lignes entières (au moins size caractères sauf à la fin) :
+    psycopg2 transmet tel quel ce qui est lu, et découper un long contenu coûterait des copies.
+    """
+
+    def __init__(self, rows):
+        self._lines = ('\t'.join(map(_copy_field, row)) + '\n' for row in rows)
+
+    def read(self, size : int = -1) -> str:
+        chunk = []
+        length = 0
+        for line in self._lines:
+            chunk.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        return ''.join(chunk)
+
+
+def copy_rows(cursor, table : str, columns : list[str], rows):
+    """COPY d'un itérable de tuples dans table(columns)."""
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", _RowStream(rows), size=1 << 16)
+
+
+class BulkWriter:
+    """
+    Écrit les livres préparés (load_books.PreparedBook) par lots de commit_every livres.
+    À utiliser comme gestionnaire de contexte : le dernier lot est écrit et les index
+    différés sont reconstruits à la sortie.
+    """
+
+    def __init__(self, conn, on_written, commit_every : int = 50, defer_indexes : bool = False, vocabulary=None):
+        self.conn = conn
+        self.on_written = on_written  # on_written(book_id, book), appelé après le commit de chaque livre
+        self.commit_every = max(1, commit_every)
+        self.defer_indexes = defer_indexes
+        self.vocabulary = vocabulary
+        self._pending : list[tuple[int, object]] = []  # (book_id préalloué, PreparedBook)
+        self._free_ids : list[int] = []
+        self._deferred_indexes : list[tuple[str, str]] = []
+
+    def __enter__(self):
+        if self.defer_indexes:
+            self._deferred_indexes = drop_secondary_indexes(self.conn, BULK_TABLES)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            if self._deferred_indexes:
+                recreate_indexes(self.conn, self._deferred_indexes)
+                self._deferred_indexes = []
+
+    def _next_book_id(self) -> int:
+        if not self._free_ids:
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence('books', 'id')) FROM generate_series(1, %s);",
+                    (self.commit_every,)
+                )
+                self._free_ids = [row[0] for row in cursor.fetchall()][::-1]
+            self.conn.commit()
+        return self._free_ids.pop()
+
+    def add(self, book) -> int:
+        """Ajoute un livre au lot courant (écrit quand le lot est plein). Retourne son id."""
+        book_id = self._next_book_id()
+        self._pending.append((book_id, book))
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+        return book_id
+
+    def flush(self):
+        """Écrit le lot courant en une transaction (rejoué livre par livre en cas d'erreur)."""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self._write(batch)
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            if len(batch) == 1:
+                print(f"Erreur DB pour l'ID {batch[0][1].gutenberg_id}: {e}")
+                return
+            print(f"   -> Échec du lot de {len(batch)} livres, reprise livre par livre...")
+            for book_id, book in batch:
+                try:
+                    self._write([(book_id, book)])
+                except psycopg2.Error as e:
+                    self.conn.rollback()
+                    print(f"Erreur DB pour l'ID {book.gutenberg_id}: {e}")
+
+    def _write(self, batch : list[tuple[int, object]]):
+        if self.vocabulary is not None:
+            for _, book in batch:
+                book.term_ids = self.vocabulary.encode(book.term_frequencies.keys())
+
+        with self.conn.cursor() as cursor:
+            if self.vocabulary is not None:
+                # Mots nouveaux, y compris ceux d'un lot précédent annulé (rollback)
+                copy_rows(cursor, 'terms', ['id', 'word'], self.vocabulary.pending())
+            copy_rows(cursor, 'books',
+                      ['id', 'gutenberg_id', 'title', 'author', 'language', 'publication_year', 'image_url', 'content', 'word_count'],
+                      ((book_id, book.gutenberg_id, book.metadata.get('title'), book.metadata.get('author'),
+                        book.metadata.get('language'), book.metadata.get('publication_year'),
+                        gutenberg_image_url(book.gutenberg_id), book.content_lower, book.word_count)
+                       for book_id, book in batch))
+            copy_rows(cursor, 'inverted_index', ['word', 'book_id', 'frequency'],
+                      ((word, book_id, freq) for book_id, book in batch for word, freq in book.term_frequencies.items()))
+            copy_rows(cursor, 'term_positions', ['book_id', 'word', 'positions'],
+                      ((book_id, word, positions) for book_id, book in batch for word, positions in (book.term_positions or {}).items()))
+            copy_rows(cursor, 'book_trigrams', ['book_id', 'trigrams'],
+                      ((book_id, book.trigrams) for book_id, book in batch))
+            signatures = [(book_id, len(book.signature) // 4, book.signature) for book_id, book in batch if book.signature is not None]
+            if signatures:
+                copy_rows(cursor, 'book_signatures', ['book_id', 'num_perm', 'signature'], signatures)
+            update_corpus_stats(cursor, [book_id for book_id, _ in batch], sum(book.word_count for _, book in batch))
+        self.conn.commit()
+        if self.vocabulary is not None:
+            self.vocabulary.mark_persisted()
+
+        for book_id, book in batch:
+            self.on_written(book_id, book)
+
+
+def gutenberg_image_url(gutenberg_id : int) -> str:
+    return f"https://www.gutenberg.org/cache/epub/{gutenberg_id}/pg{gutenberg_id}.cover.medium.jpg"
+
+
+def update_corpus_stats(cursor, book_ids : list[int], word_count : int):
+    """
+    Ajoute des livres fraîchement indexés aux tables term_stats et corpus_stats
+    (df, tf total, tf max et identifiant par mot ; N, longueur totale) et incrémente la génération de l'index.
+    """
+    cursor.execute("""
+        INSERT INTO term_stats (word, doc_freq, total_tf, max_tf, term_id)
+        SELECT ii.word, COUNT(*), SUM(ii.frequency), MAX(ii.frequency), t.id
+        FROM inverted_index ii
+        LEFT JOIN terms t ON t.word = ii.word
+        WHERE ii.book_id = ANY(%s)
+        GROUP BY ii.word, t.id
+        ON CONFLICT (word) DO UPDATE SET
+            doc_freq = term_stats.doc_freq + EXCLUDED.doc_freq,
+            total_tf = term_stats.total_tf + EXCLUDED.total_tf,
+            max_tf = GREATEST(term_stats.max_tf, EXCLUDED.max_tf),
+            term_id = COALESCE(term_stats.term_id, EXCLUDED.term_id);
+    """, (book_ids,))
+    cursor.execute("""
+        UPDATE corpus_stats
+        SET num_docs = num_docs + %s,
+            total_words = total_words + %s,
+            generation = generation + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    """, (len(book_ids), word_count))
+
+
+# --- GRAPHE ---
+
+# Voisins gardés par livre dans book_neighbors (>= limite maximale de /api/suggestions)
+NEIGHBORS_TOP_N = 20
+
+def write_graph(conn, edges : list[tuple[int, int, float]], closeness_scores : dict[int, float],
+                neighbors_top_n : int = NEIGHBORS_TOP_N):
+    """
+    Arêtes Jaccard par COPY, listes de voisins (book_neighbors) des livres touchés par ces arêtes,
+    puis scores de closeness en un seul UPDATE ensembliste, en une transaction.
+    La génération de l'index est incrémentée dans la même transaction : le tri par centralité
+    change, les réponses en cache du backend ne doivent plus être servies.
+    """
+    with conn.cursor() as cursor:
+        if edges:
+            copy_rows(cursor, 'jaccard_graph', ['book_a_id', 'book_b_id', 'similarity_score'], edges)
+            touched = sorted({book_id for edge in edges for book_id in edge[:2]})
+            cursor.execute("SELECT refresh_book_neighbors(%s, %s);", (touched, neighbors_top_n))
+        if closeness_scores:
+            cursor.execute("""
+                UPDATE books b
+                SET closeness_score = c.score
+                FROM unnest(%s::int[], %s::float8[]) AS c(id, score)
+                WHERE b.id = c.id;
+            """, (list(closeness_scores.keys()), list(closeness_scores.values())))
+        if edges or closeness_scores:
+            cursor.execute("UPDATE corpus_stats SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP;")
+    conn.commit()
+
+
+# --- INDEX SECONDAIRES DIFFÉRÉS ---
+
+def drop_secondary_indexes(conn, tables : list[str]) -> list[tuple[str, str]]:
+    """
+    Supprime les index qui ne portent pas de contrainte (ni clé primaire ni unicité)
+    sur les tables données. Retourne leurs (nom, définition) pour recreate_indexes.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            WHERE t.relname = ANY(%s) AND NOT x.indisprimary AND NOT x.indisunique;
+        """, (tables,))
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}";')
+    conn.commit()
+    if indexes:
+        print(f"   -> {len(indexes)} index secondaires suspendus pendant le chargement : {', '.join(n for n, _ in indexes)}")
+    return indexes
+
+
+def recreate_indexes(conn, indexes : list[tuple[str, str]]):
+    print(f"   -> Reconstruction de {len(indexes)} index secondaires...")
+    conn.rollback()  # au cas où une transaction aurait été laissée en échec
+    with conn.cursor() as cursor:
+        for _, definition in indexes:
+            cursor.execute(definition + ';')
+    conn.commit()
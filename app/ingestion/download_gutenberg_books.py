@@ -1,82 +1,277 @@
-import requests
-import os
+import asyncio
 import argparse
+import json
+import os
+import queue
+import random
+import threading
 import time
 
+import aiohttp
+
 # --- CONFIGURATION ---
-GUTENBERG_URL_TEMPLATE = "https://www.gutenberg.org/cache/epub/{id}/pg{id}.txt"
+DEFAULT_BASE_URL = "https://www.gutenberg.org"
+GUTENBERG_PATH_TEMPLATE = "/cache/epub/{id}/pg{id}.txt"
 DEFAULT_START_ID = 1
 DEFAULT_NUM_BOOKS = 2000
 OUTPUT_DIR = "livres"
+MANIFEST_NAME = "manifest.json"
+
+DEFAULT_CONCURRENCY = 8    # Requêtes simultanées au maximum
+DEFAULT_RATE = 2.0         # Requêtes par seconde en régime établi (seau à jetons)
+DEFAULT_BURST = 4          # Requêtes pouvant partir d'un coup
+DEFAULT_RETRIES = 4        # Nouvelles tentatives sur erreur transitoire (timeout, 429, 5xx)
+DEFAULT_BACKOFF = 1.0      # Délai de base (s) du backoff exponentiel
+REQUEST_TIMEOUT = 30
 # --- FIN CONFIGURATION ---
 
-def download_books(start_id, num_books):
+# Statuts d'un ID dans le manifeste
+DONE, NOT_FOUND, FAILED = 'done', 'not_found', 'failed'
+
+
+class TokenBucket:
+    """Limiteur de débit : rate jetons par seconde, au plus capacity en réserve."""
+
+    def __init__(self, rate : float, capacity : int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Manifest:
+    """
+    État persistant des IDs traités (done / not_found / failed), pour reprendre un
+    téléchargement interrompu. Écrit de façon atomique (fichier temporaire + rename).
+    """
+
+    def __init__(self, path : str | None):
+        self.path = path
+        self.entries : dict[str, dict] = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        self._dirty = 0
+
+    def status(self, gutenberg_id : int) -> str | None:
+        entry = self.entries.get(str(gutenberg_id))
+        return entry['status'] if entry else None
+
+    def should_skip(self, gutenberg_id : int) -> bool:
+        """Les IDs déjà téléchargés ou introuvables sont ignorés ; les échecs sont retentés."""
+        return self.status(gutenberg_id) in (DONE, NOT_FOUND)
+
+    def record(self, gutenberg_id : int, status : str, detail : str | None = None):
+        self.entries[str(gutenberg_id)] = {'status': status, 'detail': detail} if detail else {'status': status}
+        self._dirty += 1
+        if self._dirty >= 20:
+            self.save()
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+    def counts(self) -> dict[str, int]:
+        counts = {DONE: 0, NOT_FOUND: 0, FAILED: 0}
+        for entry in self.entries.values():
+            counts[entry['status']] += 1
+        return counts
+
+
+def book_url(base_url : str, gutenberg_id : int) -> str:
+    return base_url.rstrip('/') + GUTENBERG_PATH_TEMPLATE.format(id=gutenberg_id)
+
+
+class _TransientError(Exception):
+    def __init__(self, message : str, retry_after : float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+async def _fetch_one(session, bucket : TokenBucket, url : str, retries : int, backoff : float) -> tuple[str, str | None]:
+    """(statut, texte ou détail de l'erreur) pour une URL, avec backoff exponentiel sur les erreurs transitoires."""
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return DONE, await response.text(errors='replace')
+                if response.status == 404:
+                    return NOT_FOUND, None
+                if response.status == 429 or response.status >= 500:
+                    retry_after = response.headers.get('Retry-After')
+                    raise _TransientError(f"HTTP {response.status}",
+                                          float(retry_after) if retry_after and retry_after.isdigit() else None)
+                return FAILED, f"HTTP {response.status}"
+        except (_TransientError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                return FAILED, str(e) or type(e).__name__
+            delay = getattr(e, 'retry_after', None) or backoff * 2 ** attempt
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+
+async def fetch_books(ids, base_url : str = DEFAULT_BASE_URL, concurrency : int = DEFAULT_CONCURRENCY,
+                      rate : float = DEFAULT_RATE, burst : int = DEFAULT_BURST, retries : int = DEFAULT_RETRIES,
+                      backoff : float = DEFAULT_BACKOFF, manifest : Manifest | None = None):
+    """
+    Générateur asynchrone de (id, statut, texte ou détail) : au plus concurrency requêtes en
+    cours, débit limité par un seau à jetons. Les résultats arrivent dans l'ordre de fin.
+    Les IDs marqués done / not_found dans le manifeste sont ignorés.
+    """
+    manifest = manifest or Manifest(None)
+    bucket = TokenBucket(rate, burst)
+    pending_ids = iter([i for i in ids if not manifest.should_skip(i)])
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async def task(gutenberg_id):
+            status, payload = await _fetch_one(session, bucket, book_url(base_url, gutenberg_id), retries, backoff)
+            return gutenberg_id, status, payload
+
+        in_flight = set()
+        try:
+            while True:
+                for gutenberg_id in pending_ids:
+                    in_flight.add(asyncio.create_task(task(gutenberg_id)))
+                    if len(in_flight) >= concurrency:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for finished_task in finished:
+                    gutenberg_id, status, payload = finished_task.result()
+                    manifest.record(gutenberg_id, status, payload if status == FAILED else None)
+                    yield gutenberg_id, status, payload
+        finally:
+            for pending in in_flight:
+                pending.cancel()
+            manifest.save()
+
+
+def iter_books(ids, **options):
+    """
+    Version synchrone de fetch_books : la boucle asyncio tourne dans un thread et les
+    résultats passent par une file bornée, le code appelant (ex. l'insertion en base)
+    travaille donc pendant que les téléchargements suivants continuent.
+    """
+    results = queue.Queue(maxsize=options.get('concurrency', DEFAULT_CONCURRENCY) * 2)
+    end = object()
+    stop = threading.Event()
+
+    async def produce():
+        async for item in fetch_books(ids, **options):
+            while not stop.is_set():
+                try:
+                    results.put_nowait(item)
+                    break
+                except queue.Full:
+                    await asyncio.sleep(0.05)
+            if stop.is_set():
+                return
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except BaseException as e:
+            results.put(e)
+        finally:
+            results.put(end)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while (item := results.get()) is not end:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Débloque le producteur s'il attend de la place dans la file
+        while thread.is_alive():
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def download_books(start_id, num_books, output_dir : str = OUTPUT_DIR, base_url : str = DEFAULT_BASE_URL,
+                   concurrency : int = DEFAULT_CONCURRENCY, rate : float = DEFAULT_RATE, retries : int = DEFAULT_RETRIES):
     """
     Télécharge une série de livres de Project Gutenberg.
-    
+
     Args:
         start_id (int): L'ID Gutenberg à partir duquel commencer.
         num_books (int): Le nombre total d'IDs à tenter.
     """
     print(f"--- 📚 DÉMARRAGE DU TÉLÉCHARGEMENT ---")
-    print(f"Cible : {num_books} IDs de {start_id} à {start_id + num_books - 1}")
-    
+    print(f"Cible : {num_books} IDs de {start_id} à {start_id + num_books - 1} ({concurrency} en parallèle, {rate} req/s)")
+
     # 1. Création du répertoire de sortie
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    print(f"Répertoire créé/vérifié : ./{OUTPUT_DIR}/")
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"Répertoire créé/vérifié : {os.path.join('.', output_dir)}/")
 
-    books_downloaded = 0
-    
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+    ids = []
     for i in range(start_id, start_id + num_books):
-        url = GUTENBERG_URL_TEMPLATE.format(id=i)
-        filepath = os.path.join(OUTPUT_DIR, f"pg{i}.txt")
-        
         # Vérifie si le fichier existe déjà pour éviter de le re-télécharger
-        if os.path.exists(filepath):
-            print(f"ID {i}: Fichier pg{i}.txt existe déjà. Ignoré.")
-            books_downloaded += 1
+        if os.path.exists(os.path.join(output_dir, f"pg{i}.txt")):
+            if manifest.status(i) != DONE:
+                manifest.record(i, DONE)
             continue
+        ids.append(i)
+    print(f"{num_books - len(ids)} fichiers déjà présents, {sum(manifest.should_skip(i) for i in ids)} IDs déjà connus comme absents.")
 
-        try:
-            # 2. Requête HTTP
-            # Utilisation de stream=True pour gérer les gros fichiers
-            response = requests.get(url, stream=True, timeout=15)
-            
-            # 3. Vérification du statut
-            if response.status_code == 404:
-                print(f"ID {i}: Non trouvé (404), ignoré.")
-                continue
-            elif response.status_code != 200:
-                print(f"ID {i}: Erreur de statut {response.status_code}, ignoré.")
-                continue
-
-            # 4. Écriture du fichier
-            with open(filepath, 'w', encoding='utf-8') as f:
-                # Utilisation de response.text pour décoder et écrire directement
-                # Attention: Pour les très gros fichiers, il est parfois mieux 
-                # d'utiliser response.iter_content, mais response.text est plus simple ici.
-                f.write(response.text)
-            
+    for i, status, payload in iter_books(ids, base_url=base_url, concurrency=concurrency, rate=rate,
+                                         retries=retries, manifest=manifest):
+        if status == DONE:
+            # 2. Écriture du fichier (via un fichier temporaire : pas de fichier tronqué en cas d'interruption)
+            filepath = os.path.join(output_dir, f"pg{i}.txt")
+            with open(filepath + '.part', 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(filepath + '.part', filepath)
             print(f"ID {i}: Téléchargé et enregistré sous pg{i}.txt")
-            books_downloaded += 1
+        elif status == NOT_FOUND:
+            print(f"ID {i}: Non trouvé (404), ignoré.")
+        else:
+            print(f"ID {i}: Échec après plusieurs tentatives ({payload}), sera retenté au prochain lancement.")
 
-        except requests.exceptions.RequestException as e:
-            print(f"ID {i}: Erreur de connexion ou timeout: {e}")
-        
-        # Respecter le site Gutenberg en ralentissant les requêtes
-        time.sleep(0.5) 
-
-    print(f"\n--- ✅ TERMINÉ. {books_downloaded} fichiers téléchargés/trouvés dans ./{OUTPUT_DIR}/ ---")
+    manifest.save()
+    counts = manifest.counts()
+    print(f"\n--- ✅ TERMINÉ. {counts[DONE]} fichiers dans {os.path.join('.', output_dir)}/, "
+          f"{counts[NOT_FOUND]} IDs introuvables, {counts[FAILED]} échecs (manifeste : {manifest.path}) ---")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Télécharge les textes de Project Gutenberg.")
-    parser.add_argument('--start_id', type=int, default=DEFAULT_START_ID, 
+    parser.add_argument('--start_id', type=int, default=DEFAULT_START_ID,
                         help="ID Gutenberg à partir duquel commencer (par défaut: 1).")
-    parser.add_argument('--num_books', type=int, default=DEFAULT_NUM_BOOKS, 
-                        help="Nombre total d'IDs à tenter (par défaut: 200).")
-    
+    parser.add_argument('--num_books', type=int, default=DEFAULT_NUM_BOOKS,
+                        help="Nombre total d'IDs à tenter (par défaut: 2000).")
+    parser.add_argument('--output_dir', type=str, default=OUTPUT_DIR, help="Répertoire de sortie (et du manifeste).")
+    parser.add_argument('--base-url', type=str, default=DEFAULT_BASE_URL,
+                        help="Serveur Gutenberg (ou miroir / serveur local de test).")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Requêtes simultanées.")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Requêtes par seconde.")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help="Nouvelles tentatives sur erreur transitoire.")
+
     args = parser.parse_args()
-    
+
     # Exécuter la fonction principale
-    download_books(args.start_id, args.num_books)
\ No newline at end of file
+    download_books(args.start_id, args.num_books, args.output_dir, args.base_url, args.concurrency, args.rate, args.retries)
@@ -0,0 +1,166 @@
+"""
+Générateur de corpus synthétique au format Gutenberg, pour tester load_books.py à grande
+échelle sans rien télécharger.
+
+Chaque livre pg<ID>.txt a l'en-tête lu par load_books.extract_metadata (Title:, Author:,
+Language:, Release Date:), les marqueurs *** START / END OF THE PROJECT GUTENBERG EBOOK ***
+et un texte en phrases et paragraphes. Les mots suivent une loi de Zipf :
+
+  - un vocabulaire commun de --vocabulary mots (loi de Zipf d'exposant --zipf) ;
+  - --topics thèmes, chacun avec son propre vocabulaire de --topic-vocabulary mots, disjoint
+    des autres (même loi de Zipf) ;
+  - chaque mot d'un livre vient du vocabulaire commun avec la probabilité --overlap, sinon du
+    thème du livre. --overlap règle donc le recouvrement des livres, c'est-à-dire la densité
+    du graphe Jaccard : proche de 1, tous les livres se ressemblent ; proche de 0, seuls les
+    livres d'un même thème sont reliés.
+
+La longueur des livres suit une loi log-normale de médiane --words (dispersion --length-spread).
+Chaque livre est tiré avec sa propre graine (--seed, numéro du livre) : un corpus de N livres
+est le préfixe d'un corpus plus grand de même graine, ce qui permet de mesurer le passage à
+l'échelle sur des corpus emboîtés.
+
+    python generate_corpus.py --output /tmp/corpus --books 1000 --words 20000 --topics 20 --overlap 0.5
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+          'September', 'October', 'November', 'December']
+_SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu', 'ra', 'se', 'ti', 'vo',
+              'za', 'bel', 'cor', 'dan', 'fer', 'gil', 'lan', 'mor', 'nes', 'par', 'ros', 'tan', 'vil']
+SENTENCE_WORDS = (6, 18)
+PARAGRAPH_SENTENCES = (3, 8)
+
+
+def make_vocabulary(size : int, seed : int) -> list[str]:
+    """size mots distincts et prononçables, dans un ordre aléatoire reproductible."""
+    rng = np.random.default_rng(seed)
+    words = set()
+    length = 2
+    while len(words) < size:
+        for _ in range(size * 2):
+            words.add(''.join(_SYLLABLES[i] for i in rng.integers(len(_SYLLABLES), size=length)))
+            if len(words) >= size:
+                break
+        length += 1  # combinaisons épuisées : mots plus longs
+    vocabulary = sorted(words)
+    rng.shuffle(vocabulary)
+    return vocabulary
+
+
+def zipf_weights(size : int, exponent : float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+class CorpusGenerator:
+    def __init__(self, vocabulary_size : int = 20_000, topics : int = 10, topic_vocabulary : int = 5_000,
+                 overlap : float = 0.5, zipf : float = 1.1, words : int = 20_000, length_spread : float = 0.3,
+                 seed : int = 42):
+        if not 0.0 <= overlap <= 1.0:
+            raise ValueError(f"overlap doit être entre 0 et 1 : {overlap}")
+        self.topics = max(1, topics)
+        self.overlap = overlap
+        self.words = words
+        self.length_spread = length_spread
+        self.seed = seed
+        vocabulary = make_vocabulary(vocabulary_size + self.topics * topic_vocabulary, seed)
+        # Vocabulaire commun, puis un bloc disjoint par thème
+        self.common = np.array(vocabulary[:vocabulary_size])
+        self.topic_words = [
+            np.array(vocabulary[vocabulary_size + t * topic_vocabulary:vocabulary_size + (t + 1) * topic_vocabulary])
+            for t in range(self.topics)
+        ]
+        self.common_weights = zipf_weights(len(self.common), zipf)
+        self.topic_weights = zipf_weights(topic_vocabulary, zipf)
+
+    def book_words(self, rng : np.random.Generator, topic : int, count : int) -> np.ndarray:
+        from_common = rng.random(count) < self.overlap
+        words = np.empty(count, dtype=object)
+        n_common = int(from_common.sum())
+        words[from_common] = rng.choice(self.common, size=n_common, p=self.common_weights)
+        words[~from_common] = rng.choice(self.topic_words[topic], size=count - n_common, p=self.topic_weights)
+        return words
+
+    def book(self, number : int) -> str:
+        """Texte complet du livre number (1, 2, ...), identique d'un appel à l'autre."""
+        rng = np.random.default_rng([self.seed, number])
+        topic = (number - 1) % self.topics
+        count = max(100, int(rng.lognormal(np.log(self.words), self.length_spread)))
+        words = self.book_words(rng, topic, count)
+
+        paragraphs, sentences, position = [], [], 0
+        while position < count:
+            length = int(rng.integers(*SENTENCE_WORDS))
+            sentence = ' '.join(words[position:position + length])
+            position += length
+            sentences.append(sentence[:1].upper() + sentence[1:] + str(rng.choice(['.', '.', '.', '!', '?', ';'])))
+            if len(sentences) >= rng.integers(*PARAGRAPH_SENTENCES):
+                paragraphs.append(' '.join(sentences))
+                sentences = []
+        if sentences:
+            paragraphs.append(' '.join(sentences))
+
+        title = f"Synthetic Book {number}"
+        author = f"{str(rng.choice(self.common[:500])).capitalize()} {str(self.topic_words[topic][0]).capitalize()}"
+        month = MONTHS[int(rng.integers(12))]
+        return (
+            f"The Project Gutenberg eBook of {title}\n\n"
+            f"Title: {title}\n\n"
+            f"Author: {author}\n\n"
+            f"Release Date: {month} {int(rng.integers(1, 29))}, {int(rng.integers(1990, 2025))} [eBook #{number}]\n\n"
+            "Language: English\n\n"
+            f"*** START OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n\n"
+            + '\n\n'.join(paragraphs)
+            + f"\n\n*** END OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n"
+        )
+
+    def write(self, directory : str, books : int, start_id : int = 1) -> list[str]:
+        """Écrit pg<start_id>.txt ... (noms attendus par load_books --path). Retourne les chemins."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for number in range(start_id, start_id + books):
+            path = os.path.join(directory, f"pg{number}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.book(number))
+            paths.append(path)
+        return paths
+
+
+def add_arguments(parser : argparse.ArgumentParser):
+    """Options du générateur (partagées avec bench_ingestion.py)."""
+    parser.add_argument('--words', type=int, default=20_000, help="Longueur médiane des livres, en mots.")
+    parser.add_argument('--length-spread', type=float, default=0.3, help="Dispersion (sigma log-normal) des longueurs.")
+    parser.add_argument('--vocabulary', type=int, default=20_000, help="Taille du vocabulaire commun.")
+    parser.add_argument('--topics', type=int, default=10, help="Nombre de thèmes.")
+    parser.add_argument('--topic-vocabulary', type=int, default=5_000, help="Mots propres à chaque thème.")
+    parser.add_argument('--overlap', type=float, default=0.5,
+                        help="Part des mots tirés du vocabulaire commun (0 : thèmes disjoints, 1 : un seul thème).")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Exposant de la loi de Zipf.")
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def from_arguments(args) -> CorpusGenerator:
+    return CorpusGenerator(vocabulary_size=args.vocabulary, topics=args.topics, topic_vocabulary=args.topic_vocabulary,
+                           overlap=args.overlap, zipf=args.zipf, words=args.words, length_spread=args.length_spread,
+                           seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un corpus synthétique au format Gutenberg (loi de Zipf, thèmes).")
+    parser.add_argument('--output', type=str, required=True, help="Répertoire des fichiers pg<ID>.txt.")
+    parser.add_argument('--books', type=int, default=100)
+    parser.add_argument('--start-id', type=int, default=1, help="ID Gutenberg du premier livre.")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    paths = from_arguments(args).write(args.output, args.books, args.start_id)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"{len(paths)} livres écrits dans {args.output} ({size / 1e6:.1f} Mo).")
+
+
+if __name__ == "__main__":
+    main()
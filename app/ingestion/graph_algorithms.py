@@ -1,5 +1,14 @@
 # tas binaires
 import heapq
+import argparse
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 # --- 1. ALGORITHME DE DIJKSTRA ---
 
@@ -36,42 +45,344 @@ def dijkstra_shortest_path(graph_data: dict[int, float], source_id: int) -> dict
                 
     return distances
 
-# --- 2. CALCUL DES MÉTRIQUES DE CENTRALITÉ ---
+# --- 2. GRAPHE AU FORMAT CSR (Compressed Sparse Row) ---
+
+class CSRGraph:
+    """
+    Liste d'adjacence convertie une seule fois en tableaux contigus :
+    les voisins du noeud d'indice i sont indices[indptr[i]:indptr[i + 1]],
+    avec les poids correspondants dans weights (dans l'ordre de la liste d'adjacence).
+    Les indices suivent l'ordre croissant des ids de livre ; insertion_order donne
+    les indices dans l'ordre d'insertion des noeuds de la liste d'adjacence.
+    """
+
+    def __init__(self, node_ids, indptr, indices, weights, insertion_order):
+        self.node_ids = node_ids  # indice -> id du livre
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.insertion_order = insertion_order
+
+    @classmethod
+    def from_adjacency(cls, adjacency_list: dict[int, dict[int, float]]) -> "CSRGraph":
+        node_ids = array('q', sorted(adjacency_list))
+        position = {node: i for i, node in enumerate(node_ids)}
+        indptr = array('q', [0])
+        indices = array('q')
+        weights = array('d')
+        for node in node_ids:
+            neighbors = adjacency_list[node]
+            indices.extend(position[neighbor] for neighbor in neighbors)
+            weights.extend(neighbors.values())
+            indptr.append(len(indices))
+        insertion_order = array('q', (position[node] for node in adjacency_list))
+        return cls(node_ids, indptr, indices, weights, insertion_order)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    # --- Partage entre processus (un seul bloc de mémoire partagée) ---
+
+    def to_shared_memory(self) -> tuple[shared_memory.SharedMemory, tuple[int, int]]:
+        """Copie les tableaux dans un bloc partagé. Retourne le bloc et (nb noeuds, nb arcs)."""
+        n, m = self.num_nodes, len(self.indices)
+        block = shared_memory.SharedMemory(create=True, size=8 * (3 * n + 1 + 2 * m))
+        offset = 0
+        for values in (self.node_ids, self.indptr, self.indices, self.weights, self.insertion_order):
+            size = len(values) * values.itemsize
+            block.buf[offset:offset + size] = memoryview(values).cast('B')
+            offset += size
+        return block, (n, m)
+
+    @classmethod
+    def from_shared_memory(cls, buffer: memoryview, n: int, m: int) -> "CSRGraph":
+        """Vues (sans copie) sur un bloc créé par to_shared_memory."""
+        views = []
+        offset = 0
+        for length, fmt in ((n, 'q'), (n + 1, 'q'), (m, 'q'), (m, 'd'), (n, 'q')):
+            views.append(buffer[offset:offset + 8 * length].cast(fmt))
+            offset += 8 * length
+        return cls(*views)
+
+
+def csr_dijkstra(graph: CSRGraph, source: int) -> list[float]:
+    """
+    Dijkstra depuis l'indice source sur le graphe CSR (distances par indice).
+    Même parcours que dijkstra_shortest_path : les indices suivent l'ordre des ids, donc le tas
+    départage les égalités de la même façon, et les voisins sont relâchés dans le même ordre,
+    d'où des distances identiques au bit près.
+    """
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    distances = [float('inf')] * graph.num_nodes
+    distances[source] = 0
+    priority_queue = [(0, source)]  # (distance, indice)
+
+    while priority_queue:
+        current_distance, current = heapq.heappop(priority_queue)
+
+        if current_distance > distances[current]:
+            continue
+
+        start, stop = indptr[current], indptr[current + 1]
+        for neighbor, weight in zip(indices[start:stop], weights[start:stop]):
+            distance = current_distance + weight
+
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                heapq.heappush(priority_queue, (distance, neighbor))
+
+    return distances
+
+
+def closeness_from_distances(distances: list[float], source: int, order) -> float:
+    """
+    Closeness pondérée = noeuds accessibles / somme des distances minimales (0 si isolé).
+    Les distances sont sommées dans l'ordre ``order`` (celui des noeuds de la liste d'adjacence).
+    """
+    total_distance = 0.0
+    reachable_nodes_count = 0
+    for target in order:
+        distance = distances[target]
+        if distance != float('inf') and target != source:
+            total_distance += distance
+            reachable_nodes_count += 1
+    # Formule pondérée, qui peut donner > 1.0
+    return reachable_nodes_count / total_distance if total_distance > 0 else 0.0
+
+
+# --- 3. CALCUL DES MÉTRIQUES DE CENTRALITÉ ---
+
+# Graphe partagé, attaché une fois par processus de travail
+_worker_graph = None
+_worker_block = None
+
+
+def _attach_shared_graph(name: str, n: int, m: int):
+    global _worker_graph, _worker_block
+    _worker_block = shared_memory.SharedMemory(name=name)
+    _worker_graph = CSRGraph.from_shared_memory(_worker_block.buf, n, m)
+
+
+def _run_on_graph(graph: CSRGraph, func, tasks: list[tuple], workers: int | None) -> list:
+    """Exécute func(*task) pour chaque tâche, dans ce processus ou sur un pool qui lit le graphe en mémoire partagée."""
+    global _worker_graph
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    if workers == 1:
+        _worker_graph = graph
+        try:
+            return [func(*task) for task in tasks]
+        finally:
+            _worker_graph = None
+
+    block, (n, m) = graph.to_shared_memory()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_graph,
+                                 initargs=(block.name, n, m)) as pool:
+            return list(pool.map(func, *zip(*tasks)))
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _closeness_of_sources(sources: list[int]) -> list[float]:
+    graph = _worker_graph
+    return [closeness_from_distances(csr_dijkstra(graph, source), source, graph.insertion_order)
+            for source in sources]
+
+
+def _distance_sums(pivots: list[int]) -> array:
+    """Somme, pour chaque noeud, de ses distances aux pivots (graphe non orienté : d(p, v) = d(v, p))."""
+    graph = _worker_graph
+    sums = array('d', bytes(8 * graph.num_nodes))
+    for pivot in pivots:
+        for target, distance in enumerate(csr_dijkstra(graph, pivot)):
+            if distance != float('inf'):
+                sums[target] += distance
+    return sums
+
+
+def _chunks(items: list[int], chunk_size: int) -> list[tuple[list[int]]]:
+    return [(items[start:start + chunk_size],) for start in range(0, len(items), chunk_size)]
+
+
+def calculate_closeness_scores(adjacency_list: dict[int, dict[int, float]], workers: int | None = None,
+                               chunk_size: int = 64) -> dict[int, float]:
+    """
+    Closeness Centrality de chaque noeud : Dijkstra depuis toutes les sources,
+    réparties par paquets sur un pool de processus qui lisent le graphe CSR en mémoire partagée.
+    """
+    nodes_in_graph = set(adjacency_list.keys())
 
-def calculate_closeness_scores(adjacency_list: dict[int, dict[int, float]]) -> dict[int, float]:
-    
-    closeness_scores = {}
-    nodes_in_graph = set(adjacency_list.keys()) 
-    
     if not nodes_in_graph:
         return {}
 
-    # BOUCLE PRINCIPALE: On calcule la Centralité de Proximité pour chaque noeud (livre)
-    for source_id in nodes_in_graph:
-        
-        # 1. Trouver les chemins les plus courts (Algorithme de Dijkstra)
-        shortest_distances = dijkstra_shortest_path(adjacency_list, source_id)
-        
-        # 2. Calculer la Farness et le nombre de noeuds accessibles
-        total_distance = 0.0
-        reachable_nodes_count = 0
-
-        # Itérer sur les résultats de Dijkstra
-        for target_id, distance in shortest_distances.items():
-            # Vérifier si le noeud est atteignable (distance != inf) et n'est pas le noeud source
-            if distance != float('inf') and source_id != target_id:
-                total_distance += distance
-                reachable_nodes_count += 1
-        
-        # 3. CALCUL DE LA CLOSENESS 
-        closeness = 0.0
-        
-        if total_distance > 0:
-            # Closeness = Nombre de noeuds accessibles / Somme des distances minimales
-            # Ceci est la formule pondérée, qui peut donner > 1.0
-            closeness = reachable_nodes_count / total_distance 
-        
-        # Enregistrement du score pour le noeud source
-        closeness_scores[source_id] = closeness
+    graph = CSRGraph.from_adjacency(adjacency_list)
+    results = _run_on_graph(graph, _closeness_of_sources, _chunks(list(range(graph.num_nodes)), chunk_size), workers)
+    scores = [score for chunk in results for score in chunk]
+
+    position = {node: i for i, node in enumerate(graph.node_ids)}
+    return {source_id: scores[position[source_id]] for source_id in nodes_in_graph}
+
+
+# --- 4. CLOSENESS APPROCHÉE (ÉCHANTILLONNAGE DE PIVOTS, EPPSTEIN-WANG) ---
+
+def connected_components(graph: CSRGraph) -> list[list[int]]:
+    """Composantes connexes (listes d'indices), par parcours en largeur."""
+    component_of = [-1] * graph.num_nodes
+    components = []
+    for start in range(graph.num_nodes):
+        if component_of[start] != -1:
+            continue
+        component_of[start] = len(components)
+        members = [start]
+        for node in members:
+            for neighbor in graph.indices[graph.indptr[node]:graph.indptr[node + 1]]:
+                if component_of[neighbor] == -1:
+                    component_of[neighbor] = len(components)
+                    members.append(neighbor)
+        components.append(members)
+    return components
+
+
+def reachable_from(adjacency_list: dict[int, dict[int, float]], seeds) -> set[int]:
+    """Noeuds des composantes connexes contenant au moins un des noeuds seeds."""
+    reached = {seed for seed in seeds if seed in adjacency_list}
+    stack = list(reached)
+    while stack:
+        for neighbor in adjacency_list[stack.pop()]:
+            if neighbor not in reached:
+                reached.add(neighbor)
+                stack.append(neighbor)
+    return reached
+
+
+def pivots_for_error(num_nodes: int, epsilon: float) -> int:
+    """Nombre de pivots garantissant (avec forte probabilité) une erreur <= epsilon · diamètre sur la distance moyenne."""
+    return math.ceil(math.log(max(num_nodes, 2)) / epsilon ** 2)
+
+
+def approximate_closeness_scores(adjacency_list: dict[int, dict[int, float]], pivots: int | None = None,
+                                 epsilon: float | None = None, workers: int | None = None, seed: int = 0,
+                                 chunk_size: int = 8) -> dict[int, float]:
+    """
+    Closeness estimée à partir de k pivots par composante connexe (Eppstein & Wang) :
+    la somme des distances de v à sa composante C est estimée par |C| / k · Σ d(pivot, v),
+    soit k Dijkstra au lieu de |C|. Fixer soit pivots (k), soit epsilon (k = ln n / epsilon²).
+    Les composantes de taille <= k sont calculées exactement.
+    """
+    if (pivots is None) == (epsilon is None):
+        raise ValueError("Indiquer soit pivots, soit epsilon.")
+    if not adjacency_list:
+        return {}
+
+    graph = CSRGraph.from_adjacency(adjacency_list)
+    rng = random.Random(seed)
+    exact_sources, sampled = [], []  # sampled : (membres de la composante, pivots)
+    for members in connected_components(graph):
+        k = pivots if pivots is not None else pivots_for_error(len(members), epsilon)
+        if k >= len(members):
+            exact_sources.extend(members)
+        else:
+            sampled.append((members, rng.sample(members, k)))
+
+    scores = [0.0] * graph.num_nodes
+    if exact_sources:
+        exact_sources.sort()
+        results = _run_on_graph(graph, _closeness_of_sources, _chunks(exact_sources, chunk_size), workers)
+        for source, score in zip(exact_sources, (score for chunk in results for score in chunk)):
+            scores[source] = score
+    if sampled:
+        all_pivots = [pivot for _, component_pivots in sampled for pivot in component_pivots]
+        sums = array('d', bytes(8 * graph.num_nodes))
+        for partial_sums in _run_on_graph(graph, _distance_sums, _chunks(all_pivots, chunk_size), workers):
+            for node, value in enumerate(partial_sums):
+                sums[node] += value
+        for members, component_pivots in sampled:
+            scale = len(members) / len(component_pivots)
+            for node in members:
+                total_distance = scale * sums[node]
+                scores[node] = (len(members) - 1) / total_distance if total_distance > 0 else 0.0
+
+    position = {node: i for i, node in enumerate(graph.node_ids)}
+    return {source_id: scores[position[source_id]] for source_id in adjacency_list}
+
+
+# --- 5. ÉVALUATION DE L'APPROXIMATION ---
+
+def _ranks(values: list[float]) -> list[float]:
+    """Rangs (1 = plus petite valeur), rang moyen pour les ex-aequo."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        stop = start
+        while stop + 1 < len(order) and values[order[stop + 1]] == values[order[start]]:
+            stop += 1
+        for i in range(start, stop + 1):
+            ranks[order[i]] = (start + stop) / 2 + 1
+        start = stop + 1
+    return ranks
+
+
+def spearman_rank_correlation(reference: dict[int, float], estimate: dict[int, float]) -> float:
+    """Corrélation de rang de Spearman entre deux scores des mêmes noeuds (Pearson sur les rangs)."""
+    nodes = list(reference)
+    if len(nodes) < 2:
+        return 1.0
+    x = _ranks([reference[node] for node in nodes])
+    y = _ranks([estimate[node] for node in nodes])
+    mean = (len(nodes) + 1) / 2
+    covariance = sum((a - mean) * (b - mean) for a, b in zip(x, y))
+    variance_x = sum((a - mean) ** 2 for a in x)
+    variance_y = sum((b - mean) ** 2 for b in y)
+    if variance_x == 0 or variance_y == 0:
+        return 1.0 if x == y else 0.0
+    return covariance / math.sqrt(variance_x * variance_y)
+
+
+def random_similarity_graph(num_nodes: int, density: float, seed: int = 0) -> dict[int, dict[int, float]]:
+    """Graphe de test : arêtes aléatoires de poids 1 - Jaccard, comme celui construit par load_books."""
+    rng = random.Random(seed)
+    adjacency_list = defaultdict(dict)
+    for a in range(1, num_nodes + 1):
+        for b in range(a + 1, num_nodes + 1):
+            if rng.random() < density:
+                distance = 1.0 - rng.uniform(0.1, 0.6)
+                adjacency_list[a][b] = distance
+                adjacency_list[b][a] = distance
+    return dict(adjacency_list)
+
+
+def compare_closeness(adjacency_list: dict[int, dict[int, float]], pivot_counts: list[int],
+                      workers: int | None = None) -> list[dict]:
+    """Temps et corrélation de rang avec la closeness exacte, pour chaque nombre de pivots."""
+    start = time.perf_counter()
+    exact = calculate_closeness_scores(adjacency_list, workers)
+    runs = [{'pivots': None, 'seconds': time.perf_counter() - start, 'spearman': 1.0}]
+    for k in pivot_counts:
+        start = time.perf_counter()
+        estimate = approximate_closeness_scores(adjacency_list, pivots=k, workers=workers)
+        runs.append({'pivots': k, 'seconds': time.perf_counter() - start,
+                     'spearman': spearman_rank_correlation(exact, estimate)})
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare la closeness approchée (pivots) à la closeness exacte sur des graphes de test.")
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--density', type=float, default=0.02, help="Probabilité d'une arête entre deux livres.")
+    parser.add_argument('--pivots', type=int, nargs='+', default=[8, 16, 32, 64, 128])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    adjacency_list = random_similarity_graph(args.nodes, args.density, args.seed)
+    print(f"Graphe de test : {len(adjacency_list)} noeuds, {sum(map(len, adjacency_list.values())) // 2} arêtes")
+    print(f"{'pivots':>8} {'temps (s)':>10} {'spearman':>9}")
+    for run in compare_closeness(adjacency_list, args.pivots, args.workers):
+        print(f"{run['pivots'] or 'exact':>8} {run['seconds']:>10.2f} {run['spearman']:>9.4f}")
+
 
-    return closeness_scores
\ No newline at end of file
+if __name__ == "__main__":
+    main()
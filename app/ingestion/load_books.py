@@ -1,17 +1,33 @@
-import requests
 import psycopg2
 from psycopg2.extensions import connection as psycopg2_conn # alias pour le typage
 import re
 import argparse
-import unicodedata
-from nltk.corpus import stopwords
+import sys
 # import networkx as nx
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 import time
 import os
 
+# Paquet partagé avec le backend (app/searchbook_text), à côté de ce répertoire
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from searchbook_text import tokenizer
+from searchbook_text.encoding import trigram_key
+
 # import module pour calculer la centralité
 import graph_algorithms
+# moteurs de similarité de Jaccard (legacy / exact / minhash)
+import similarity
+# écriture en masse (COPY) de l'index et du graphe
+import bulk_writer
+# téléchargement concurrent depuis Gutenberg
+import download_gutenberg_books
+# identifiants entiers des mots (table terms)
+import vocabulary
+# positions des mots pour les extraits (table term_positions)
+import positional_index
 
 # --- CONFIGURATION (À ADAPTER) ---
 # --- CONFIGURATION (À ADAPTER) ---
@@ -22,30 +38,17 @@ DB_CONFIG = {
     'password': os.environ.get("POSTGRES_PASSWORD", "searchbook_password")
 }
 
-GUTENBERG_URL = "https://www.gutenberg.org/cache/epub/{id}/pg{id}.txt"
-
 
-NORMALIZE_UNICODE = True  # Mettre à False pour désactiver la normalisation Unicode
-DISABLE_STOP_WORDS = False  # Mettre à True pour désactiver le filtrage des stop words
 
-# Mots vides standards pour le cas d'échec
-# Définition globale
-try:
-    STOP_LANGUAGES = {
-        'french': set(stopwords.words('french')),
-        'english': set(stopwords.words('english')),
-        # Ajouter d'autres langues
-    }
-    # Définir un fallback sûr au cas où une langue n'est pas trouvée
-    DEFAULT_STOP_WORDS = STOP_LANGUAGES['english'] 
-except LookupError:
+if not tokenizer.DISABLE_STOP_WORDS and not tokenizer.stop_words(tokenizer.DEFAULT_LANGUAGE):
     # Gérer si les données NLTK ne sont pas installées
     print("ATTENTION: Les données NLTK (stopwords) ne sont pas installées.")
-    STOP_LANGUAGES = {}
-    DEFAULT_STOP_WORDS = set()
 
 # Seuil de similarité Jaccard pour créer une arête dans le graphe
 JACCARD_THRESHOLD = 0.1
+# Pivots de la closeness approchée des composantes modifiées en mode --incremental
+# (k Dijkstra par composante au lieu d'un par livre)
+INCREMENTAL_CLOSENESS_PIVOTS = 64
 
 
 # --- 1. PRÉ-TRAITEMENT ET METADONNÉES ---
@@ -74,189 +77,241 @@ def extract_metadata(content : str) -> dict:
         
     return metadata
 
-def clean_and_tokenize(content : str, language : str = 'english') -> list[str]:
-    """
-    Nettoie le contenu, supprime les accents, le met en minuscule,
-    supprime la ponctuation et filtre les stop words.
-    """
-    # 1. Mise en minuscule
-    content_lower = content.lower()
-    content_to_clean = content_lower
-    
-    if NORMALIZE_UNICODE:
-        # 2. Normalisation Unicode (NFD) et suppression des accents (Mn)
-        normalized_content = unicodedata.normalize('NFD', content_lower)
-        content_to_clean = ''.join(
-            char for char in normalized_content 
-            if unicodedata.category(char) != 'Mn'
-        )
-        
-    # 3. Retrait de la ponctuation et des caractères spéciaux
-    content_clean = re.sub(r"[^\w\s'-]", ' ', content_to_clean, flags=re.UNICODE)
-
-    
-    # 4. Tokenisation simple et gestion des stop words
-    tokens = content_clean.split()
-    
-    stop_words = {} # Par défaut
-
-    if not DISABLE_STOP_WORDS:
-        lang_key = language.lower()
-        found_in_cache = False
-        
-        # --- A. Recherche dans le cache pré-chargé (STOP_LANGUAGES) ---
-        for key, stop_set in STOP_LANGUAGES.items():
-            if key in lang_key:
-                stop_words = stop_set
-                found_in_cache = True
-                break
-        
-        # --- B. Tentative de chargement dynamique si non trouvé ---
-        if not found_in_cache:
-            # Tente d'extraire le nom de langue le plus probable (ex: 'french' de 'french (france)')
-            lang_to_try = lang_key.split(' ')[0] 
-            
-            try:
-                # Tente de charger la langue directement via la bibliothèque NLTK
-                new_stop_words = set(stopwords.words(lang_to_try))
-                
-                # Succès: Mise à jour du cache global pour les appels futurs
-                STOP_LANGUAGES[lang_to_try] = new_stop_words 
-                stop_words = new_stop_words
-                # print(f"   -> Langue '{lang_to_try}' chargée dynamiquement et mise en cache.") # Décommenter pour debug
-                
-            except LookupError:
-                # Échec: La langue n'est pas supportée par NLTK, on garde le DEFAULT_STOP_WORDS
-                stop_words = DEFAULT_STOP_WORDS
-    
-    # Filtrer les mots vides et les chaînes vides
-    clean_tokens = [token for token in tokens if token and token not in stop_words]
-    
-    return clean_tokens
+# Nettoyage et tokenisation partagés avec le backend (voir searchbook_text/tokenizer.py)
+_clean_table = tokenizer.clean_table
+clean_text = tokenizer.clean_text
+clean_and_tokenize = tokenizer.tokenize
+filter_stop_words = tokenizer.filter_stop_words
 
 # --- B. INGESTION ET INDEXATION ---
 
-def _process_and_insert_book(cursor, content : str, gutenberg_id : int, min_words : int, conn : psycopg2_conn, book_token_sets : dict[int, set[str]]) -> bool | None:
-    """Logique de traitement et d'insertion pour un seul livre (utilisée par les deux fonctions d'ingestion)."""
-    
+# Pipeline à mémoire bornée, un livre ne reste en mémoire que le temps de traverser les étapes :
+#   lecture (fichier lu par le processus de travail, ou file bornée du téléchargeur)
+#   -> métadonnées + tokenisation + TF + positions + trigrammes (+ signature) : pool de processus, au plus 2 livres par processus en cours
+#   -> écriture en base : lots COPY de commit_every livres
+#   -> entrée du graphe : seul ce qui sert au calcul du graphe est conservé, les identifiants triés des
+#      mots du livre (graph_input='sets', 4 octets par mot) ou sa signature MinHash de num_perm × 4 octets
+#      (graph_input='signatures').
+
+@dataclass
+class PreparedBook:
+    """Livre tokenisé, prêt à être inséré (calculé dans un processus de travail)."""
+    gutenberg_id : int
+    metadata : dict
+    word_count : int
+    content_lower : str | None = None  # None si le livre est trop court
+    term_frequencies : dict[str, int] | None = None
+    trigrams : list[int] | None = None
+    signature : bytes | None = None  # signature MinHash, si demandée
+    term_ids : array | None = None  # identifiants triés des mots, attribués à l'écriture (voir vocabulary)
+    term_positions : dict[str, bytes] | None = None  # positions encodées par mot (voir positional_index)
+
+
+def prepare_book(content : str, gutenberg_id : int, min_words : int, num_perm : int | None = None,
+                 max_positions : int | None = positional_index.DEFAULT_MAX_POSITIONS) -> PreparedBook:
+    """
+    Partie CPU du traitement d'un livre (métadonnées, tokens, TF, positions, trigrammes, signature),
+    sans accès à la base.
+    """
     metadata = extract_metadata(content)
-    clean_tokens = clean_and_tokenize(content, metadata.get('language', 'english'))
+    content_lower = content.lower()
+    content_clean = clean_text(content_lower)
+    clean_tokens = filter_stop_words(content_clean.split(), metadata.get('language', 'english'))
     word_count = len(clean_tokens)
-    
-    if word_count < min_words:
-        print(f"ID {gutenberg_id}: '{metadata.get('title', 'TITRE INCONNU')}' trop court ({word_count} mots).")
-        return None # Retourne None si le livre est ignoré
 
-    print(f"ID {gutenberg_id}: '{metadata.get('title', 'TITRE INCONNU')}' - Traitement...")
+    if word_count < min_words:
+        return PreparedBook(gutenberg_id, metadata, word_count)
 
-    # 2. Calcul des Term Frequencies (TF)
+    # Calcul des Term Frequencies (TF)
     term_frequencies = defaultdict(int)
     for token in clean_tokens:
         term_frequencies[token] += 1
 
-    # --- Insertion dans la table BOOKS ---
-    image_url = f"https://www.gutenberg.org/cache/epub/{gutenberg_id}/pg{gutenberg_id}.cover.medium.jpg"
-    
+    signature = similarity.signature_bytes(term_frequencies.keys(), num_perm) if num_perm else None
+    positions = positional_index.term_positions(content_lower, content_clean, term_frequencies, max_positions, _clean_table())
+    return PreparedBook(gutenberg_id, metadata, word_count, content_lower, dict(term_frequencies),
+                        extract_trigrams(content_lower), signature, term_positions=positions)
+
+
+def prepare_book_file(filepath : str, gutenberg_id : int, min_words : int, num_perm : int | None = None,
+                      max_positions : int | None = positional_index.DEFAULT_MAX_POSITIONS) -> PreparedBook:
+    """Lit un fichier local puis le prépare (le contenu n'est pas transmis au processus de travail)."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return prepare_book(f.read(), gutenberg_id, min_words, num_perm, max_positions)
+
+
+def prepare_in_pool(jobs, workers : int | None = None):
+    """
+    Exécute les préparations (label, fonction, arguments) sur un pool de processus et
+    génère (label, PreparedBook ou exception) dans l'ordre des jobs. Au plus 2 jobs par
+    processus sont en cours : le processus principal insère en base pendant que les autres tokenisent,
+    sans accumuler les livres en mémoire.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for label, func, args in jobs:
+            try:
+                yield label, func(*args)
+            except Exception as e:
+                yield label, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for label, func, args in jobs:
+            in_flight.append((label, pool.submit(func, *args)))
+            if len(in_flight) >= 2 * workers:
+                label, future = in_flight.popleft()
+                yield label, future.exception() or future.result()
+        while in_flight:
+            label, future = in_flight.popleft()
+            yield label, future.exception() or future.result()
+
+
+def extract_trigrams(content_lower : str) -> list[int]:
+    """Ensemble trié des trigrammes (encodés) du contenu en minuscules."""
+    trigrams = {content_lower[i:i + 3] for i in range(len(content_lower) - 2)}
+    return sorted(trigram_key(trigram) for trigram in trigrams)
+
+
+def insert_book_trigrams(cursor, book_id : int, trigrams : list[int]):
     cursor.execute("""
-        INSERT INTO books (gutenberg_id, title, author, language, publication_year, image_url, content, word_count)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-    """, (
-        gutenberg_id,
-        metadata.get('title'),
-        metadata.get('author'),
-        metadata.get('language'),
-        metadata.get('publication_year'),
-        image_url,
-        content.lower(),
-        word_count
-    ))
-    book_id = cursor.fetchone()[0]
-    
-    # On stocke l'ensemble de tokens uniques (les clés) en mémoire
-    book_token_sets[book_id] = set(term_frequencies.keys())
-    
-    # --- Insertion dans la table INVERTED_INDEX ---
-    index_values = [ (word, book_id, freq) for word, freq in term_frequencies.items() ]
-    
-    if index_values:
-        template = "(%s, %s, %s)"
-        values_list = [cursor.mogrify(template, v).decode('utf-8') for v in index_values]
-        cursor.execute(f"""
-            INSERT INTO inverted_index (word, book_id, frequency)
-            VALUES {", ".join(values_list)};
-        """)
-    
-    conn.commit()
-    return True # Indique le succès
+        INSERT INTO book_trigrams (book_id, trigrams)
+        VALUES (%s, %s::bigint[])
+        ON CONFLICT (book_id) DO UPDATE SET trigrams = EXCLUDED.trigrams;
+    """, (book_id, trigrams))
+
 
-def ingest_and_index_books_from_directory(conn : psycopg2_conn, directory_path : str, min_words : int) -> dict[int, set[str]]: 
-    """Lit les fichiers .txt dans un répertoire local et les indexe."""
+def backfill_book_trigrams(conn : psycopg2_conn):
+    """Construit les trigrammes des livres déjà en base qui n'en ont pas encore."""
+    print("--- INDEX DE TRIGRAMMES : rattrapage des livres existants ---")
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT b.id FROM books b
+        WHERE NOT EXISTS (SELECT 1 FROM book_trigrams t WHERE t.book_id = b.id)
+        ORDER BY b.id;
+    """)
+    book_ids = [row[0] for row in cursor.fetchall()]
+    for book_id in book_ids:
+        cursor.execute("SELECT content FROM books WHERE id = %s;", (book_id,))
+        insert_book_trigrams(cursor, book_id, extract_trigrams(cursor.fetchone()[0]))
+        conn.commit()
+    print(f"   -> {len(book_ids)} livres indexés.")
+
+
+def backfill_term_positions(conn : psycopg2_conn, max_positions : int | None):
+    """Construit l'index positionnel des livres déjà en base qui n'en ont pas encore."""
+    print("--- INDEX POSITIONNEL : rattrapage des livres existants ---")
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT b.id FROM books b
+        WHERE NOT EXISTS (SELECT 1 FROM term_positions p WHERE p.book_id = b.id)
+        ORDER BY b.id;
+    """)
+    book_ids = [row[0] for row in cursor.fetchall()]
+    for book_id in book_ids:
+        cursor.execute("SELECT content, language FROM books WHERE id = %s;", (book_id,))
+        content_lower, language = cursor.fetchone()
+        content_clean = clean_text(content_lower)
+        terms = set(filter_stop_words(content_clean.split(), language or 'english'))
+        positions = positional_index.term_positions(content_lower, content_clean, terms, max_positions, _clean_table())
+        bulk_writer.copy_rows(cursor, 'term_positions', ['book_id', 'word', 'positions'],
+                              ((book_id, word, encoded) for word, encoded in positions.items()))
+        conn.commit()
+    print(f"   -> {len(book_ids)} livres indexés.")
+
+
+def _insert_prepared_books(conn : psycopg2_conn, prepared, book_token_sets : dict[int, array | bytes], label_name : str,
+                           commit_every : int, defer_indexes : bool):
+    """
+    Écrit, dans l'ordre, les livres produits par prepare_in_pool (COPY par lots, voir bulk_writer),
+    puis ne garde pour le graphe que la signature du livre si elle a été calculée, les identifiants de ses mots sinon.
+    """
+    def keep_graph_input(book_id, book):
+        book_token_sets[book_id] = book.signature if book.signature is not None else book.term_ids
+
+    term_vocabulary = vocabulary.Vocabulary.load(conn)
+    with bulk_writer.BulkWriter(conn, keep_graph_input, commit_every, defer_indexes, term_vocabulary) as writer:
+        for label, book in prepared:
+            if isinstance(book, Exception):
+                print(f"Erreur de traitement pour {label_name} {label}: {book}")
+                continue
+
+            title = book.metadata.get('title', 'TITRE INCONNU')
+            if book.content_lower is None:
+                print(f"ID {book.gutenberg_id}: '{title}' trop court ({book.word_count} mots).")
+                continue
+
+            print(f"ID {book.gutenberg_id}: '{title}' - Traitement...")
+            writer.add(book)
+
+
+def ingest_and_index_books_from_directory(conn : psycopg2_conn, directory_path : str, min_words : int, workers : int | None = None,
+                                          commit_every : int = 50, defer_indexes : bool = False,
+                                          num_perm : int | None = None,
+                                          max_positions : int | None = positional_index.DEFAULT_MAX_POSITIONS) -> dict[int, array | bytes]: 
+    """
+    Lit les fichiers .txt dans un répertoire local et les indexe (tokenisation en parallèle).
+    Renvoie, par livre, les identifiants triés de ses mots, ou sa signature MinHash avec num_perm.
+    """
     print(f"--- 1. INGESTION À PARTIR DU RÉPERTOIRE LOCAL '{directory_path}' ---")
     
-    cursor = conn.cursor()
     book_token_sets = {} 
-    
-    for filename in os.listdir(directory_path):
-        if not filename.endswith('.txt'):
-            continue
-        
-        filepath = os.path.join(directory_path, filename)
-        
-        # Extrait l'ID Gutenberg à partir du nom du fichier (ex: pg123.txt -> 123)
-        match = re.search(r'pg(\d+)\.txt', filename)
-        if not match:
-            print(f"Fichier {filename}: Impossible d'extraire l'ID Gutenberg, ignoré.")
-            continue
-            
-        gutenberg_id = int(match.group(1))
 
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+    def jobs():
+        for filename in os.listdir(directory_path):
+            if not filename.endswith('.txt'):
+                continue
+            
+            filepath = os.path.join(directory_path, filename)
             
-            _process_and_insert_book(cursor, content, gutenberg_id, min_words, conn, book_token_sets)
+            # Extrait l'ID Gutenberg à partir du nom du fichier (ex: pg123.txt -> 123)
+            match = re.search(r'pg(\d+)\.txt', filename)
+            if not match:
+                print(f"Fichier {filename}: Impossible d'extraire l'ID Gutenberg, ignoré.")
+                continue
+                
+            gutenberg_id = int(match.group(1))
+            yield filename, prepare_book_file, (filepath, gutenberg_id, min_words, num_perm, max_positions)
 
-        except psycopg2.Error as e:
-            conn.rollback()
-            print(f"Erreur DB pour fichier {filename}: {e}")
-        except Exception as e:
-            print(f"Erreur de traitement pour le fichier {filename}: {e}")
+    _insert_prepared_books(conn, prepare_in_pool(jobs(), workers), book_token_sets, "le fichier", commit_every, defer_indexes)
             
     print(f"Ingestion terminée. {len(book_token_sets)} livres prêts pour le graphe.")
     return book_token_sets
 
 
-def _ingest_from_gutenberg(conn : psycopg2_conn, start_id : int, num_texts : int, min_words : int) -> dict[int, set[str]]: 
-    """Télécharge les livres depuis Gutenberg et les indexe."""
+def _ingest_from_gutenberg(conn : psycopg2_conn, start_id : int, num_texts : int, min_words : int, workers : int | None = None,
+                           commit_every : int = 50, defer_indexes : bool = False, num_perm : int | None = None,
+                           max_positions : int | None = positional_index.DEFAULT_MAX_POSITIONS,
+                           **download_options) -> dict[int, array | bytes]: 
+    """
+    Télécharge les livres depuis Gutenberg (téléchargements concurrents et limités en débit, voir
+    download_gutenberg_books) et les indexe pendant que les téléchargements suivants continuent.
+    Les IDs déjà en base sont ignorés, ce qui permet de relancer une ingestion interrompue.
+    """
     print(f"--- 1. INGESTION DIRECTE DEPUIS GUTENBERG (ID {start_id} à {start_id + num_texts}) ---")
     
-    cursor = conn.cursor()
     book_token_sets = {}
 
-
-    for i in range(start_id, start_id + num_texts):
-        url = GUTENBERG_URL.format(id=i)
-        
-        try:
-            response = requests.get(url, timeout=15)
-            if response.status_code != 200:
-                print(f"ID {i}: Non disponible ({response.status_code}), ignoré.")
-                time.sleep(0.5)
-                continue
-
-            content = response.text
-            
-            _process_and_insert_book(cursor, content, i, min_words, conn, book_token_sets)
-            
-        except psycopg2.Error as e:
-            conn.rollback()
-            print(f"Erreur DB pour ID {i}: {e}")
-        except requests.exceptions.RequestException as e:
-            print(f"Erreur de connexion pour l'ID {i}: {e}")
-        
-        # Respecter Gutenberg
-        time.sleep(0.5)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT gutenberg_id FROM books WHERE gutenberg_id BETWEEN %s AND %s;",
+                       (start_id, start_id + num_texts - 1))
+        already_loaded = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    if already_loaded:
+        print(f"   -> {len(already_loaded)} livres déjà en base, ignorés.")
+    ids = [i for i in range(start_id, start_id + num_texts) if i not in already_loaded]
+
+    def jobs():
+        for i, status, payload in download_gutenberg_books.iter_books(ids, **download_options):
+            if status == download_gutenberg_books.DONE:
+                yield i, prepare_book, (payload, i, min_words, num_perm, max_positions)
+            elif status == download_gutenberg_books.NOT_FOUND:
+                print(f"ID {i}: Non disponible (404), ignoré.")
+            else:
+                print(f"Erreur de téléchargement pour l'ID {i}: {payload}")
+
+    _insert_prepared_books(conn, prepare_in_pool(jobs(), workers), book_token_sets, "l'ID", commit_every, defer_indexes)
         
     print(f"Ingestion terminée. {len(book_token_sets)} livres prêts pour le graphe.")
     return book_token_sets
@@ -264,47 +319,35 @@ def _ingest_from_gutenberg(conn : psycopg2_conn, start_id : int, num_texts : int
 
 # --- C. CALCULS DE GRAPHE ET MISE À JOUR DB ---
 
-# (Les fonctions calculate_jaccard et calculate_graph_metrics restent inchangées)
+def _closeness_scores(adjacency_list : dict[int, dict[int, float]], workers : int | None,
+                      closeness_pivots : int | None, closeness_epsilon : float | None) -> dict[int, float]:
+    if closeness_pivots is not None or closeness_epsilon is not None:
+        # Closeness approchée (échantillonnage de pivots) : suffisante pour trier par centralité
+        return graph_algorithms.approximate_closeness_scores(
+            adjacency_list, pivots=closeness_pivots, epsilon=closeness_epsilon, workers=workers)
+    return graph_algorithms.calculate_closeness_scores(adjacency_list, workers)
 
-def calculate_jaccard(set_a : set[str], set_b : set[str]):
-    """Calcule l'indice de Jaccard entre deux ensembles de tokens."""
-    intersection = len(set_a.intersection(set_b))
-    union = len(set_a.union(set_b))
-    return intersection / union if union > 0 else 0
 
-
-def calculate_graph_metrics(conn : psycopg2_conn, book_token_sets : dict[int, set[str]]):
-    """Calcule Jaccard, construit le graphe et calcule la Closeness Centrality."""
+def calculate_graph_metrics(conn : psycopg2_conn, book_token_sets : dict[int, array | bytes], engine=None, workers : int | None = None,
+                            closeness_pivots : int | None = None, closeness_epsilon : float | None = None):
+    """Calcule Jaccard (via le moteur de similarité choisi), construit le graphe et calcule la Closeness Centrality."""
     print("--- 2. CALCUL DES MÉTRIQUES DU GRAPHE ---")
     
     start_time = time.time()
-    book_ids = list(book_token_sets.keys())
-    N = len(book_ids)
-    cursor = conn.cursor()
-    
-    jaccard_inserts = []
+    N = len(book_token_sets)
+    engine = engine or similarity.get_engine('exact')
 
     adjacency_list = defaultdict(dict)
     # G = nx.Graph()
     
-    # --- 2a. Calcul des similarités Jaccard (N * (N-1) / 2 comparaisons) ---
-    print(f"   -> Calcul de {N * (N-1) // 2} paires Jaccard...")
-    
-    for i in range(N):
-        for j in range(i + 1, N): 
-            id_a = book_ids[i]
-            id_b = book_ids[j]
-            set_a = book_token_sets[id_a]
-            set_b = book_token_sets[id_b]
-            
-            jaccard_score = calculate_jaccard(set_a, set_b)
-            
-            if jaccard_score >= JACCARD_THRESHOLD:
-                distance = 1.0 - jaccard_score 
-                jaccard_inserts.append((id_a, id_b, jaccard_score)) 
-                # G.add_edge(id_a, id_b, weight=distance)
-                adjacency_list[id_a][id_b] = distance
-                adjacency_list[id_b][id_a] = distance
+    # --- 2a. Calcul des similarités Jaccard ---
+    print(f"   -> Similarité Jaccard de {N} livres (moteur '{engine.name}')...")
+    jaccard_inserts = engine.pairs(book_token_sets, JACCARD_THRESHOLD)
+    for id_a, id_b, jaccard_score in jaccard_inserts:
+        distance = 1.0 - jaccard_score
+        # G.add_edge(id_a, id_b, weight=distance)
+        adjacency_list[id_a][id_b] = distance
+        adjacency_list[id_b][id_a] = distance
 
     print(f"   -> {len(jaccard_inserts)} arêtes Jaccard > {JACCARD_THRESHOLD} créées.")
     
@@ -313,28 +356,151 @@ def calculate_graph_metrics(conn : psycopg2_conn, book_token_sets : dict[int, se
     # if G.number_of_nodes() > 0:
         #closeness_scores = nx.closeness_centrality(G)
         # closeness_scores = nx.closeness_centrality(G, distance='weight')
-        closeness_scores = graph_algorithms.calculate_closeness_scores(adjacency_list)
+        closeness_scores = _closeness_scores(adjacency_list, workers, closeness_pivots, closeness_epsilon)
     else:
         closeness_scores = {}
         print("   -> Graphe vide, Closeness non calculée.")
 
-    # --- 2c. Insertion des Arêtes Jaccard et Mise à jour de Closeness ---
-    if jaccard_inserts:
-        template = "(%s, %s, %s)"
-        values_list = [cursor.mogrify(template, v).decode('utf-8') for v in jaccard_inserts]
-        cursor.execute(f"""
-            INSERT INTO jaccard_graph (book_a_id, book_b_id, similarity_score)
-            VALUES {", ".join(values_list)};
-        """)
-
-    for book_id, score in closeness_scores.items():
+    # --- 2c. Insertion des Arêtes Jaccard (COPY) et Mise à jour de Closeness (un seul UPDATE) ---
+    bulk_writer.write_graph(conn, jaccard_inserts, closeness_scores)
+    end_time = time.time()
+    print(f"   -> Calculs terminés et DB mise à jour en {end_time - start_time:.2f} secondes.")
+
+
+# --- C bis. MISE À JOUR INCRÉMENTALE DU GRAPHE ---
+
+def load_existing_token_sets(conn : psycopg2_conn, new_book_ids : list[int], term_ids : list[int] | None = None):
+    """
+    Identifiants triés des mots des livres déjà en base (hors new_book_ids), lus depuis inverted_index.
+    Avec term_ids, seuls ces mots sont chargés (assez pour les intersections avec les nouveaux
+    livres) et la taille réelle de chaque ensemble est renvoyée à part ; sinon sizes vaut None.
+    """
+    token_ids = defaultdict(list)
+    with conn.cursor(name='existing_token_sets') as cursor:
+        cursor.itersize = 100_000
+        if term_ids is None:
+            cursor.execute("""
+                SELECT ii.book_id, t.id FROM inverted_index ii
+                JOIN terms t ON t.word = ii.word
+                WHERE NOT (ii.book_id = ANY(%s));
+            """, (new_book_ids,))
+        else:
+            cursor.execute("""
+                SELECT ii.book_id, t.id FROM terms t
+                JOIN inverted_index ii ON ii.word = t.word
+                WHERE t.id = ANY(%s) AND NOT (ii.book_id = ANY(%s));
+            """, (term_ids, new_book_ids))
+        for book_id, term_id in cursor:
+            token_ids[book_id].append(term_id)
+
+    sizes = None
+    if term_ids is not None:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT book_id, COUNT(*) FROM inverted_index
+                WHERE NOT (book_id = ANY(%s))
+                GROUP BY book_id;
+            """, (new_book_ids,))
+            sizes = dict(cursor.fetchall())
+    conn.commit()
+    token_sets = {book_id: array(vocabulary.TERM_TYPECODE, sorted(ids)) for book_id, ids in sorted(token_ids.items())}
+    return token_sets, sizes
+
+
+def load_existing_signatures(conn : psycopg2_conn, new_book_ids : list[int]) -> dict[int, bytes]:
+    """Signatures MinHash des livres déjà en base (hors new_book_ids), lues depuis book_signatures."""
+    with conn.cursor(name='existing_signatures') as cursor:
+        cursor.itersize = 10_000
         cursor.execute("""
-            UPDATE books SET closeness_score = %s WHERE id = %s;
-        """, (score, book_id))
-        
+            SELECT book_id, signature FROM book_signatures
+            WHERE NOT (book_id = ANY(%s))
+            ORDER BY book_id;
+        """, (new_book_ids,))
+        signatures = {book_id: bytes(signature) for book_id, signature in cursor}
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM books WHERE NOT (id = ANY(%s));", (new_book_ids,))
+        missing = cursor.fetchone()[0] - len(signatures)
     conn.commit()
+    if missing:
+        print(f"   -> ATTENTION : {missing} livres existants sans signature (ingérés sans --graph-input signatures), ignorés.")
+    return signatures
+
+
+def load_components(conn : psycopg2_conn, seeds) -> dict[int, dict[int, float]]:
+    """
+    Liste d'adjacence (distance = 1 - Jaccard) des seules composantes connexes du graphe en base
+    qui contiennent un des noeuds seeds, lue de proche en proche (une requête par niveau du parcours
+    en largeur) au lieu de tout jaccard_graph.
+    """
+    adjacency_list = defaultdict(dict)
+    reached, frontier = set(seeds), sorted(seeds)
+    with conn.cursor() as cursor:
+        while frontier:
+            cursor.execute("""
+                SELECT book_a_id, book_b_id, similarity_score FROM jaccard_graph WHERE book_a_id = ANY(%s)
+                UNION
+                SELECT book_a_id, book_b_id, similarity_score FROM jaccard_graph WHERE book_b_id = ANY(%s);
+            """, (frontier, frontier))
+            next_frontier = set()
+            for id_a, id_b, jaccard_score in cursor:
+                adjacency_list[id_a][id_b] = 1.0 - jaccard_score
+                adjacency_list[id_b][id_a] = 1.0 - jaccard_score
+                for node in (id_a, id_b):
+                    if node not in reached:
+                        reached.add(node)
+                        next_frontier.add(node)
+            frontier = sorted(next_frontier)
+    conn.commit()
+    return adjacency_list
+
+
+def update_graph_metrics_incremental(conn : psycopg2_conn, new_token_sets : dict[int, array | bytes], engine=None,
+                                     workers : int | None = None, closeness_pivots : int | None = None,
+                                     closeness_epsilon : float | None = None, exact_closeness : bool = False):
+    """
+    Ajoute au graphe les arêtes des nouveaux livres (face à tout le corpus), puis recalcule
+    la closeness des seules composantes connexes touchées par ces arêtes : la closeness d'un
+    noeud ne dépend que de sa composante, les autres scores restent valables.
+    Seules ces composantes sont lues en base. Comme la composante touchée est en pratique la
+    composante géante, sa closeness est approchée par défaut (INCREMENTAL_CLOSENESS_PIVOTS pivots,
+    soit autant de Dijkstra au lieu d'un par livre) ; exact_closeness force le calcul exact.
+    Si les nouveaux livres sont donnés par leurs signatures, les livres existants le sont aussi.
+    """
+    print("--- 2. MISE À JOUR INCRÉMENTALE DU GRAPHE ---")
+
+    start_time = time.time()
+    engine = engine or similarity.get_engine('exact')
+    new_book_ids = list(new_token_sets)
+    if not exact_closeness and closeness_pivots is None and closeness_epsilon is None:
+        closeness_pivots = INCREMENTAL_CLOSENESS_PIVOTS
+
+    # --- 2a. Livres existants : signatures, ou seulement les mots partagés avec les nouveaux livres si le moteur le permet ---
+    if any(isinstance(value, bytes) for value in new_token_sets.values()):
+        existing_token_sets, existing_sizes = load_existing_signatures(conn, new_book_ids), None
+    else:
+        shared_ids = sorted(set().union(*new_token_sets.values())) if engine.accepts_partial_sets else None
+        existing_token_sets, existing_sizes = load_existing_token_sets(conn, new_book_ids, shared_ids)
+    print(f"   -> {len(new_book_ids)} nouveaux livres face à {len(existing_token_sets)} livres existants (moteur '{engine.name}')...")
+
+    # --- 2b. Arêtes Jaccard des nouveaux livres ---
+    jaccard_inserts = engine.pairs_incremental(new_token_sets, existing_token_sets, JACCARD_THRESHOLD, existing_sizes)
+    print(f"   -> {len(jaccard_inserts)} nouvelles arêtes Jaccard > {JACCARD_THRESHOLD}.")
+
+    # --- 2c. Closeness des composantes modifiées ---
+    closeness_scores = {}
+    if jaccard_inserts:
+        touched_graph = load_components(conn, {node for edge in jaccard_inserts for node in edge[:2]})
+        for id_a, id_b, jaccard_score in jaccard_inserts:
+            touched_graph[id_a][id_b] = 1.0 - jaccard_score
+            touched_graph[id_b][id_a] = 1.0 - jaccard_score
+
+        method = "exacte" if closeness_pivots is None and closeness_epsilon is None else "approchée"
+        print(f"   -> Closeness {method} recalculée pour {len(touched_graph)} livres des composantes modifiées.")
+        closeness_scores = _closeness_scores(touched_graph, workers, closeness_pivots, closeness_epsilon)
+
+    bulk_writer.write_graph(conn, jaccard_inserts, closeness_scores)
     end_time = time.time()
-    print(f"   -> Calculs terminés et DB mise à jour en {end_time - start_time:.2f} secondes.")
+    print(f"   -> Graphe mis à jour en {end_time - start_time:.2f} secondes.")
 
 
 # --- FONCTION PRINCIPALE ---
@@ -349,10 +515,46 @@ def main():
     # Options pour le téléchargement (utilisé si --path n'est pas fourni)
     parser.add_argument('--start-id', type=int, default=1, help="ID Gutenberg à partir duquel commencer le téléchargement (si pas de --path).")
     parser.add_argument('--num-texts', type=int, default=50, help="Nombre de textes à tenter de traiter (si pas de --path).")
+    parser.add_argument('--base-url', type=str, default=download_gutenberg_books.DEFAULT_BASE_URL,
+                        help="Serveur Gutenberg (ou miroir / serveur local de test).")
+    parser.add_argument('--concurrency', type=int, default=download_gutenberg_books.DEFAULT_CONCURRENCY,
+                        help="Téléchargements simultanés.")
+    parser.add_argument('--rate', type=float, default=download_gutenberg_books.DEFAULT_RATE,
+                        help="Requêtes par seconde vers Gutenberg.")
     
     # Autres options
     parser.add_argument('--min-words', type=int, default=10000, help="Taille minimale des livres pour être inclus.")
+    parser.add_argument('--backfill-trigrams', action='store_true',
+                        help="Construit l'index de trigrammes des livres déjà en base, puis s'arrête.")
+    parser.add_argument('--max-positions', type=int, default=positional_index.DEFAULT_MAX_POSITIONS,
+                        help="Positions gardées par mot et par livre pour les extraits, dans le corps du livre (0 : toutes).")
+    parser.add_argument('--backfill-positions', action='store_true',
+                        help="Construit l'index positionnel des livres déjà en base, puis s'arrête.")
+    parser.add_argument('--similarity', choices=sorted(similarity.ENGINES), default='exact',
+                        help="Moteur de similarité Jaccard : legacy (paires d'ensembles), exact (matrices creuses), minhash (approximatif).")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus de la tokenisation et des calculs de similarité et de centralité (défaut : nombre de CPU).")
+    parser.add_argument('--commit-every', type=int, default=50,
+                        help="Nombre de livres écrits (COPY) par transaction.")
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help="Supprime les index secondaires pendant le chargement et les reconstruit à la fin.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Relie les nouveaux livres à tout le corpus existant et ne recalcule la closeness que des composantes modifiées.")
+    closeness = parser.add_mutually_exclusive_group()
+    closeness.add_argument('--closeness-pivots', type=int, default=None,
+                           help="Closeness approchée à partir de K pivots par composante (défaut : closeness exacte).")
+    closeness.add_argument('--closeness-epsilon', type=float, default=None,
+                           help="Closeness approchée avec une erreur cible epsilon (K = ln(n) / epsilon²).")
+    closeness.add_argument('--exact-closeness', action='store_true',
+                           help=f"Avec --incremental : closeness exacte des composantes modifiées "
+                                f"(défaut : approchée avec {INCREMENTAL_CLOSENESS_PIVOTS} pivots).")
+    parser.add_argument('--graph-input', choices=['sets', 'signatures'], default='sets',
+                        help="Ce qui est gardé en mémoire par livre pour le graphe : ensemble des mots, ou signature MinHash "
+                             "(mémoire bornée, stockée dans book_signatures ; nécessite --similarity minhash).")
+    parser.add_argument('--num-perm', type=int, default=128, help="Nombre de permutations des signatures MinHash.")
     args = parser.parse_args()
+    if args.graph_input == 'signatures' and args.similarity != 'minhash':
+        parser.error("--graph-input signatures nécessite --similarity minhash.")
+    num_perm = args.num_perm if args.graph_input == 'signatures' else None
     print(args)
 
     # 1. Connexion DB
@@ -362,6 +564,16 @@ def main():
         print(f"IMPOSSIBLE DE SE CONNECTER À LA BASE DE DONNÉES. Vérifiez DB_CONFIG: {e}")
         return
 
+    if args.backfill_trigrams:
+        backfill_book_trigrams(conn)
+        conn.close()
+        return
+
+    if args.backfill_positions:
+        backfill_term_positions(conn, args.max_positions)
+        conn.close()
+        return
+
     # 2. Ingestion et Indexation
     if args.path:
         # MODE LECTURE LOCALE
@@ -369,14 +581,26 @@ def main():
             print(f"Erreur: Le chemin '{args.path}' n'est pas un répertoire valide.")
             conn.close()
             return
-        book_token_sets = ingest_and_index_books_from_directory(conn, args.path, args.min_words)
+        book_token_sets = ingest_and_index_books_from_directory(conn, args.path, args.min_words, args.workers,
+                                                                args.commit_every, args.defer_indexes, num_perm, args.max_positions)
     else:
         # MODE TÉLÉCHARGEMENT DIRECT
-        book_token_sets = _ingest_from_gutenberg(conn, args.start_id, args.num_texts, args.min_words)
+        book_token_sets = _ingest_from_gutenberg(conn, args.start_id, args.num_texts, args.min_words, args.workers,
+                                                 args.commit_every, args.defer_indexes, num_perm, args.max_positions,
+                                                 base_url=args.base_url, concurrency=args.concurrency, rate=args.rate)
     
     # 3. Calcul du Graphe
     if book_token_sets:
-        calculate_graph_metrics(conn, book_token_sets)
+        options = {} if args.similarity == 'legacy' else {'workers': args.workers}
+        if args.similarity == 'minhash':
+            options['num_perm'] = args.num_perm
+        engine = similarity.get_engine(args.similarity, **options)
+        if args.incremental:
+            update_graph_metrics_incremental(conn, book_token_sets, engine, args.workers,
+                                             args.closeness_pivots, args.closeness_epsilon, args.exact_closeness)
+        else:
+            calculate_graph_metrics(conn, book_token_sets, engine, args.workers,
+                                    args.closeness_pivots, args.closeness_epsilon)
     
     conn.close()
 
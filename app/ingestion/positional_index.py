@@ -0,0 +1,75 @@
+"""
+Index positionnel (table term_positions) pour les extraits « mot-clé en contexte ».
+
+Pour chaque (livre, mot) : positions, en caractères dans books.content, des premières
+occurrences du mot dans le corps du livre (au plus max_positions), triées, encodées en écarts successifs
+(deltas) au format varint LEB128 (searchbook_text/encoding.py, partagé avec le backend).
+Le backend (app/services/snippets.py) choisit la fenêtre du livre la
+plus riche en mots de la requête et ne lit que cette plage du contenu.
+
+Le corps du livre va de la fin de la ligne « *** START OF THE PROJECT GUTENBERG EBOOK »
+au marqueur « *** END OF » : sans cela, les premières occurrences des mots courants
+seraient celles de l'en-tête et de la licence Gutenberg, justement ce que les extraits
+doivent éviter. Un mot absent du corps garde ses positions hors du corps ; un livre
+sans marqueurs est pris en entier.
+"""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate
+
+from searchbook_text.encoding import encode_deltas
+
+DEFAULT_MAX_POSITIONS = 32
+
+_TOKEN = re.compile(r'\S+')
+# Cherchés dans le texte nettoyé (astérisques remplacés par des espaces)
+_BODY_START = re.compile(r'start of (?:the|this) project gutenberg e-?book[^\n]*')
+_BODY_END = re.compile(r'end of (?:the|this) project gutenberg e-?book')
+
+
+def _clean_to_content_offsets(content_lower : str, clean_table) -> list[int]:
+    """
+    Fin (exclue), dans le texte nettoyé, de chaque caractère de content_lower : nécessaire
+    seulement quand le nettoyage ne conserve pas la longueur (décomposition en plusieurs
+    caractères, caractère supprimé).
+    """
+    return list(accumulate(len(clean_table[ord(char)]) for char in content_lower))
+
+
+def body_span(content_clean : str) -> tuple[int, int]:
+    """(début, fin) du corps du livre dans le texte nettoyé, entre les marqueurs Gutenberg."""
+    start_marker = _BODY_START.search(content_clean)
+    start = start_marker.end() if start_marker else 0
+    end_marker = _BODY_END.search(content_clean, start)
+    return start, end_marker.start() if end_marker else len(content_clean)
+
+
+def term_positions(content_lower : str, content_clean : str, terms, max_positions : int | None,
+                   clean_table) -> dict[str, bytes]:
+    """
+    Positions encodées des mots de terms (mots indexés, donc sans mots vides) dans content_lower,
+    à partir des tokens de content_clean (= content_lower.translate(clean_table)).
+    max_positions : nombre maximal de positions gardées par mot (None ou 0 : toutes).
+    """
+    cap = max_positions or None
+    start, end = body_span(content_clean)
+    positions : dict[str, list[int]] = {term: [] for term in terms}
+    for match in _TOKEN.finditer(content_clean, start, end):
+        offsets = positions.get(match.group())
+        if offsets is not None and (cap is None or len(offsets) < cap):
+            offsets.append(match.start())
+
+    # Mots présents seulement dans l'en-tête ou la licence : positions hors du corps
+    outside = {term for term, offsets in positions.items() if not offsets}
+    if outside and (start > 0 or end < len(content_clean)):
+        for match in _TOKEN.finditer(content_clean):
+            word = match.group()
+            if word in outside and (cap is None or len(positions[word]) < cap):
+                positions[word].append(match.start())
+
+    if len(content_clean) != len(content_lower):
+        ends = _clean_to_content_offsets(content_lower, clean_table)
+        positions = {term: [bisect_right(ends, offset) for offset in offsets] for term, offsets in positions.items()}
+
+    return {term: encode_deltas(offsets) for term, offsets in positions.items() if offsets}
@@ -24,7 +24,7 @@ source "$VENV_DIR/bin/activate"
 
 # 3. Install dependencies
 echo "Installing dependencies..."
-pip install requests psycopg2-binary networkx nltk
+pip install requests psycopg2-binary networkx nltk numpy scipy aiohttp
 
 # 4. Run ingestion script
 # 4. Run ingestion script
@@ -0,0 +1,428 @@
+"""
+Moteurs de similarité de Jaccard pour le graphe des livres.
+
+Trois moteurs interchangeables, qui renvoient tous la liste des arêtes
+(id_a, id_b, score) avec id_a < id_b et score >= seuil, soit pour tout le corpus (pairs),
+soit seulement pour les nouveaux livres face au corpus existant (pairs_incremental) :
+
+- 'legacy'  : comparaison de tous les couples d'ensembles Python (implémentation d'origine, O(N²)).
+- 'exact'   : intersections calculées par un produit de matrices creuses livre × mot,
+              réparti par blocs de lignes sur plusieurs processus. Scores identiques à 'legacy'.
+- 'minhash' : signatures MinHash + LSH par bandes pour ne générer que les couples candidats
+              susceptibles de dépasser le seuil (approximatif : le rappel dépend du nombre de
+              permutations et du seuil).
+
+Les ensembles de mots sont des set[str] ou des tableaux triés d'identifiants
+(array('I'), voir vocabulary) ; les scores sont les mêmes dans les deux cas.
+
+Comparaison des moteurs (temps et rappel par rapport à 'legacy') sur un corpus local :
+    python similarity.py --path livres --engines legacy exact minhash
+"""
+
+import argparse
+import os
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+from scipy import sparse
+
+import vocabulary
+
+Edge = tuple[int, int, float]
+
+# Paramètres du hachage universel des permutations MinHash
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Signatures sérialisées : uint32 petit-boutiste
+SIGNATURE_DTYPE = np.dtype('<u4')
+
+
+def _ordered(id_a : int, id_b : int, score : float) -> Edge:
+    return (id_a, id_b, score) if id_a < id_b else (id_b, id_a, score)
+
+
+def _intersection_size(set_a, set_b) -> int:
+    if vocabulary.is_id_array(set_a):
+        return vocabulary.intersection_size(set_a, set_b)
+    return len(set_a.intersection(set_b))
+
+
+def calculate_jaccard(set_a, set_b) -> float:
+    """Calcule l'indice de Jaccard entre deux ensembles de tokens (set ou tableaux triés d'identifiants)."""
+    intersection = _intersection_size(set_a, set_b)
+    union = len(set_a) + len(set_b) - intersection
+    return intersection / union if union > 0 else 0
+
+
+def _existing_sizes(existing_token_sets : dict[int, set[str]], existing_sizes : dict[int, int] | None) -> dict[int, int]:
+    """
+    Taille des ensembles existants. En mode incrémental, les ensembles existants peuvent
+    être restreints au vocabulaire des nouveaux livres (seul utile aux intersections) :
+    leur taille réelle est alors fournie à part.
+    """
+    if existing_sizes is None:
+        return {book_id: len(tokens) for book_id, tokens in existing_token_sets.items()}
+    return existing_sizes
+
+
+# --- 1. MOTEUR D'ORIGINE ---
+
+class LegacyJaccard:
+    """Comparaison exhaustive des ensembles Python (référence)."""
+
+    name = 'legacy'
+    accepts_partial_sets = True  # pairs_incremental accepte des ensembles existants restreints + leurs tailles
+
+    def pairs(self, book_token_sets : dict[int, set[str]], threshold : float) -> list[Edge]:
+        edges = []
+        for id_a, id_b in combinations(book_token_sets, 2):
+            score = calculate_jaccard(book_token_sets[id_a], book_token_sets[id_b])
+            if score >= threshold:
+                edges.append(_ordered(id_a, id_b, score))
+        return edges
+
+    def pairs_incremental(self, new_token_sets : dict[int, set[str]], existing_token_sets : dict[int, set[str]],
+                          threshold : float, existing_sizes : dict[int, int] | None = None) -> list[Edge]:
+        sizes = _existing_sizes(existing_token_sets, existing_sizes)
+        edges = []
+        for id_a, set_a in new_token_sets.items():
+            for id_b, set_b in existing_token_sets.items():
+                intersection = _intersection_size(set_a, set_b)
+                union = len(set_a) + sizes[id_b] - intersection
+                score = intersection / union if union > 0 else 0
+                if score >= threshold:
+                    edges.append(_ordered(id_a, id_b, score))
+        return edges + self.pairs(new_token_sets, threshold)
+
+
+# --- 2. MOTEUR EXACT (MATRICES CREUSES) ---
+
+def build_incidence_matrix(token_sets : list) -> sparse.csr_matrix:
+    """
+    Matrice creuse binaire livre × mot (int32 pour que les produits ne débordent pas).
+    Avec des tableaux d'identifiants, les colonnes sont directement les identifiants des mots.
+    """
+    if token_sets and vocabulary.is_id_array(token_sets[0]):
+        rows = [vocabulary.as_ids(term_ids) for term_ids in token_sets]
+        indices = np.concatenate(rows).astype(np.int64) if rows else np.empty(0, dtype=np.int64)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        num_columns = int(indices.max()) + 1 if len(indices) else 0
+    else:
+        columns : dict[str, int] = {}
+        indices = []
+        indptr = [0]
+        for tokens in token_sets:
+            indices.extend(columns.setdefault(token, len(columns)) for token in tokens)
+            indptr.append(len(indices))
+        indices, indptr = np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)
+        num_columns = len(columns)
+    data = np.ones(len(indices), dtype=np.int32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(token_sets), num_columns))
+
+
+_worker_matrix = None
+_worker_transpose = None
+_worker_sizes = None
+
+
+def _init_exact_worker(matrix : sparse.csr_matrix, sizes : np.ndarray):
+    global _worker_matrix, _worker_transpose, _worker_sizes
+    _worker_matrix = matrix
+    _worker_transpose = matrix.T.tocsr()
+    _worker_sizes = sizes
+
+
+def _exact_block(start : int, stop : int, threshold : float, first_source : int):
+    """
+    Couples (i, j), i dans [start, stop[, dont le Jaccard dépasse le seuil, avec j > i
+    ou j < first_source (lignes qui ne sont pas elles-mêmes des sources).
+    """
+    intersections = (_worker_matrix[start:stop] @ _worker_transpose).tocoo()
+    rows = intersections.row.astype(np.int64) + start
+    cols = intersections.col.astype(np.int64)
+    upper = (cols > rows) | (cols < first_source)
+    rows, cols, common = rows[upper], cols[upper], intersections.data[upper]
+    scores = common / (_worker_sizes[rows] + _worker_sizes[cols] - common)
+    keep = scores >= threshold
+    # Même ordre que la double boucle d'origine (i croissant, puis j croissant)
+    order = np.lexsort((cols[keep], rows[keep]))
+    return rows[keep][order], cols[keep][order], scores[keep][order]
+
+
+class SparseExactJaccard:
+    """Jaccard exact : |A ∩ B| = (M · Mᵀ)[a, b] sur la matrice d'incidence M, calculé par blocs en parallèle."""
+
+    name = 'exact'
+    accepts_partial_sets = True
+
+    def __init__(self, workers : int | None = None, block_size : int = 256):
+        self.workers = workers or os.cpu_count() or 1
+        self.block_size = block_size
+
+    def pairs(self, book_token_sets : dict[int, set[str]], threshold : float) -> list[Edge]:
+        book_ids = list(book_token_sets)
+        token_sets = [book_token_sets[book_id] for book_id in book_ids]
+        return self._pairs(book_ids, token_sets, [len(tokens) for tokens in token_sets], 0, threshold)
+
+    def pairs_incremental(self, new_token_sets : dict[int, set[str]], existing_token_sets : dict[int, set[str]],
+                          threshold : float, existing_sizes : dict[int, int] | None = None) -> list[Edge]:
+        # Lignes : livres existants puis nouveaux livres ; seules les lignes des nouveaux sont calculées
+        sizes = _existing_sizes(existing_token_sets, existing_sizes)
+        book_ids = list(existing_token_sets) + list(new_token_sets)
+        token_sets = list(existing_token_sets.values()) + list(new_token_sets.values())
+        row_sizes = [sizes[book_id] for book_id in existing_token_sets] + [len(tokens) for tokens in new_token_sets.values()]
+        return self._pairs(book_ids, token_sets, row_sizes, len(existing_token_sets), threshold)
+
+    def _pairs(self, book_ids : list[int], token_sets : list[set[str]], sizes : list[int],
+               first_source : int, threshold : float) -> list[Edge]:
+        """Arêtes dont au moins une extrémité est une ligne >= first_source."""
+        if len(book_ids) < 2 or first_source >= len(book_ids):
+            return []
+        matrix = build_incidence_matrix(token_sets)
+        initargs = (matrix, np.asarray(sizes, dtype=np.int64))
+        blocks = [(start, min(start + self.block_size, len(book_ids)))
+                  for start in range(first_source, len(book_ids), self.block_size)]
+
+        if self.workers == 1:
+            _init_exact_worker(*initargs)
+            results = [_exact_block(start, stop, threshold, first_source) for start, stop in blocks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_exact_worker, initargs=initargs) as pool:
+                futures = [pool.submit(_exact_block, start, stop, threshold, first_source) for start, stop in blocks]
+                results = [future.result() for future in futures]
+
+        edges = []
+        for rows, cols, scores in results:
+            edges.extend(
+                _ordered(book_ids[row], book_ids[col], score)
+                for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist())
+            )
+        return edges
+
+
+# --- 3. MOTEUR APPROXIMATIF (MINHASH + LSH) ---
+
+def token_hash(token : str) -> int:
+    """Hachage 32 bits stable d'un token (contrairement à hash(), identique d'un processus à l'autre)."""
+    return zlib.crc32(token.encode('utf-8'))
+
+
+@lru_cache(maxsize=4)
+def minhash_permutations(num_perm : int, seed : int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """Coefficients (a, b) des permutations h(x) = (a·x + b) mod p."""
+    generator = np.random.RandomState(seed)
+    a = generator.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = generator.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signature(tokens, permutations : tuple[np.ndarray, np.ndarray], chunk_size : int = 4096) -> np.ndarray:
+    """
+    Signature MinHash (uint32) d'un ensemble de tokens. Un tableau d'identifiants est haché
+    par ses identifiants eux-mêmes : sa signature n'est comparable qu'à celles d'autres tableaux
+    d'identifiants, pas à celles des mots (signature_bytes, book_signatures).
+    """
+    a, b = permutations
+    signature = np.full(len(a), _MAX_HASH, dtype=np.uint64)
+    if vocabulary.is_id_array(tokens):
+        hashes = vocabulary.as_ids(tokens).astype(np.uint64)
+    else:
+        hashes = np.fromiter((token_hash(token) for token in tokens), dtype=np.uint64)
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size, np.newaxis]
+        permuted = np.bitwise_and((chunk * a + b) % _MERSENNE_PRIME, _MAX_HASH)
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature.astype(SIGNATURE_DTYPE)
+
+
+def signature_bytes(tokens, num_perm : int = 128, seed : int = 1) -> bytes:
+    """Signature compacte (num_perm × 4 octets) d'un ensemble de tokens, telle que stockée dans book_signatures."""
+    return minhash_signature(tokens, minhash_permutations(num_perm, seed)).tobytes()
+
+
+def _signature_worker(args):
+    tokens, num_perm, seed = args
+    return minhash_signature(tokens, minhash_permutations(num_perm, seed))
+
+
+def lsh_parameters(threshold : float, num_perm : int, recall_weight : float = 0.7) -> tuple[int, int]:
+    """
+    Choisit (bandes, lignes par bande) minimisant la somme pondérée des probabilités
+    de faux positifs (s < seuil) et de faux négatifs (s >= seuil) d'un couple candidat.
+    """
+    best, best_cost = (num_perm, 1), float('inf')
+    # Intégration par la méthode des rectangles (points milieux)
+    steps = 200
+    below = (np.arange(steps) + 0.5) * threshold / steps
+    above = threshold + (np.arange(steps) + 0.5) * (1 - threshold) / steps
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        false_positive = np.sum(1 - (1 - below ** rows) ** bands) * threshold / steps
+        false_negative = np.sum((1 - above ** rows) ** bands) * (1 - threshold) / steps
+        cost = (1 - recall_weight) * false_positive + recall_weight * false_negative
+        if cost < best_cost:
+            best, best_cost = (bands, rows), cost
+    return best
+
+
+class MinHashLSHJaccard:
+    """
+    Couples candidats par LSH sur les signatures MinHash, puis score des seuls candidats :
+    Jaccard exact si les ensembles sont disponibles, estimation par les signatures sinon.
+    Les valeurs des dictionnaires d'entrée peuvent être des ensembles de tokens ou des
+    signatures déjà calculées (bytes, voir signature_bytes) : dans ce cas, rien d'autre
+    que les signatures n'a besoin d'être gardé en mémoire.
+    """
+
+    name = 'minhash'
+    accepts_partial_sets = False
+
+    def __init__(self, num_perm : int = 128, seed : int = 1, workers : int | None = None,
+                 verify : bool = True, recall_weight : float = 0.7):
+        self.num_perm = num_perm
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.verify = verify
+        self.recall_weight = recall_weight
+
+    def signatures(self, token_sets : list[set[str]]) -> np.ndarray:
+        """Matrice N × num_perm des signatures (calculées en parallèle)."""
+        jobs = [(tokens, self.num_perm, self.seed) for tokens in token_sets]
+        if self.workers == 1 or len(jobs) < 2:
+            rows = [_signature_worker(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                rows = list(pool.map(_signature_worker, jobs, chunksize=8))
+        return np.vstack(rows) if rows else np.empty((0, self.num_perm), dtype=np.uint32)
+
+    def candidate_pairs(self, signatures : np.ndarray, threshold : float, first_source : int = 0) -> set[tuple[int, int]]:
+        """Couples (i, j), i < j, j >= first_source, partageant au moins une bande identique."""
+        bands, rows = lsh_parameters(threshold, self.num_perm, self.recall_weight)
+        candidates = set()
+        for band in range(bands):
+            buckets = defaultdict(list)
+            band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            for index in range(len(band_values)):
+                buckets[band_values[index].tobytes()].append(index)
+            for members in buckets.values():
+                candidates.update(pair for pair in combinations(members, 2) if pair[1] >= first_source)
+        return candidates
+
+    def pairs(self, book_token_sets : dict[int, set[str]], threshold : float) -> list[Edge]:
+        return self._pairs(list(book_token_sets), list(book_token_sets.values()), 0, threshold)
+
+    def pairs_incremental(self, new_token_sets : dict[int, set[str]], existing_token_sets : dict[int, set[str]],
+                          threshold : float, existing_sizes : dict[int, int] | None = None) -> list[Edge]:
+        if existing_sizes is not None:
+            raise ValueError("Le moteur minhash a besoin des ensembles complets des livres existants.")
+        return self._pairs(list(existing_token_sets) + list(new_token_sets),
+                           list(existing_token_sets.values()) + list(new_token_sets.values()),
+                           len(existing_token_sets), threshold)
+
+    def _pairs(self, book_ids : list[int], token_sets : list, first_source : int, threshold : float) -> list[Edge]:
+        precomputed = bool(token_sets) and isinstance(token_sets[0], bytes)
+        if precomputed:
+            signatures = np.vstack([np.frombuffer(value, dtype=SIGNATURE_DTYPE) for value in token_sets])
+            if signatures.shape[1] != self.num_perm:
+                raise ValueError(f"Signatures de {signatures.shape[1]} permutations, {self.num_perm} attendues.")
+        else:
+            signatures = self.signatures(token_sets)
+
+        edges = []
+        for i, j in sorted(self.candidate_pairs(signatures, threshold, first_source)):
+            if self.verify and not precomputed:
+                score = calculate_jaccard(token_sets[i], token_sets[j])
+            else:
+                score = float(np.mean(signatures[i] == signatures[j]))
+            if score >= threshold:
+                edges.append(_ordered(book_ids[i], book_ids[j], score))
+        return edges
+
+
+ENGINES = {
+    'legacy': LegacyJaccard,
+    'exact': SparseExactJaccard,
+    'minhash': MinHashLSHJaccard,
+}
+
+
+def get_engine(name : str, **options):
+    """Instancie un moteur par son nom ('legacy', 'exact', 'minhash')."""
+    if name == 'legacy':
+        return LegacyJaccard()
+    return ENGINES[name](**options)
+
+
+# --- 4. COMPARAISON DES MOTEURS ---
+
+def compare_engines(book_token_sets : dict[int, set[str]], threshold : float, engines : list) -> list[dict]:
+    """
+    Exécute chaque moteur sur le même corpus et mesure son temps, ainsi que son rappel
+    et sa précision par rapport à l'implémentation d'origine ('legacy').
+    """
+    reference = None
+    runs = []
+    for engine in [LegacyJaccard()] + [e for e in engines if e.name != 'legacy']:
+        start = time.perf_counter()
+        edges = engine.pairs(book_token_sets, threshold)
+        elapsed = time.perf_counter() - start
+        found = {(a, b) for a, b, _ in edges}
+        if reference is None:
+            reference = found
+        true_positives = len(found & reference)
+        runs.append({
+            'engine': engine.name,
+            'seconds': elapsed,
+            'edges': len(found),
+            'recall': true_positives / len(reference) if reference else 1.0,
+            'precision': true_positives / len(found) if found else 1.0,
+        })
+    return runs
+
+
+def main():
+    # Import local : load_books importe ce module
+    import load_books
+
+    parser = argparse.ArgumentParser(description="Compare les moteurs de similarité de Jaccard sur un corpus local.")
+    parser.add_argument('--path', type=str, required=True, help="Répertoire contenant les fichiers .txt.")
+    parser.add_argument('--limit', type=int, default=None, help="Nombre maximal de livres lus.")
+    parser.add_argument('--threshold', type=float, default=load_books.JACCARD_THRESHOLD)
+    parser.add_argument('--engines', nargs='+', default=['legacy', 'exact', 'minhash'], choices=sorted(ENGINES))
+    parser.add_argument('--num-perm', type=int, default=128, help="Permutations MinHash.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--sets', action='store_true',
+                        help="Ensembles de mots en set[str] (représentation d'origine) au lieu des identifiants de vocabulary.")
+    args = parser.parse_args()
+
+    book_token_sets = {}
+    term_vocabulary = vocabulary.Vocabulary()
+    filenames = sorted(f for f in os.listdir(args.path) if f.endswith('.txt'))[:args.limit]
+    for book_id, filename in enumerate(filenames):
+        with open(os.path.join(args.path, filename), 'r', encoding='utf-8') as f:
+            content = f.read()
+        metadata = load_books.extract_metadata(content)
+        tokens = set(load_books.clean_and_tokenize(content, metadata.get('language', 'english')))
+        book_token_sets[book_id] = tokens if args.sets else term_vocabulary.encode(tokens)
+    print(f"{len(book_token_sets)} livres, seuil {args.threshold}")
+
+    engines = []
+    for name in args.engines:
+        if name == 'exact':
+            engines.append(SparseExactJaccard(workers=args.workers))
+        elif name == 'minhash':
+            engines.append(MinHashLSHJaccard(num_perm=args.num_perm, workers=args.workers))
+
+    print(f"{'moteur':<10} {'temps (s)':>10} {'arêtes':>8} {'rappel':>8} {'précision':>10}")
+    for run in compare_engines(book_token_sets, args.threshold, engines):
+        print(f"{run['engine']:<10} {run['seconds']:>10.2f} {run['edges']:>8} {run['recall']:>8.3f} {run['precision']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Vocabulaire : chaque mot de l'index reçoit un identifiant entier dense (table terms).
+
+L'ensemble des mots d'un livre est alors représenté par un tableau trié d'identifiants
+(array('I'), 4 octets par mot) au lieu d'un set[str] (≈ 60 octets par mot, plus les
+chaînes elles-mêmes), et les intersections se font par fusion de tableaux triés.
+Les identifiants sont persistés dans terms (et recopiés dans term_stats.term_id) :
+ils restent stables d'une ingestion à l'autre. Seule l'ingestion s'en sert (calcul du
+graphe) ; le backend résout toujours les mots de la requête par leur texte.
+"""
+
+from array import array
+
+import numpy as np
+
+TERM_TYPECODE = 'I'  # uint32
+TERM_DTYPE = np.uint32
+
+
+class Vocabulary:
+    """Correspondance mot <-> identifiant ; les identifiants sont attribués dans l'ordre d'apparition."""
+
+    def __init__(self, words : list[str] | None = None):
+        self.words : list[str] = list(words or [])
+        self.ids : dict[str, int] = {word: term_id for term_id, word in enumerate(self.words)}
+        self._persisted = len(self.words)  # les mots d'identifiant >= _persisted ne sont pas encore en base
+
+    @classmethod
+    def load(cls, conn) -> 'Vocabulary':
+        """Vocabulaire déjà persisté dans terms (identifiants denses 0..n-1)."""
+        with conn.cursor(name='terms') as cursor:
+            cursor.itersize = 100_000
+            cursor.execute("SELECT word FROM terms ORDER BY id;")
+            vocabulary = cls([word for word, in cursor])
+        conn.commit()
+        return vocabulary
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def intern(self, word : str) -> int:
+        term_id = self.ids.get(word)
+        if term_id is None:
+            term_id = self.ids[word] = len(self.words)
+            self.words.append(word)
+        return term_id
+
+    def encode(self, words) -> array:
+        """Tableau trié des identifiants des mots (les mots inconnus sont ajoutés au vocabulaire)."""
+        return array(TERM_TYPECODE, sorted(map(self.intern, words)))
+
+    def lookup(self, words) -> array:
+        """Comme encode, mais en ignorant les mots inconnus (le vocabulaire n'est pas modifié)."""
+        return array(TERM_TYPECODE, sorted(term_id for term_id in map(self.ids.get, words) if term_id is not None))
+
+    def decode(self, term_ids) -> list[str]:
+        return [self.words[term_id] for term_id in term_ids]
+
+    def pending(self) -> list[tuple[int, str]]:
+        """(id, mot) attribués depuis le dernier mark_persisted, à écrire dans terms."""
+        return list(enumerate(self.words[self._persisted:], start=self._persisted))
+
+    def mark_persisted(self):
+        self._persisted = len(self.words)
+
+
+def as_ids(term_ids) -> np.ndarray:
+    """Vue NumPy (sans copie) d'un tableau d'identifiants."""
+    return np.frombuffer(term_ids, dtype=TERM_DTYPE) if isinstance(term_ids, array) else np.asarray(term_ids, dtype=TERM_DTYPE)
+
+
+def intersection_size(ids_a, ids_b) -> int:
+    """|A ∩ B| de deux tableaux triés d'identifiants sans doublons, par fusion."""
+    return len(np.intersect1d(as_ids(ids_a), as_ids(ids_b), assume_unique=True))
+
+
+def is_id_array(token_set) -> bool:
+    """Vrai pour un ensemble de mots représenté par des identifiants (array('I') ou tableau NumPy)."""
+    return isinstance(token_set, (array, np.ndarray))
@@ -0,0 +1,32 @@
+"""
+Traitement du texte partagé par l'ingestion et le backend : les mots d'une
+requête sont normalisés exactement comme les mots indexés (voir tokenizer), et
+les encodages stockés en base sont les mêmes à l'écriture et à la lecture (voir
+encoding).
+"""
+
+from searchbook_text.encoding import decode_deltas, encode_deltas, trigram_key
+from searchbook_text.tokenizer import (
+    DEFAULT_LANGUAGE,
+    CleanTable,
+    clean_table,
+    clean_text,
+    filter_stop_words,
+    normalize_query,
+    stop_words,
+    tokenize,
+)
+
+__all__ = [
+    "DEFAULT_LANGUAGE",
+    "CleanTable",
+    "clean_table",
+    "clean_text",
+    "decode_deltas",
+    "encode_deltas",
+    "filter_stop_words",
+    "normalize_query",
+    "stop_words",
+    "tokenize",
+    "trigram_key",
+]
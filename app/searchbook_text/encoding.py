@@ -0,0 +1,45 @@
+"""
+Encodages écrits par l'ingestion et relus par le backend : ils doivent être identiques
+octet pour octet des deux côtés.
+
+  - trigram_key : un trigramme (3 caractères) en un BIGINT, 21 bits par point de code
+    (book_trigrams, écrit par ingestion/load_books.py, interrogé par
+    app/services/regex_prefilter.py) ;
+  - encode_deltas / decode_deltas : positions triées en écarts successifs, au format
+    varint LEB128, 7 bits par octet, bit de poids fort = suite (term_positions, écrit par
+    ingestion/positional_index.py, lu par app/services/snippets.py).
+"""
+
+
+def trigram_key(trigram : str) -> int:
+    """Encode 3 caractères en un entier 63 bits."""
+    return (ord(trigram[0]) << 42) | (ord(trigram[1]) << 21) | ord(trigram[2])
+
+
+def encode_deltas(offsets : list[int]) -> bytes:
+    """Positions triées -> écarts successifs en varint."""
+    encoded = bytearray()
+    previous = 0
+    for offset in offsets:
+        delta = offset - previous
+        previous = offset
+        while delta >= 0x80:
+            encoded.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        encoded.append(delta)
+    return bytes(encoded)
+
+
+def decode_deltas(data : bytes) -> list[int]:
+    """Inverse de encode_deltas."""
+    offsets = []
+    value = shift = previous = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        offsets.append(previous)
+        value = shift = 0
+    return offsets
@@ -0,0 +1,125 @@
+"""
+Tokenisation commune : ingestion/load_books.py l'applique aux livres, le backend
+(app/services/search_service.py) aux requêtes ; un mot de requête correspond donc
+par construction à un mot de inverted_index.
+
+    texte en minuscules
+    -> accents retirés (NFD sans les marques Mn), ponctuation et caractères spéciaux
+       remplacés par une espace : une passe de str.translate (voir CleanTable)
+    -> découpage sur les espaces
+    -> mots vides de la langue retirés (listes NLTK, chargées une fois par langue)
+
+NLTK est optionnel : sans le paquet ou sans ses données (stopwords), aucun mot
+vide n'est retiré.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+try:
+    from nltk.corpus import stopwords
+except ImportError:  # dépendance optionnelle : pas de filtrage des mots vides
+    stopwords = None
+
+NORMALIZE_UNICODE = True  # Mettre à False pour désactiver la normalisation Unicode
+DISABLE_STOP_WORDS = False  # Mettre à True pour désactiver le filtrage des stop words
+
+DEFAULT_LANGUAGE = 'english'
+# Langues reconnues dans le champ Language des métadonnées (ex. 'French (France)')
+PRELOADED_LANGUAGES = ('french', 'english')
+QUERY_CACHE_SIZE = 4096
+
+_KEPT_CHARACTER = re.compile(r"[\w\s'-]", re.UNICODE)
+# Caractères calculés dès l'import (ASCII, Latin-1, Latin étendu A et B) : le cas courant
+# ne passe jamais par __missing__
+_PRECOMPUTED = range(0x250)
+
+
+class CleanTable(dict):
+    """
+    Table pour str.translate, remplie à la demande : chaque caractère rencontré est calculé une
+    seule fois (décomposition NFD sans les marques Mn si strip_accents, ponctuation et caractères
+    spéciaux remplacés par une espace), puis simplement relu pour toutes ses occurrences suivantes.
+    """
+
+    def __init__(self, strip_accents : bool):
+        super().__init__()
+        self.strip_accents = strip_accents
+        for code in _PRECOMPUTED:
+            self[code]
+
+    def __missing__(self, code : int) -> str:
+        char = chr(code)
+        if self.strip_accents:
+            char = ''.join(c for c in unicodedata.normalize('NFD', char) if unicodedata.category(c) != 'Mn')
+        cleaned = ''.join(c if _KEPT_CHARACTER.match(c) else ' ' for c in char)
+        self[code] = cleaned
+        return cleaned
+
+
+_CLEAN_TABLE = CleanTable(strip_accents=True)
+_PUNCTUATION_TABLE = CleanTable(strip_accents=False)
+
+
+def clean_table() -> CleanTable:
+    return _CLEAN_TABLE if NORMALIZE_UNICODE else _PUNCTUATION_TABLE
+
+
+def clean_text(content_lower : str) -> str:
+    """
+    Suppression des accents (NFD puis retrait des Mn) et de la ponctuation,
+    en une seule passe via une table de traduction (voir CleanTable).
+    """
+    return content_lower.translate(clean_table())
+
+
+@lru_cache(maxsize=None)
+def _nltk_stop_words(language : str) -> frozenset[str] | None:
+    """Liste NLTK de la langue ; None si la langue, les données NLTK ou NLTK lui-même manquent."""
+    if stopwords is None or not language:
+        return None
+    try:
+        return frozenset(stopwords.words(language))
+    except (LookupError, OSError):
+        return None
+
+
+@lru_cache(maxsize=256)
+def stop_words(language : str) -> frozenset[str]:
+    """
+    Mots vides d'une langue telle qu'écrite dans les métadonnées : langue préchargée contenue
+    dans le nom, sinon premier mot du nom (ex. 'german' de 'german (austria)'), sinon anglais.
+    """
+    if DISABLE_STOP_WORDS:
+        return frozenset()
+    lang_key = language.lower()
+    for key in PRELOADED_LANGUAGES:
+        if key in lang_key:
+            words = _nltk_stop_words(key)
+            if words is not None:
+                return words
+    words = _nltk_stop_words(lang_key.split(' ')[0])
+    if words is None:
+        words = _nltk_stop_words(DEFAULT_LANGUAGE)
+    return words or frozenset()
+
+
+def filter_stop_words(tokens : list[str], language : str) -> list[str]:
+    """Retire les mots vides de la langue du livre (et les chaînes vides)."""
+    stop = stop_words(language)
+    return [token for token in tokens if token and token not in stop]
+
+
+def tokenize(content : str, language : str = DEFAULT_LANGUAGE) -> list[str]:
+    """
+    Nettoie le contenu, supprime les accents, le met en minuscule,
+    supprime la ponctuation et filtre les stop words.
+    """
+    return filter_stop_words(clean_text(content.lower()).split(), language)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def normalize_query(query : str, language : str = DEFAULT_LANGUAGE) -> tuple[str, ...]:
+    """Mots d'une requête, normalisés comme les mots indexés (tuple : partagé par le cache)."""
+    return tuple(tokenize(query, language))